@@ -1,22 +1,39 @@
 """
 API endpoints for activity management.
 """
-from fastapi import APIRouter, HTTPException, status
-from app.schemas.activity_schema import ActivityCreate, ActivityResponse
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Response, status
+from app.schemas.activity_schema import (
+    ActivityCreate,
+    ActivityUpdate,
+    ActivityResponse,
+    IngestionMetricsResponse
+)
 from app.models.activity import Activity
 from app.repositories.activity_repository import ActivityRepository
+from app.services.ingestion_service import IngestionQueue, IngestionQueueFull
+from app.services.idempotency_service import IdempotencyIndex
 from app.utils.date_helpers import parse_iso_datetime
+from app.api.profiling import ProfiledRoute
 
 
-router = APIRouter(prefix="/activities", tags=["Activities"])
+router = APIRouter(prefix="/activities", tags=["Activities"], route_class=ProfiledRoute)
 
 
-def create_activities_router(repository: ActivityRepository) -> APIRouter:
+def create_activities_router(
+    repository: ActivityRepository,
+    ingestion_queue: Optional[IngestionQueue] = None,
+    idempotency_index: Optional[IdempotencyIndex] = None
+) -> APIRouter:
     """
     Factory function to create activities router with dependency injection.
     
     Args:
         repository: ActivityRepository implementation
+        ingestion_queue: Optional IngestionQueue; when given, writes are
+            accepted asynchronously (202) instead of committed inline (201)
+        idempotency_index: Optional IdempotencyIndex used to de-duplicate
+            retried writes carrying an idempotency key
         
     Returns:
         Configured APIRouter instance
@@ -27,9 +44,18 @@ def create_activities_router(repository: ActivityRepository) -> APIRouter:
         response_model=ActivityResponse,
         status_code=status.HTTP_201_CREATED,
         summary="Log a new activity",
-        description="Create a new activity entry for a specific goal"
+        description="Create a new activity entry for a specific goal",
+        responses={
+            200: {"description": "Duplicate of an earlier request; the original activity is returned"},
+            202: {"description": "Accepted for asynchronous ingestion", "model": ActivityResponse},
+            503: {"description": "Ingestion queue full; retry after the Retry-After delay"}
+        }
     )
-    async def create_activity(activity_data: ActivityCreate) -> ActivityResponse:
+    async def create_activity(
+        activity_data: ActivityCreate,
+        response: Response,
+        idempotency_key_header: Optional[str] = Header(None, alias="Idempotency-Key")
+    ) -> ActivityResponse:
         """
         Log a new activity toward a life goal.
         
@@ -37,21 +63,55 @@ def create_activities_router(repository: ActivityRepository) -> APIRouter:
         - **activity_type**: Category (Learning, Health, Fitness, Other)
         - **value**: Numeric value representing effort (e.g., minutes spent)
         - **timestamp**: ISO-8601 formatted datetime
+        - **client_activity_id**: Optional client-side id used for de-duplication
+        
+        Retries are safe when the request carries `client_activity_id` or an
+        `Idempotency-Key` header: a repeat for the same goal returns `200`
+        with the original activity and `Idempotent-Replayed: true` instead
+        of creating a new one. Keys are scoped to the goal.
+        
+        In async ingestion mode the activity is queued and the response is
+        `202 Accepted` with the assigned id; it becomes visible on dashboards
+        once the background writer commits it.
         """
         try:
             # Parse timestamp
             timestamp = parse_iso_datetime(activity_data.timestamp)
             
+            # Replay the original response for duplicate submissions
+            idempotency_key = activity_data.client_activity_id or idempotency_key_header
+            if idempotency_index is None:
+                idempotency_key = None
+            if idempotency_key is not None:
+                existing = idempotency_index.lookup(activity_data.goal_id, idempotency_key)
+                if existing is not None:
+                    response.status_code = status.HTTP_200_OK
+                    response.headers["Idempotent-Replayed"] = "true"
+                    return ActivityResponse(**existing.to_dict())
+            
             # Create domain model
             activity = Activity(
                 goal_id=activity_data.goal_id,
                 activity_type=activity_data.activity_type,
                 value=activity_data.value,
-                timestamp=timestamp
+                timestamp=timestamp,
+                activity_id=(
+                    IdempotencyIndex.activity_id_for(activity_data.goal_id, idempotency_key)
+                    if idempotency_key is not None else None
+                )
             )
             
-            # Persist to repository
-            saved_activity = repository.save(activity)
+            queued = ingestion_queue is not None and ingestion_queue.running
+            if queued:
+                # Queue for the background writer
+                saved_activity = ingestion_queue.submit(activity)
+                response.status_code = status.HTTP_202_ACCEPTED
+            else:
+                # Persist to repository (also while the writer is not running)
+                saved_activity = repository.save(activity)
+            
+            if idempotency_key is not None:
+                idempotency_index.remember(saved_activity, pending=queued)
             
             # Return response
             return ActivityResponse(
@@ -62,6 +122,12 @@ def create_activities_router(repository: ActivityRepository) -> APIRouter:
                 timestamp=saved_activity.timestamp.isoformat()
             )
             
+        except IngestionQueueFull as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Ingestion queue is full, please retry later",
+                headers={"Retry-After": str(e.retry_after_seconds)}
+            )
         except ValueError as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -73,4 +139,83 @@ def create_activities_router(repository: ActivityRepository) -> APIRouter:
                 detail=f"Failed to create activity: {str(e)}"
             )
     
+    @router.put(
+        "/{activity_id}",
+        response_model=ActivityResponse,
+        summary="Correct an activity",
+        description="Replace a logged activity (goal, type, value and timestamp)",
+        responses={404: {"description": "Activity not found (or already compacted into a daily rollup)"}}
+    )
+    async def update_activity(activity_id: str, activity_data: ActivityUpdate) -> ActivityResponse:
+        """
+        Replace a mistaken activity entry, keeping its id.
+        
+        Dashboards, leaderboards, statistics and cached metrics are adjusted
+        incrementally: the old version is subtracted and the new one added.
+        Corrections are committed immediately, also in async ingestion mode.
+        """
+        try:
+            activity = Activity(
+                goal_id=activity_data.goal_id,
+                activity_type=activity_data.activity_type,
+                value=activity_data.value,
+                timestamp=parse_iso_datetime(activity_data.timestamp),
+                activity_id=activity_id
+            )
+            updated = repository.update(activity)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid input: {str(e)}"
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to update activity: {str(e)}"
+            )
+        if updated is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Activity not found")
+        return ActivityResponse(**updated.to_dict())
+    
+    @router.delete(
+        "/{activity_id}",
+        status_code=status.HTTP_204_NO_CONTENT,
+        summary="Delete an activity",
+        description="Remove a logged activity",
+        responses={404: {"description": "Activity not found (or already compacted into a daily rollup)"}}
+    )
+    async def delete_activity(activity_id: str) -> None:
+        """
+        Delete an activity entry.
+        
+        Sealed history is not rewritten: the row is tombstoned and its space
+        reclaimed by background segment compaction.
+        """
+        try:
+            deleted = repository.delete(activity_id)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to delete activity: {str(e)}"
+            )
+        if deleted is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Activity not found")
+    
+    @router.get(
+        "/ingestion",
+        response_model=IngestionMetricsResponse,
+        summary="Get ingestion metrics",
+        description="Queue depth, throughput counters and commit lag of the ingestion pipeline"
+    )
+    async def get_ingestion_metrics() -> IngestionMetricsResponse:
+        """
+        Report the state of the ingestion pipeline.
+        
+        In sync mode writes are committed inline and the queue counters stay at zero.
+        """
+        idempotency = idempotency_index.metrics() if idempotency_index is not None else {}
+        if ingestion_queue is None:
+            return IngestionMetricsResponse(mode="sync", idempotency=idempotency)
+        return IngestionMetricsResponse(mode="async", idempotency=idempotency, **ingestion_queue.metrics())
+    
     return router
@@ -0,0 +1,157 @@
+"""
+Admission control at the HTTP layer: middleware and metrics endpoint.
+"""
+import asyncio
+import json
+from fastapi import APIRouter
+from app.schemas.activity_schema import AdmissionMetricsResponse
+from app.services.admission_service import AdmissionController, CostRule, retry_after_header
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying AdmissionController decisions.
+
+    - Rate-limited or shed requests get ``429`` with ``Retry-After``
+    - A GET on a coalescing route joins an identical in-flight request
+      (same path and query) and replays its buffered response instead of
+      recomputing; followers therefore see the leader's result even if a
+      write landed while it was computing
+
+    Clients are identified by the ``X-Forwarded-For`` entry appended by the
+    outermost of ``trusted_proxies`` proxies in front of the app (the
+    ``trusted_proxies``-th entry from the right). Entries further left are
+    whatever the client sent and are never used, so a client cannot pick
+    its own bucket or flood the LRU with made-up addresses. With
+    ``trusted_proxies`` = 0, or fewer entries than trusted proxies, the
+    socket peer is used.
+    """
+
+    def __init__(self, app, controller: AdmissionController, trusted_proxies: int = 0):
+        self.app = app
+        self.controller = controller
+        self.trusted_proxies = trusted_proxies
+
+    def _client(self, scope) -> str:
+        if self.trusted_proxies > 0:
+            hops = [
+                hop.strip()
+                for name, value in scope["headers"] if name == b"x-forwarded-for"
+                for hop in value.decode("latin-1").split(",")
+            ]
+            if len(hops) >= self.trusted_proxies and hops[-self.trusted_proxies]:
+                return hops[-self.trusted_proxies]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    @staticmethod
+    async def _reject(send, retry_after: float, detail: str) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", retry_after_header(retry_after).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    async def _replay(send, messages) -> None:
+        for message in messages:
+            await send(message)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rule = self.controller.match(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = self.controller.admit(self._client(scope), rule)
+        if retry_after:
+            await self._reject(send, retry_after, f"Rate limit exceeded for {rule.name} requests")
+            return
+
+        coalesce = rule.coalesce and scope["method"] == "GET" and not any(
+            name == b"x-profile-token" for name, _ in scope["headers"]
+        )
+        if coalesce:
+            key = (scope["path"], scope.get("query_string", b""))
+            flight = self.controller.join_flight(key, rule)
+            if flight is not None:
+                messages = await flight
+                if messages is not None:
+                    await self._replay(send, messages)
+                    return
+            else:
+                await self._lead(scope, receive, send, rule, key)
+                return
+
+        await self._run(scope, receive, send, rule)
+
+    async def _run(self, scope, receive, send, rule: CostRule) -> None:
+        if not rule.expensive:
+            await self.app(scope, receive, send)
+            return
+        if not self.controller.try_start_expensive(rule):
+            await self._reject(send, 1, "Server busy with expensive requests")
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.finish_expensive()
+
+    async def _lead(self, scope, receive, send, rule: CostRule, key) -> None:
+        """Run the request, buffering its response messages for followers."""
+        flight = self.controller.lead_flight(key)
+        messages = []
+        # Analytics endpoints hold the event loop while they compute; yielding
+        # once lets identical requests already accepted join this flight
+        await asyncio.sleep(0)
+
+        async def send_and_buffer(message):
+            messages.append(message)
+            await send(message)
+
+        result = None
+        try:
+            await self._run(scope, receive, send_and_buffer, rule)
+            status = messages[0]["status"] if messages else 500
+            # Shed or failed responses are not shared; followers run themselves
+            if status < 500 and status != 429:
+                result = messages
+        finally:
+            self.controller.end_flight(key, flight, result)
+
+
+router = APIRouter(prefix="/admission", tags=["Health"])
+
+
+def create_admission_router(controller: AdmissionController) -> APIRouter:
+    """
+    Factory function to create the admission metrics router.
+
+    Args:
+        controller: AdmissionController shared with AdmissionMiddleware
+
+    Returns:
+        Configured APIRouter instance
+    """
+
+    @router.get(
+        "/metrics",
+        response_model=AdmissionMetricsResponse,
+        summary="Get admission control metrics",
+        description="Rate-limit rejections, load shedding and request coalescing counters"
+    )
+    async def get_admission_metrics() -> AdmissionMetricsResponse:
+        """Counters since startup plus current expensive-request concurrency."""
+        return AdmissionMetricsResponse(**controller.metrics())
+
+    return router
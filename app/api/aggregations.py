@@ -0,0 +1,82 @@
+"""
+API endpoints for ad-hoc aggregation queries.
+"""
+from fastapi import APIRouter, HTTPException, status
+from app.schemas.activity_schema import (
+    AggregationQueryRequest,
+    AggregationGroup,
+    AggregationQueryResponse
+)
+from app.services.aggregation_service import AggregationQuery, AggregationService
+from app.api.profiling import ProfiledRoute
+
+
+router = APIRouter(prefix="/aggregations", tags=["Insights"], route_class=ProfiledRoute)
+
+
+def create_aggregations_router(aggregation_service: AggregationService) -> APIRouter:
+    """
+    Factory function to create aggregations router with dependency injection.
+
+    Args:
+        aggregation_service: AggregationService executing and caching queries
+
+    Returns:
+        Configured APIRouter instance
+    """
+
+    @router.post(
+        "/query",
+        response_model=AggregationQueryResponse,
+        summary="Run an aggregation query",
+        description="Filter activities by goal, type and time range, then group and aggregate their values"
+    )
+    async def run_aggregation_query(request: AggregationQueryRequest) -> AggregationQueryResponse:
+        """
+        Aggregate activity values over arbitrary slices.
+
+        Groups are returned in key order. Weeks start on Monday and are
+        keyed by that date; months are keyed `YYYY-MM`; days use each
+        activity's UTC calendar date. Compacted history is answered from
+        daily rollups. Identical queries are served from a cache until a
+        covered goal changes.
+
+        **Body:**
+        - **goal_ids**, **activity_types**, **start**, **end**: Filters (all optional)
+        - **group_by**: Any of `goal`, `type`, `day`, `week`, `month`, `weekday`
+        - **metrics**: Any of `sum`, `count`, `avg`, `min`, `max`
+
+        Example: minutes per type per weekday is
+        `{"group_by": ["type", "weekday"], "metrics": ["sum"]}`.
+        """
+        if request.start and request.end and request.start >= request.end:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="start must be before end"
+            )
+
+        query = AggregationQuery.normalize(
+            goal_ids=request.goal_ids,
+            activity_types=request.activity_types,
+            start=request.start,
+            end=request.end,
+            group_by=request.group_by,
+            metrics=request.metrics
+        )
+        try:
+            result, cached = aggregation_service.query(query)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to run aggregation: {str(e)}"
+            )
+
+        return AggregationQueryResponse(
+            group_by=list(query.group_by),
+            metrics=list(query.metrics),
+            groups=[AggregationGroup(key=key, values=values) for key, values in result.groups],
+            scanned_rows=result.scanned_rows,
+            cached=cached
+        )
+
+    return router
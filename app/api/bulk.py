@@ -0,0 +1,143 @@
+"""
+API endpoints for streaming bulk export and import of activities.
+"""
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app.repositories.activity_repository import ActivityRepository
+from app.schemas.activity_schema import ImportResultResponse
+from app.services.bulk_service import BulkImporter, export_csv, export_ndjson
+from app.utils.date_helpers import parse_iso_datetime
+from app.api.profiling import ProfiledRoute
+
+
+router = APIRouter(prefix="/activities", tags=["Bulk Data"], route_class=ProfiledRoute)
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _parse_bound(name: str, value: Optional[str]) -> Optional[datetime]:
+    if value is None:
+        return None
+    try:
+        return parse_iso_datetime(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid input: {name} must be a valid ISO-8601 datetime string"
+        )
+
+
+def create_bulk_router(repository: ActivityRepository) -> APIRouter:
+    """
+    Factory function to create bulk data router with dependency injection.
+    
+    Args:
+        repository: ActivityRepository implementation
+        
+    Returns:
+        Configured APIRouter instance
+    """
+    
+    @router.get(
+        "/export",
+        summary="Export activities",
+        description="Stream activities as NDJSON or CSV, optionally filtered by goal and time range"
+    )
+    async def export_activities(
+        format: Literal["ndjson", "csv"] = Query("ndjson", description="Output format"),
+        goal_id: Optional[str] = Query(None, description="Only export this goal"),
+        start: Optional[str] = Query(None, description="Inclusive ISO-8601 lower bound"),
+        end: Optional[str] = Query(None, description="Exclusive ISO-8601 upper bound")
+    ) -> StreamingResponse:
+        """
+        Stream activities in constant memory.
+        
+        Rows are ordered by goal, then by timestamp. Every row carries its
+        `activity_id`, so re-importing an export skips the rows that still
+        exist, and a `count` of folded rows: compacted daily rollups are
+        exported with their count (raw activities have 1) but are rejected
+        on import. Rows folded into a rollup since the export would be
+        imported again.
+        """
+        activities = repository.iter_activities(
+            goal_id=goal_id,
+            start=_parse_bound("start", start),
+            end=_parse_bound("end", end)
+        )
+        encoder = export_csv if format == "csv" else export_ndjson
+        return StreamingResponse(
+            encoder(activities),
+            media_type=MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="activities.{format}"'}
+        )
+    
+    @router.post(
+        "/import",
+        response_model=ImportResultResponse,
+        summary="Import activities",
+        description="Bulk-load activities from an NDJSON or CSV request body"
+    )
+    async def import_activities(
+        request: Request,
+        format: Optional[Literal["ndjson", "csv"]] = Query(
+            None, description="Input format (defaults from Content-Type, else NDJSON)"
+        )
+    ) -> ImportResultResponse:
+        """
+        Import activities from a streamed request body.
+        
+        - **NDJSON**: one JSON object per line with `goal_id`, `activity_type`,
+          `value`, `timestamp` and optionally `activity_id` (a UUID) and
+          `count` (rows with a count other than 1 are rejected)
+        - **CSV**: a header row naming the same columns; quoted fields must
+          not contain line breaks
+        
+        Invalid rows are skipped and reported; rows whose `activity_id`
+        already exists are counted as duplicates and not written. Lines are
+        decoded and validated in a worker thread; each full batch is then
+        written to the repository on the event loop, so writes never race
+        with other requests.
+        """
+        if format is None:
+            format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+        
+        importer = BulkImporter(repository, format)
+        
+        def parse(lines):
+            return importer.parse_lines(line.decode("utf-8") for line in lines)
+        
+        try:
+            pending = b""
+            async for chunk in request.stream():
+                pending += chunk
+                *lines, pending = pending.split(b"\n")
+                if lines:
+                    for batch in await run_in_threadpool(parse, lines):
+                        importer.write_batch(*batch)
+            if pending:
+                for batch in await run_in_threadpool(parse, [pending]):
+                    importer.write_batch(*batch)
+            importer.finish()
+            
+        except UnicodeDecodeError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid input: request body must be UTF-8"
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to import activities: {str(e)}"
+            )
+        
+        return ImportResultResponse(
+            imported=importer.imported,
+            rejected=importer.rejected,
+            duplicates=importer.duplicates,
+            errors=importer.errors
+        )
+    
+    return router
@@ -1,18 +1,34 @@
 """
 API endpoints for dashboard views and goal summaries.
 """
-from fastapi import APIRouter, HTTPException, status
-from app.schemas.activity_schema import DashboardResponse, ActivityResponse
+from datetime import datetime, timezone
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Query, status
+from app.models.rollup import DailyRollup
+from app.schemas.activity_schema import (
+    DashboardResponse,
+    ActivityResponse,
+    ActivityHistoryResponse,
+    HistoryEntryResponse,
+    BatchDashboardRequest,
+    BatchDashboardResponse,
+    DashboardDeltaResponse
+)
 from app.repositories.activity_repository import ActivityRepository
 from app.services.analytics_service import AnalyticsService
+from app.services.metrics_cache import MetricsCache
+from app.services.change_log import GoalChangeLog
+from app.api.profiling import ProfiledRoute
 
 
-router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"], route_class=ProfiledRoute)
 
 
 def create_dashboard_router(
     repository: ActivityRepository,
-    analytics_service: AnalyticsService
+    analytics_service: AnalyticsService,
+    metrics_cache: MetricsCache,
+    change_log: GoalChangeLog
 ) -> APIRouter:
     """
     Factory function to create dashboard router with dependency injection.
@@ -20,11 +36,78 @@ def create_dashboard_router(
     Args:
         repository: ActivityRepository implementation
         analytics_service: AnalyticsService instance
+        metrics_cache: MetricsCache holding precomputed goal metrics
+        change_log: GoalChangeLog versioning each goal's saves
         
     Returns:
         Configured APIRouter instance
     """
     
+    @router.post(
+        "/batch",
+        response_model=BatchDashboardResponse,
+        summary="Get dashboards for several goals",
+        description="Retrieve summary metrics for many goals in one request"
+    )
+    async def get_batch_dashboards(request: BatchDashboardRequest) -> BatchDashboardResponse:
+        """
+        Get dashboards for a list of goals in one round trip.
+        
+        All goals are fetched together from the repository and evaluated
+        against the same reference time, so wellness windows line up across
+        goals. History is omitted unless `include_history` is true.
+        
+        **Body:**
+        - **goal_ids**: Up to 500 goal identifiers (duplicates are ignored)
+        - **include_history**: Include each goal's activity history
+        """
+        try:
+            now = datetime.now(timezone.utc)
+            goal_ids = list(dict.fromkeys(request.goal_ids))
+            activities_by_goal = repository.find_by_goal_ids(goal_ids)
+            
+            dashboards = []
+            for goal_id in goal_ids:
+                activities = activities_by_goal.get(goal_id, [])
+                if not activities:
+                    dashboards.append(
+                        DashboardResponse(
+                            goal_id=goal_id,
+                            total_activities=0,
+                            aggregated_values={},
+                            activity_history=[],
+                            consistency_score=0.0,
+                            wellness_warning=True,
+                            version=change_log.current_version(goal_id)
+                        )
+                    )
+                    continue
+                
+                metrics = metrics_cache.get_goal_metrics(goal_id, activities, now)
+                activity_history = [
+                    ActivityResponse(**activity.to_dict()) for activity in activities
+                ] if request.include_history else []
+                
+                dashboards.append(
+                    DashboardResponse(
+                        goal_id=goal_id,
+                        total_activities=metrics.total_activities,
+                        aggregated_values=metrics.aggregated_values,
+                        activity_history=activity_history,
+                        consistency_score=metrics.consistency_score,
+                        wellness_warning=metrics.wellness_warning,
+                        version=change_log.current_version(goal_id)
+                    )
+                )
+            
+            return BatchDashboardResponse(generated_at=now.isoformat(), dashboards=dashboards)
+            
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to generate dashboards: {str(e)}"
+            )
+    
     @router.get(
         "/{goal_id}",
         response_model=DashboardResponse,
@@ -48,6 +131,7 @@ def create_dashboard_router(
         try:
             # Fetch all activities for this goal
             activities = repository.find_by_goal_id(goal_id)
+            version = change_log.current_version(goal_id)
             
             if not activities:
                 # Return empty dashboard for goals with no activities
@@ -57,14 +141,12 @@ def create_dashboard_router(
                     aggregated_values={},
                     activity_history=[],
                     consistency_score=0.0,
-                    wellness_warning=True
+                    wellness_warning=True,
+                    version=version
                 )
             
-            # Calculate metrics
-            total_activities = len(activities)
-            aggregated_values = analytics_service.aggregate_by_type(activities)
-            consistency_score = analytics_service.calculate_consistency_score(activities)
-            wellness_warning = analytics_service.check_wellness_warning(activities)
+            # Use precomputed metrics (recomputed only on a miss or expiry)
+            metrics = metrics_cache.get_goal_metrics(goal_id, activities)
             
             # Convert activities to response schema
             activity_history = [
@@ -80,17 +162,128 @@ def create_dashboard_router(
             
             return DashboardResponse(
                 goal_id=goal_id,
+                total_activities=metrics.total_activities,
+                aggregated_values=metrics.aggregated_values,
+                activity_history=activity_history,
+                consistency_score=metrics.consistency_score,
+                wellness_warning=metrics.wellness_warning,
+                version=version
+            )
+            
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to generate dashboard: {str(e)}"
+            )
+    
+    @router.get(
+        "/{goal_id}/changes",
+        response_model=DashboardDeltaResponse,
+        summary="Get goal dashboard changes",
+        description="Activities added or modified since a client-held version, plus current metrics"
+    )
+    async def get_goal_dashboard_changes(
+        goal_id: str,
+        since: int = Query(..., ge=0, description="`version` from the client's last dashboard or delta")
+    ) -> DashboardDeltaResponse:
+        """
+        Get only what changed in a goal's dashboard since `since`.
+        
+        `changes` holds the current version of every added or modified
+        activity; `removed_activity_ids` lists activities deleted (or moved
+        to another goal) since then.
+        
+        Cost is proportional to the number of changes, not to the goal's
+        history. When `since` is older than the retained change log (or from
+        before a restart) the response has `resync: true` and no changes;
+        the client should then refetch `GET /dashboard/{goal_id}`.
+        
+        **Query Parameters:**
+        - **since**: Version from the last full dashboard or delta response
+        """
+        try:
+            version, changed_ids = change_log.changes_since(goal_id, since)
+            
+            changes, removed_ids = [], []
+            for activity_id in changed_ids or ():
+                activity = repository.find_by_id(activity_id)
+                if activity is not None and activity.goal_id == goal_id:
+                    changes.append(ActivityResponse(**activity.to_dict()))
+                else:
+                    removed_ids.append(activity_id)
+            
+            if repository.count_by_goal_id(goal_id) == 0:
+                total_activities, aggregated_values, consistency_score, wellness_warning = 0, {}, 0.0, True
+            else:
+                metrics = metrics_cache.get_goal_metrics(goal_id)
+                total_activities = metrics.total_activities
+                aggregated_values = metrics.aggregated_values
+                consistency_score = metrics.consistency_score
+                wellness_warning = metrics.wellness_warning
+            
+            return DashboardDeltaResponse(
+                goal_id=goal_id,
+                since=since,
+                version=version,
+                resync=changed_ids is None,
                 total_activities=total_activities,
                 aggregated_values=aggregated_values,
-                activity_history=activity_history,
                 consistency_score=consistency_score,
-                wellness_warning=wellness_warning
+                wellness_warning=wellness_warning,
+                changes=changes,
+                removed_activity_ids=removed_ids
             )
             
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to generate dashboard: {str(e)}"
+                detail=f"Failed to generate dashboard changes: {str(e)}"
+            )
+    
+    @router.get(
+        "/{goal_id}/history",
+        response_model=ActivityHistoryResponse,
+        summary="Get goal activity history",
+        description="Retrieve a goal's history from the raw tier, the compacted tier, or both"
+    )
+    async def get_goal_history(
+        goal_id: str,
+        tier: Literal["all", "raw", "compacted"] = Query("all", description="Storage tier to read")
+    ) -> ActivityHistoryResponse:
+        """
+        Get a goal's activity history, sorted by timestamp.
+        
+        Activities older than the retention window are stored as daily
+        rollups: one entry per activity type per day, whose value is the
+        day's total and whose `count` is the number of folded activities.
+        
+        **Query Parameters:**
+        - **tier**: `raw` (recent activities), `compacted` (daily rollups) or `all`
+        """
+        try:
+            entries = []
+            for activity in repository.find_by_goal_id(goal_id):
+                compacted = isinstance(activity, DailyRollup)
+                if tier == "raw" and compacted or tier == "compacted" and not compacted:
+                    continue
+                entries.append(
+                    HistoryEntryResponse(
+                        activity_id=activity.activity_id,
+                        goal_id=activity.goal_id,
+                        activity_type=activity.activity_type,
+                        value=activity.value,
+                        timestamp=activity.timestamp.isoformat(),
+                        count=getattr(activity, "count", 1),
+                        compacted=compacted
+                    )
+                )
+            
+            return ActivityHistoryResponse(goal_id=goal_id, tier=tier, entries=entries)
+            
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to load history: {str(e)}"
             )
     
     return router
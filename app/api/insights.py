@@ -1,20 +1,40 @@
 """
 API endpoints for insights and recommendations.
 """
-from fastapi import APIRouter, HTTPException, status
-from app.schemas.activity_schema import InsightsResponse
+from datetime import date, datetime, timezone
+from typing import TYPE_CHECKING, Optional
+from fastapi import APIRouter, HTTPException, Query, status
+from app.schemas.activity_schema import (
+    InsightsResponse,
+    GoalInsightsRequest,
+    GoalInsights,
+    GoalInsightsResponse,
+    ValueDistribution,
+    ActivityStatisticsResponse
+)
 from app.repositories.activity_repository import ActivityRepository
 from app.services.analytics_service import AnalyticsService
 from app.services.recommendation_service import RecommendationService
+from app.services.metrics_cache import MetricsCache
+from app.services.statistics_service import StatisticsService
+from app.api.profiling import ProfiledRoute
 
+if TYPE_CHECKING:
+    # Only for annotations: importing it pulls in multiprocessing and the mmap
+    # segment store, which the default configuration never uses
+    from app.services.offload_service import GlobalAnalyticsOffloader
 
-router = APIRouter(prefix="/insights", tags=["Insights"])
+
+router = APIRouter(prefix="/insights", tags=["Insights"], route_class=ProfiledRoute)
 
 
 def create_insights_router(
     repository: ActivityRepository,
     analytics_service: AnalyticsService,
-    recommendation_service: RecommendationService
+    recommendation_service: RecommendationService,
+    metrics_cache: MetricsCache,
+    statistics_service: StatisticsService,
+    global_analytics: Optional["GlobalAnalyticsOffloader"] = None
 ) -> APIRouter:
     """
     Factory function to create insights router with dependency injection.
@@ -23,6 +43,10 @@ def create_insights_router(
         repository: ActivityRepository implementation
         analytics_service: AnalyticsService instance
         recommendation_service: RecommendationService instance
+        metrics_cache: MetricsCache holding precomputed global metrics
+        statistics_service: StatisticsService holding value sketches and active days
+        global_analytics: Optional GlobalAnalyticsOffloader computing global metrics
+            in a worker process (None computes them on the event loop)
         
     Returns:
         Configured APIRouter instance
@@ -50,20 +74,17 @@ def create_insights_router(
         - Opportunities for improvement
         """
         try:
-            # Fetch all activities across all goals
-            all_activities = repository.find_all()
-            
-            # Calculate global metrics
-            consistency_score = analytics_service.calculate_consistency_score(all_activities)
-            wellness_warning = analytics_service.check_wellness_warning(all_activities)
-            
-            # Generate personalized recommendation
-            recommendation = recommendation_service.generate_recommendation(all_activities)
+            # Global metrics and recommendation are precomputed in the background
+            # and only recomputed here after a write or when the window rolls over
+            if global_analytics is not None:
+                metrics = await global_analytics.get_global_metrics()
+            else:
+                metrics = metrics_cache.get_global_metrics()
             
             return InsightsResponse(
-                consistency_score=consistency_score,
-                wellness_warning=wellness_warning,
-                recommendation=recommendation
+                consistency_score=metrics.consistency_score,
+                wellness_warning=metrics.wellness_warning,
+                recommendation=metrics.recommendation
             )
             
         except Exception as e:
@@ -72,4 +93,101 @@ def create_insights_router(
                 detail=f"Failed to generate insights: {str(e)}"
             )
     
+    @router.post(
+        "/goals",
+        response_model=GoalInsightsResponse,
+        summary="Get per-goal insights",
+        description="Recommendations and activity gaps for many goals, computed in one pass"
+    )
+    async def get_goal_insights(request: GoalInsightsRequest) -> GoalInsightsResponse:
+        """
+        Get a recommendation and activity gaps for each goal.
+        
+        Activities are scanned once; each goal's feature record (type totals,
+        streak, 7-day Health minutes) is built during that scan and the
+        recommendation rules are then evaluated per record.
+        
+        **Body:**
+        - **goal_ids**: Goals to evaluate (omit for every goal with activity)
+        """
+        try:
+            now = datetime.now(timezone.utc)
+            if request.goal_ids is not None:
+                goal_ids = list(dict.fromkeys(request.goal_ids))
+                activities = (
+                    activity
+                    for goal_activities in repository.find_by_goal_ids(goal_ids).values()
+                    for activity in goal_activities
+                )
+            else:
+                goal_ids = None
+                activities = repository.iter_activities()
+            
+            features_by_goal = recommendation_service.extract_features_by_goal(activities, goal_ids, now)
+            
+            return GoalInsightsResponse(
+                generated_at=now.isoformat(),
+                goals=[
+                    GoalInsights(
+                        goal_id=goal_id,
+                        consistency_score=features.consistency_score,
+                        wellness_warning=features.wellness_warning,
+                        recommendation=recommendation_service.evaluate(features),
+                        activity_gaps=recommendation_service.evaluate_gaps(features)
+                    )
+                    for goal_id, features in features_by_goal.items()
+                ]
+            )
+            
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to generate goal insights: {str(e)}"
+            )
+    
+    @router.get(
+        "/statistics",
+        response_model=ActivityStatisticsResponse,
+        summary="Get activity statistics",
+        description="Approximate value percentiles per activity type and distinct active days"
+    )
+    async def get_activity_statistics(
+        goal_id: Optional[str] = Query(None, min_length=1, description="Restrict to one goal"),
+        start: Optional[date] = Query(None, description="First day counted for distinct active days"),
+        end: Optional[date] = Query(None, description="Last day counted for distinct active days")
+    ) -> ActivityStatisticsResponse:
+        """
+        Get value distributions and active-day counts from streaming sketches.
+        
+        Percentiles come from mergeable KLL sketches kept per goal and
+        activity type (rank error within ~1.7% with 99% probability) and
+        cover all values ever logged. Distinct active days are exact and
+        honor the optional inclusive `start`/`end` range.
+        """
+        if start is not None and end is not None and start > end:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="start must not be after end"
+            )
+        
+        distributions = {}
+        for activity_type, summary in statistics_service.value_quantiles(goal_id).items():
+            median, p90, p99 = summary["quantiles"].values()
+            distributions[activity_type] = ValueDistribution(
+                count=summary["count"],
+                min=summary["min"],
+                max=summary["max"],
+                median=median,
+                p90=p90,
+                p99=p99
+            )
+        
+        return ActivityStatisticsResponse(
+            goal_id=goal_id,
+            start=start.isoformat() if start else None,
+            end=end.isoformat() if end else None,
+            distinct_active_days=statistics_service.distinct_active_days(goal_id, start, end),
+            value_distributions=distributions
+        )
+    
     return router
@@ -0,0 +1,59 @@
+"""
+API endpoints for cross-goal leaderboards.
+"""
+from typing import Literal
+from fastapi import APIRouter, Query
+from app.schemas.activity_schema import LeaderboardEntry, LeaderboardResponse
+from app.services.leaderboard_service import LeaderboardService
+from app.api.profiling import ProfiledRoute
+
+
+router = APIRouter(prefix="/leaderboards", tags=["Leaderboards"], route_class=ProfiledRoute)
+
+
+def create_leaderboards_router(leaderboard_service: LeaderboardService) -> APIRouter:
+    """
+    Factory function to create leaderboards router with dependency injection.
+
+    Args:
+        leaderboard_service: LeaderboardService maintaining the ranked boards
+
+    Returns:
+        Configured APIRouter instance
+    """
+
+    @router.get(
+        "/{board}",
+        response_model=LeaderboardResponse,
+        summary="Get a leaderboard page",
+        description="Top goals by current streak, Learning minutes this week, or wellness risk"
+    )
+    async def get_leaderboard(
+        board: Literal["streaks", "learning-this-week", "wellness-risk"],
+        offset: int = Query(0, ge=0, description="Number of ranked entries to skip"),
+        limit: int = Query(10, ge=1, le=100, description="Maximum entries to return")
+    ) -> LeaderboardResponse:
+        """
+        Read one page of a leaderboard.
+
+        Boards are maintained incrementally on every save and on day
+        rollover, so a page costs O(limit) regardless of the number of goals.
+
+        **Boards:**
+        - **streaks**: Consecutive active days ending today or yesterday (UTC)
+        - **learning-this-week**: Learning minutes since Monday (UTC)
+        - **wellness-risk**: Goals under 150 Health minutes in the last 7 days, fewest first
+        """
+        total, page = leaderboard_service.top(board, offset, limit)
+        return LeaderboardResponse(
+            board=board,
+            total=total,
+            offset=offset,
+            limit=limit,
+            entries=[
+                LeaderboardEntry(rank=rank, goal_id=goal_id, score=score)
+                for rank, goal_id, score in page
+            ]
+        )
+
+    return router
@@ -0,0 +1,211 @@
+"""
+Request profiling at the HTTP layer: middleware, route class and debug endpoints.
+
+Profile a single request (token from the PROFILING_TOKEN setting):
+
+    curl -H "X-Profile-Token: $TOKEN" -H "X-Profile-Mode: cprofile" /dashboard/goal-1
+
+The token is accepted only as a header, never as a query parameter, so it
+does not end up in access logs, proxy logs or browser history.
+
+The response carries ``X-Profile-Id``; fetch the report from
+``GET /debug/profiles/{profile_id}``.
+"""
+import asyncio
+import time
+from functools import wraps
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.routing import APIRoute
+from app.schemas.activity_schema import (
+    ProfilingSettings,
+    ProfilingSettingsUpdate,
+    SlowRequestEntry,
+    StoredProfile
+)
+from app.services.profiling_service import (
+    PROFILE_MODES,
+    STAGE_ENDPOINT,
+    STAGE_SERIALIZATION,
+    RequestProfiler,
+    current_trace,
+    end_trace,
+    start_trace
+)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that traces sampled requests and runs on-demand profiles.
+
+    Requests that are neither sampled nor profiled pass straight through.
+    Timing stops when the response starts (headers sent).
+    """
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    def _requested_mode(self, scope) -> Optional[str]:
+        headers = dict(scope["headers"])
+        token = headers.get(b"x-profile-token")
+        mode = headers.get(b"x-profile-mode")
+        token = token.decode("latin-1") if token else None
+        mode = mode.decode("latin-1") if mode else None
+        if token is None or not self.profiler.authorize(token):
+            return None
+        return mode if mode in PROFILE_MODES else PROFILE_MODES[0]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = self._requested_mode(scope)
+        if mode is None and not self.profiler.should_trace():
+            await self.app(scope, receive, send)
+            return
+
+        method, path = scope["method"], scope["path"]
+        trace = start_trace()
+        handle = self.profiler.start_profile(mode) if mode else None
+        started = time.perf_counter()
+        recorded = False
+
+        def finish(status_code: int) -> Optional[str]:
+            nonlocal recorded, handle
+            recorded = True
+            total_ms = (time.perf_counter() - started) * 1000
+            profile_id = None
+            if handle is not None:
+                profile_id = self.profiler.finish_profile(handle, method, path, total_ms)
+                handle = None
+            self.profiler.record(method, path, status_code, total_ms, trace)
+            return profile_id
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start" and not recorded:
+                profile_id = finish(message["status"])
+                if profile_id is not None:
+                    message = dict(message)
+                    message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            if not recorded:
+                finish(500)
+            end_trace()
+
+
+def _timed_endpoint(endpoint):
+    if not asyncio.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        trace = current_trace()
+        if trace is None:
+            return await endpoint(*args, **kwargs)
+        trace.enter(STAGE_ENDPOINT)
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            trace.exit()
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRoute that splits traced route time into endpoint and serialization.
+
+    Time in the route handler outside the endpoint body (request parsing,
+    response-model validation and JSON encoding) is attributed to
+    ``serialization``.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def profiled_handler(request):
+            trace = current_trace()
+            if trace is None:
+                return await handler(request)
+            trace.enter(STAGE_SERIALIZATION)
+            try:
+                return await handler(request)
+            finally:
+                trace.exit()
+
+        return profiled_handler
+
+
+router = APIRouter(prefix="/debug", tags=["Debug"])
+
+
+def create_profiling_router(profiler: RequestProfiler) -> APIRouter:
+    """
+    Factory function to create the profiling debug router.
+
+    Every endpoint requires the ``X-Profile-Token`` header; without a
+    configured token the endpoints answer 404.
+
+    Args:
+        profiler: RequestProfiler shared with ProfilingMiddleware
+
+    Returns:
+        Configured APIRouter instance
+    """
+
+    async def require_token(x_profile_token: Optional[str] = Header(None)) -> None:
+        if profiler.token is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is not enabled")
+        if not profiler.authorize(x_profile_token):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid profiling token")
+
+    @router.get("/profiling", response_model=ProfilingSettings, dependencies=[Depends(require_token)])
+    async def get_profiling_settings() -> ProfilingSettings:
+        """Current profiling settings."""
+        return ProfilingSettings(**profiler.settings())
+
+    @router.put("/profiling", response_model=ProfilingSettings, dependencies=[Depends(require_token)])
+    async def update_profiling_settings(update: ProfilingSettingsUpdate) -> ProfilingSettings:
+        """Change the slow-request log settings at runtime (omitted fields are unchanged)."""
+        profiler.configure(**update.model_dump())
+        return ProfilingSettings(**profiler.settings())
+
+    @router.get(
+        "/profiling/slow",
+        response_model=list[SlowRequestEntry],
+        dependencies=[Depends(require_token)]
+    )
+    async def get_slow_requests() -> list[SlowRequestEntry]:
+        """Slowest traced requests with per-stage breakdowns, slowest first."""
+        return [SlowRequestEntry(**entry) for entry in profiler.slowest()]
+
+    @router.delete(
+        "/profiling/slow",
+        status_code=status.HTTP_204_NO_CONTENT,
+        dependencies=[Depends(require_token)]
+    )
+    async def clear_slow_requests() -> None:
+        """Reset the slow-request log."""
+        profiler.clear_slow_log()
+
+    @router.get(
+        "/profiles/{profile_id}",
+        response_model=StoredProfile,
+        dependencies=[Depends(require_token)]
+    )
+    async def get_profile(profile_id: str) -> StoredProfile:
+        """Report of an on-demand profile run."""
+        profile = profiler.profiles.get(profile_id)
+        if profile is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+        return StoredProfile(**profile)
+
+    return router
@@ -0,0 +1,114 @@
+"""
+API endpoints for live dashboard and insights updates via Server-Sent Events.
+"""
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from app.services.event_broker import (
+    DashboardEventBroker,
+    INSIGHTS_TOPIC,
+    dashboard_topic
+)
+
+
+router = APIRouter(prefix="/stream", tags=["Streaming"])
+
+# Comment frames keep idle connections open through proxies
+KEEPALIVE_INTERVAL_SECONDS = 15.0
+
+
+def _format_event(event: str, data: str) -> str:
+    """Encode a single Server-Sent Events frame."""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def _event_stream(
+    request: Request,
+    broker: DashboardEventBroker,
+    topic: str,
+    initial_event: str,
+    build_snapshot: Callable[[], Awaitable[BaseModel]]
+) -> AsyncIterator[str]:
+    """
+    Subscribe, yield the initial snapshot, then every pushed update until disconnect.
+
+    The subscription is taken inside the generator, before the snapshot is
+    built (so no write is missed), and released in ``finally``: a failed
+    snapshot or a client that leaves before the body starts leaves nothing
+    subscribed.
+    """
+    subscription = broker.subscribe(topic)
+    try:
+        snapshot = await build_snapshot()
+        yield _format_event(initial_event, snapshot.model_dump_json())
+        while not await request.is_disconnected():
+            try:
+                event, data = await asyncio.wait_for(
+                    subscription.next_event(), timeout=KEEPALIVE_INTERVAL_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield _format_event(event, data)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def _sse_response(stream: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def create_stream_router(broker: DashboardEventBroker) -> APIRouter:
+    """
+    Factory function to create streaming router with dependency injection.
+
+    Args:
+        broker: DashboardEventBroker instance
+
+    Returns:
+        Configured APIRouter instance
+    """
+
+    @router.get(
+        "/dashboard/{goal_id}",
+        summary="Stream goal dashboard updates",
+        description="Server-Sent Events stream of dashboard metrics and new activities for a goal"
+    )
+    async def stream_goal_dashboard(goal_id: str, request: Request) -> StreamingResponse:
+        """
+        Subscribe to live updates for a goal dashboard.
+
+        The first `dashboard` event carries the current metrics. Each later
+        event carries the refreshed metrics plus the activities appended since
+        the previous event. Bursts of writes are coalesced into one event.
+
+        If `resync` is true, intermediate events were dropped and the client
+        should reload `GET /dashboard/{goal_id}` for the full history.
+        """
+        async def snapshot() -> BaseModel:
+            return broker.build_dashboard_event(goal_id, [])
+
+        return _sse_response(_event_stream(request, broker, dashboard_topic(goal_id), "dashboard", snapshot))
+
+    @router.get(
+        "/insights",
+        summary="Stream optimization insights",
+        description="Server-Sent Events stream of global insights, pushed after new activity is logged"
+    )
+    async def stream_insights(request: Request) -> StreamingResponse:
+        """
+        Subscribe to live updates of the optimization insights.
+
+        Every `insights` event has the same shape as `GET /insights/optimization`.
+        With offloaded or sharded analytics the snapshot is computed off the
+        event loop, like the pushed events.
+        """
+        return _sse_response(_event_stream(request, broker, INSIGHTS_TOPIC, "insights", broker.insights_snapshot))
+
+    return router
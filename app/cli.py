@@ -0,0 +1,112 @@
+"""
+Command-line client for bulk activity export and import.
+
+Streams to and from a running service, so neither side buffers the dataset:
+
+    python -m app.cli export --format csv --goal-id career-growth-2024 -o out.csv
+    python -m app.cli import activities.ndjson
+"""
+import argparse
+import os
+import sys
+from typing import Iterator
+import httpx
+
+
+BASE_URL = os.getenv("LIFE_DESIGN_API_URL", "http://localhost:8000")
+CHUNK_SIZE = 1 << 16
+
+
+def _read_chunks(handle) -> Iterator[bytes]:
+    while True:
+        chunk = handle.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_command(args: argparse.Namespace) -> int:
+    """Stream an export to a file or stdout."""
+    params = {"format": args.format}
+    for name in ("goal_id", "start", "end"):
+        value = getattr(args, name)
+        if value is not None:
+            params[name] = value
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        with httpx.stream("GET", f"{args.url}/activities/export", params=params, timeout=None) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes(CHUNK_SIZE):
+                output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+    return 0
+
+
+def import_command(args: argparse.Namespace) -> int:
+    """Stream a file (or stdin) into the import endpoint."""
+    format = args.format
+    if format is None:
+        format = "csv" if args.input.endswith(".csv") else "ndjson"
+
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    try:
+        response = httpx.post(
+            f"{args.url}/activities/import",
+            params={"format": format},
+            content=_read_chunks(source),
+            headers={"Content-Type": "text/csv" if format == "csv" else "application/x-ndjson"},
+            timeout=None
+        )
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+
+    response.raise_for_status()
+    result = response.json()
+    print(
+        f"Imported {result['imported']} activities, rejected {result['rejected']}, "
+        f"skipped {result.get('duplicates', 0)} duplicates"
+    )
+    for error in result["errors"]:
+        print(f"  {error}", file=sys.stderr)
+    return 0 if result["rejected"] == 0 else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=BASE_URL, help=f"Service base URL (default: {BASE_URL})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Export activities as NDJSON or CSV")
+    export_parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    export_parser.add_argument("--goal-id", help="Only export this goal")
+    export_parser.add_argument("--start", help="Inclusive ISO-8601 lower bound")
+    export_parser.add_argument("--end", help="Exclusive ISO-8601 upper bound")
+    export_parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    export_parser.set_defaults(handler=export_command)
+
+    import_parser = commands.add_parser("import", help="Import activities from NDJSON or CSV")
+    import_parser.add_argument("input", help="Input file, or - for stdin")
+    import_parser.add_argument("--format", choices=("ndjson", "csv"), help="Defaults from the file extension")
+    import_parser.set_defaults(handler=import_command)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except httpx.ConnectError:
+        print(f"Error: could not connect to {args.url}", file=sys.stderr)
+        return 2
+    except httpx.HTTPStatusError as e:
+        print(f"Error: {e.response.status_code} {e.response.text}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,14 +3,38 @@ Life Design Backend Service - Main Application Entry Point
 
 A FastAPI microservice for growth journaling and productivity insights.
 """
+import time
+
+# Taken before framework imports so the startup profile includes them
+BOOT_STARTED = time.perf_counter()
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from datetime import datetime, timedelta, timezone
 from app.repositories.in_memory_repository import InMemoryActivityRepository
 from app.services.analytics_service import AnalyticsService
 from app.services.recommendation_service import RecommendationService
-from app.api.activities import create_activities_router
-from app.api.dashboard import create_dashboard_router
-from app.api.insights import create_insights_router
+from app.services.event_broker import DashboardEventBroker
+from app.services.metrics_cache import MetricsCache
+from app.services.scheduler import BackgroundScheduler
+from app.services.idempotency_service import IdempotencyIndex
+from app.services.leaderboard_service import LeaderboardService
+from app.services.change_log import GoalChangeLog
+from app.services.aggregation_service import AggregationService
+from app.services.statistics_service import StatisticsService
+from app.services.startup import HistoryLoader, StartupProfile
+from app.services.profiling_service import (
+    RequestProfiler,
+    instrument,
+    STAGE_REPOSITORY,
+    STAGE_ANALYTICS,
+    STAGE_RECOMMENDATION
+)
+from app.api.profiling import ProfilingMiddleware
 
 
 # Application metadata
@@ -42,19 +66,119 @@ A production-ready backend microservice that powers a Life Design Dashboard.
 """
 APP_VERSION = "1.0.0"
 
+# Background maintenance of precomputed metrics
+METRICS_REFRESH_INTERVAL_SECONDS = 60
+METRICS_PRECOMPUTE_INTERVAL_SECONDS = 5
+METRICS_IDLE_THRESHOLD_SECONDS = 2
+
+# Ingestion mode: "sync" commits inside the request, "async" queues writes
+INGESTION_MODE = os.getenv("INGESTION_MODE", "sync").lower()
+INGESTION_QUEUE_SIZE = os.getenv("INGESTION_QUEUE_SIZE")
+INGESTION_BATCH_SIZE = os.getenv("INGESTION_BATCH_SIZE")
+
+# Sealed history: activities older than SEAL_AFTER_DAYS move to mmap segments in SEGMENT_DIR
+SEGMENT_DIR = os.getenv("SEGMENT_DIR")
+SEAL_AFTER_DAYS = int(os.getenv("SEAL_AFTER_DAYS", "8"))
+
+# Raw activities older than this many days are compacted into daily rollups (0 = keep all)
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "0"))
+
+# Fast boot: answer requests while persisted history loads in the background
+# (poll /ready); otherwise startup blocks until loading and warm-up finish
+FAST_BOOT = os.getenv("FAST_BOOT", "0").lower() in ("1", "true", "yes")
+
+# Request profiling: on-demand runs need PROFILING_TOKEN; the slow-request log
+# traces PROFILING_SAMPLE_RATE of requests (both adjustable under /debug/profiling)
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN") or None
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0.01"))
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "50"))
+
+# Admission control (opt-in, ADMISSION_RATE > 0): per-client token buckets
+# (cost units per second / burst) and a global cap on concurrently running
+# expensive requests. Clients are keyed by the X-Forwarded-For hop appended by
+# the outermost of ADMISSION_TRUSTED_PROXIES proxies (0 = socket peer address,
+# the default, so clients cannot pick their bucket with a forged header)
+ADMISSION_RATE = float(os.getenv("ADMISSION_RATE", "0"))
+ADMISSION_BURST = float(os.getenv("ADMISSION_BURST", "100"))
+ADMISSION_MAX_EXPENSIVE = int(os.getenv("ADMISSION_MAX_EXPENSIVE", "4"))
+ADMISSION_TRUSTED_PROXIES = int(os.getenv("ADMISSION_TRUSTED_PROXIES", "0"))
+
+# Global analytics run in this many worker processes over shared-memory
+# snapshots, keeping the event loop free (0 = compute on the event loop, the
+# default: small single-core hosts gain nothing from an extra process)
+ANALYTICS_WORKERS = int(os.getenv("ANALYTICS_WORKERS", "0"))
+
+# Partition in-memory activities by goal across this many shard processes;
+# global metrics are then merged from per-shard partials (0 = one process,
+# ignored with SEGMENT_DIR)
+SHARDS = int(os.getenv("SHARDS", "0"))
+
+startup_profile = StartupProfile(BOOT_STARTED)
+startup_profile.mark("imports")
+
+
+async def load_history_and_start_jobs() -> None:
+    """Rebuild derived indexes from persisted history, warm up, then start jobs."""
+    await history_loader.run(repository.iter_persisted_activities())
+    scheduler.start()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background jobs on startup and stop them on shutdown."""
+    if ingestion_queue is not None:
+        ingestion_queue.start()
+    loader_task = None
+    if FAST_BOOT:
+        loader_task = asyncio.create_task(load_history_and_start_jobs())
+    else:
+        await load_history_and_start_jobs()
+    yield
+    if loader_task is not None and not loader_task.done():
+        loader_task.cancel()
+        try:
+            await loader_task
+        except asyncio.CancelledError:
+            pass
+    if ingestion_queue is not None:
+        await ingestion_queue.stop()
+    await scheduler.stop()
+    if global_analytics is not None:
+        global_analytics.shutdown()
+    if SEGMENT_DIR or SHARDS:
+        repository.close()
+
 
 # Initialize application
 app = FastAPI(
     title=APP_TITLE,
     description=APP_DESCRIPTION,
     version=APP_VERSION,
+    lifespan=lifespan,
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json"
 )
 
 
-# Configure CORS
+# Request tracing and on-demand profiling (see app/api/profiling.py)
+request_profiler = RequestProfiler(
+    token=PROFILING_TOKEN,
+    sample_rate=PROFILING_SAMPLE_RATE,
+    slow_threshold_ms=SLOW_REQUEST_THRESHOLD_MS
+)
+app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+
+admission_controller = None
+if ADMISSION_RATE > 0:
+    from app.api.admission import AdmissionMiddleware
+    from app.services.admission_service import AdmissionController
+    admission_controller = AdmissionController(ADMISSION_RATE, ADMISSION_BURST, ADMISSION_MAX_EXPENSIVE)
+    app.add_middleware(
+        AdmissionMiddleware, controller=admission_controller, trusted_proxies=ADMISSION_TRUSTED_PROXIES
+    )
+
+# Configure CORS (added last so it is outermost and also covers 429 responses)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -70,15 +194,121 @@ app.add_middleware(
 
 
 # Dependency Injection: Initialize services and repositories
-repository = InMemoryActivityRepository()
-analytics_service = AnalyticsService()
-recommendation_service = RecommendationService(analytics_service)
+# Optional engines are imported only when configured
+if SEGMENT_DIR:
+    from app.repositories.segmented_repository import SegmentedActivityRepository
+    repository = SegmentedActivityRepository(SEGMENT_DIR)
+elif SHARDS:
+    from app.repositories.sharded_repository import ShardedActivityRepository
+    repository = ShardedActivityRepository(SHARDS)
+else:
+    repository = InMemoryActivityRepository()
+instrument(repository, STAGE_REPOSITORY)
+startup_profile.mark("repository")
+
+analytics_service = instrument(AnalyticsService(), STAGE_ANALYTICS)
+recommendation_service = instrument(RecommendationService(analytics_service), STAGE_RECOMMENDATION)
+metrics_cache = MetricsCache(repository, analytics_service, recommendation_service)
+global_analytics = None
+if SHARDS and not SEGMENT_DIR:
+    from app.services.offload_service import ShardedGlobalAnalytics
+    global_analytics = ShardedGlobalAnalytics(repository, analytics_service, metrics_cache)
+elif ANALYTICS_WORKERS > 0:
+    from app.services.offload_service import GlobalAnalyticsOffloader
+    global_analytics = GlobalAnalyticsOffloader(repository, analytics_service, metrics_cache, ANALYTICS_WORKERS)
+event_broker = DashboardEventBroker(
+    repository, analytics_service, recommendation_service, global_analytics=global_analytics
+)
+ingestion_queue = None
+if INGESTION_MODE == "async":
+    from app.services.ingestion_service import IngestionQueue
+    ingestion_queue = IngestionQueue(
+        repository,
+        int(INGESTION_QUEUE_SIZE or IngestionQueue.DEFAULT_MAX_SIZE),
+        int(INGESTION_BATCH_SIZE or IngestionQueue.DEFAULT_BATCH_SIZE)
+    )
+idempotency_index = IdempotencyIndex(repository)
+if ingestion_queue is not None:
+    ingestion_queue.add_failure_listener(idempotency_index.on_ingestion_failed)
+retention_service = None
+if RETENTION_DAYS:
+    from app.services.retention_service import RetentionService
+    retention_service = RetentionService(repository, RETENTION_DAYS)
+leaderboard_service = LeaderboardService(repository, analytics_service)
+statistics_service = StatisticsService(repository)
+change_log = GoalChangeLog(repository)
+aggregation_service = AggregationService(repository)
+
+# Derived indexes are rebuilt from persisted history during startup
+history_loader = HistoryLoader(startup_profile)
+history_loader.add_consumer(leaderboard_service.load)
+history_loader.add_consumer(statistics_service.load)
+history_loader.add_consumer(idempotency_index.load)
+if global_analytics is not None:
+    history_loader.add_consumer(global_analytics.load)
+    history_loader.add_warmup(global_analytics.get_global_metrics)
+else:
+    history_loader.add_warmup(metrics_cache.get_global_metrics)
+history_loader.add_warmup(idempotency_index.mark_warmed)
+startup_profile.mark("services")
+
+
+# Time-driven jobs: wellness windows age out and days roll over without writes
+scheduler = BackgroundScheduler()
+scheduler.add_interval_job("evict-expired-metrics", METRICS_REFRESH_INTERVAL_SECONDS, metrics_cache.evict_expired)
+scheduler.add_daily_job("day-rollover", metrics_cache.evict_all)
+scheduler.add_interval_job(
+    "expire-leaderboard-wellness", METRICS_REFRESH_INTERVAL_SECONDS, leaderboard_service.expire_wellness_windows
+)
+scheduler.add_daily_job("leaderboard-rollover", leaderboard_service.rollover)
+scheduler.add_interval_job(
+    "precompute-active-goals",
+    METRICS_PRECOMPUTE_INTERVAL_SECONDS,
+    lambda: metrics_cache.precompute_active(METRICS_IDLE_THRESHOLD_SECONDS)
+)
+if global_analytics is not None:
+    scheduler.add_interval_job(
+        "precompute-global-metrics",
+        METRICS_PRECOMPUTE_INTERVAL_SECONDS,
+        lambda: global_analytics.precompute(METRICS_IDLE_THRESHOLD_SECONDS)
+    )
+if SEGMENT_DIR:
+    scheduler.add_daily_job(
+        "seal-history",
+        lambda: repository.seal_before(datetime.now(timezone.utc) - timedelta(days=SEAL_AFTER_DAYS))
+    )
+    scheduler.add_daily_job("compact-segments", repository.compact_segments)
+if retention_service is not None:
+    # Compact listeners invalidate the change log and aggregation cache per goal
+    scheduler.add_daily_job("compact-old-activities", retention_service.compact)
+
 
+# Register routers with dependency injection; router modules are imported
+# here so the startup profile attributes them to "routers", and optional
+# ones only when their feature is configured
+from app.api.activities import create_activities_router
+from app.api.aggregations import create_aggregations_router
+from app.api.bulk import create_bulk_router
+from app.api.dashboard import create_dashboard_router
+from app.api.insights import create_insights_router
+from app.api.leaderboards import create_leaderboards_router
+from app.api.profiling import create_profiling_router
+from app.api.stream import create_stream_router
 
-# Register routers with dependency injection
-app.include_router(create_activities_router(repository))
-app.include_router(create_dashboard_router(repository, analytics_service))
-app.include_router(create_insights_router(repository, analytics_service, recommendation_service))
+app.include_router(create_bulk_router(repository))
+app.include_router(create_activities_router(repository, ingestion_queue, idempotency_index))
+app.include_router(create_dashboard_router(repository, analytics_service, metrics_cache, change_log))
+app.include_router(create_insights_router(
+    repository, analytics_service, recommendation_service, metrics_cache, statistics_service, global_analytics
+))
+app.include_router(create_stream_router(event_broker))
+app.include_router(create_leaderboards_router(leaderboard_service))
+app.include_router(create_aggregations_router(aggregation_service))
+app.include_router(create_profiling_router(request_profiler))
+if admission_controller is not None:
+    from app.api.admission import create_admission_router
+    app.include_router(create_admission_router(admission_controller))
+startup_profile.mark("routers")
 
 
 @app.get("/", tags=["Health"])
@@ -103,8 +333,26 @@ async def health_check():
     """
     return {
         "status": "healthy",
-        "total_activities": len(repository)
+        "total_activities": len(repository),
+        "ingestion_queue_depth": ingestion_queue.depth() if ingestion_queue is not None else 0,
+        "ready": history_loader.ready
+    }
+
+
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    """
+    Readiness endpoint: 200 once persisted history is loaded and warm.
+    
+    Returns 503 while a fast boot is still loading; the body always carries
+    the startup profile (per-phase milliseconds).
+    """
+    body = {
+        "status": "ready" if history_loader.ready else "loading",
+        "loaded_activities": history_loader.loaded_activities,
+        "startup": startup_profile.to_dict()
     }
+    return JSONResponse(body, status_code=200 if history_loader.ready else 503)
 
 
 if __name__ == "__main__":
@@ -3,7 +3,7 @@ Activity domain model representing user growth journal entries.
 """
 from datetime import datetime
 from typing import Literal
-from uuid import uuid4
+from app.utils.ids import new_activity_id
 
 
 ActivityType = Literal["Learning", "Health", "Fitness", "Other"]
@@ -24,7 +24,7 @@ class Activity:
         timestamp: datetime,
         activity_id: str | None = None
     ):
-        self.activity_id = activity_id or str(uuid4())
+        self.activity_id = activity_id or new_activity_id()
         self.goal_id = goal_id
         self.activity_type = activity_type
         self.value = value
@@ -0,0 +1,62 @@
+"""
+Daily rollup model representing compacted historical activities.
+"""
+from datetime import date, datetime, timezone
+from app.models.activity import Activity, ActivityType
+
+
+class DailyRollup(Activity):
+    """
+    Compacted stand-in for all activities of one type logged on one day.
+
+    A rollup behaves like an Activity whose value is the day's total, so
+    type totals, weekly totals and day-based streaks computed over a mix of
+    raw activities and rollups are identical to those over the raw rows.
+    The day is the activities' UTC calendar date (as used by the streak and
+    week calculations) and the timestamp is UTC midnight of that day, the
+    earliest instant any folded activity can have, so whatever offsets the
+    activities were logged with the rollup sorts no later than the rows it
+    folds. The smallest and largest folded values are kept for min/max
+    aggregations.
+    """
+
+    def __init__(
+        self,
+        goal_id: str,
+        activity_type: ActivityType,
+        day: date,
+        value: float = 0.0,
+        count: int = 0
+    ):
+        super().__init__(
+            goal_id=goal_id,
+            activity_type=activity_type,
+            value=value,
+            timestamp=datetime(day.year, day.month, day.day, tzinfo=timezone.utc),
+            activity_id=f"rollup:{goal_id}:{day.isoformat()}:{activity_type}"
+        )
+        self.day = day
+        self.count = count
+        self.min_value = value if count == 1 else None
+        self.max_value = value if count == 1 else None
+
+    def add(self, activity: Activity) -> None:
+        """Fold a raw activity into this rollup."""
+        self.value += activity.value
+        self.count += 1
+        if self.min_value is None or activity.value < self.min_value:
+            self.min_value = activity.value
+        if self.max_value is None or activity.value > self.max_value:
+            self.max_value = activity.value
+
+    def __repr__(self) -> str:
+        return (
+            f"DailyRollup(goal={self.goal_id}, type={self.activity_type}, "
+            f"day={self.day.isoformat()}, value={self.value}, count={self.count})"
+        )
+
+    def to_dict(self) -> dict:
+        """Convert rollup to dictionary representation."""
+        data = super().to_dict()
+        data["count"] = self.count
+        return data
@@ -5,13 +5,87 @@ This abstraction allows easy replacement of storage backends
 (in-memory, PostgreSQL, MongoDB, etc.) without changing business logic.
 """
 from abc import ABC, abstractmethod
-from typing import List
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 from app.models.activity import Activity
+from app.models.rollup import DailyRollup
+from app.utils.date_helpers import to_utc
+
+
+# Callback invoked with every activity persisted through ``save``
+SaveListener = Callable[[Activity], None]
+
+# Callback invoked with every activity removed by ``delete`` or replaced by a save
+DeleteListener = Callable[[Activity], None]
+
+# Callback invoked per goal after compaction with (goal_id, raw activities
+# folded, rollups they were folded into)
+CompactListener = Callable[[str, List[Activity], List[DailyRollup]], None]
 
 
 class ActivityRepository(ABC):
     """Abstract base class defining the contract for activity storage."""
     
+    def __init__(self):
+        self._save_listeners: List[SaveListener] = []
+        self._delete_listeners: List[DeleteListener] = []
+        self._compact_listeners: List[CompactListener] = []
+    
+    def add_save_listener(self, listener: SaveListener) -> None:
+        """
+        Register a callback to be notified after each successful save.
+        
+        Listeners run synchronously on the writer's thread and must be cheap;
+        anything expensive should be deferred (e.g. scheduled on the event loop).
+        
+        Args:
+            listener: Callable receiving the saved Activity
+        """
+        self._save_listeners.append(listener)
+    
+    def _notify_save(self, activity: Activity) -> None:
+        """Dispatch a saved activity to all registered listeners."""
+        for listener in self._save_listeners:
+            listener(activity)
+    
+    def add_delete_listener(self, listener: DeleteListener) -> None:
+        """
+        Register a callback to be notified after an activity is removed.
+        
+        Listeners receive the removed Activity so derived structures can
+        subtract it. An update is delivered as a delete of the old version
+        followed by a save of the new one, and saving over an existing id
+        does the same, so a listener pair keeps any derived state exact.
+        
+        Args:
+            listener: Callable receiving the removed Activity
+        """
+        self._delete_listeners.append(listener)
+    
+    def _notify_delete(self, activity: Activity) -> None:
+        """Dispatch a removed activity to all registered listeners."""
+        for listener in self._delete_listeners:
+            listener(activity)
+    
+    def add_compact_listener(self, listener: CompactListener) -> None:
+        """
+        Register a callback to be notified after a goal's rows are compacted.
+        
+        Compaction keeps totals, counts and day-based metrics exact, so it
+        is not reported as deletes and saves; listeners whose state depends
+        on the individual rows (result caches, change logs, row mirrors)
+        use this notification instead.
+        
+        Args:
+            listener: Callable receiving (goal_id, folded activities, rollups)
+        """
+        self._compact_listeners.append(listener)
+    
+    def _notify_compact(self, goal_id: str, folded: List[Activity], rollups: List[DailyRollup]) -> None:
+        """Dispatch one goal's compaction to all registered listeners."""
+        for listener in self._compact_listeners:
+            listener(goal_id, folded, rollups)
+    
     @abstractmethod
     def save(self, activity: Activity) -> Activity:
         """
@@ -25,6 +99,67 @@ class ActivityRepository(ABC):
         """
         pass
     
+    def save_many(self, activities: List[Activity]) -> List[Activity]:
+        """
+        Persist a batch of activities.
+        
+        The default implementation saves one at a time; storage backends
+        should override it with a cheaper bulk write where possible.
+        
+        Args:
+            activities: Activity instances to save
+            
+        Returns:
+            The saved activity instances
+        """
+        return [self.save(activity) for activity in activities]
+    
+    @abstractmethod
+    def delete(self, activity_id: str) -> Optional[Activity]:
+        """
+        Remove an activity.
+        
+        Activities already folded into daily rollups cannot be removed
+        individually and are reported as missing.
+        
+        Args:
+            activity_id: Unique identifier of the activity
+            
+        Returns:
+            The removed activity, or None if it does not exist
+        """
+        pass
+    
+    def update(self, activity: Activity) -> Optional[Activity]:
+        """
+        Replace an existing activity (matched by ``activity_id``).
+        
+        Implemented as ``delete`` followed by ``save``, so listeners see the
+        old version removed and the new one added.
+        
+        Args:
+            activity: New version of the activity
+            
+        Returns:
+            The saved activity, or None if no activity has that id
+        """
+        if self.delete(activity.activity_id) is None:
+            return None
+        return self.save(activity)
+    
+    @abstractmethod
+    def find_by_id(self, activity_id: str) -> Optional[Activity]:
+        """
+        Retrieve a single activity by its identifier.
+        
+        Args:
+            activity_id: Unique identifier of the activity
+            
+        Returns:
+            The activity, or None if it does not exist
+        """
+        pass
+    
     @abstractmethod
     def find_by_goal_id(self, goal_id: str) -> List[Activity]:
         """
@@ -38,6 +173,17 @@ class ActivityRepository(ABC):
         """
         pass
     
+    def iter_persisted_activities(self) -> Iterator[Activity]:
+        """
+        Iterate the activities this repository loaded from durable storage.
+        
+        Used at startup to rebuild derived, save-listener maintained indexes.
+        The set is fixed when called, so activities saved afterwards (which
+        listeners already see) are never yielded twice. Purely in-memory
+        repositories start empty and yield nothing.
+        """
+        return iter(())
+    
     @abstractmethod
     def find_all(self) -> List[Activity]:
         """
@@ -48,6 +194,49 @@ class ActivityRepository(ABC):
         """
         pass
     
+    def find_by_goal_ids(self, goal_ids: Iterable[str]) -> Dict[str, List[Activity]]:
+        """
+        Retrieve activities for several goals in a single pass.
+        
+        Args:
+            goal_ids: Goal identifiers to fetch
+            
+        Returns:
+            Mapping of every requested goal_id to its activities sorted by
+            timestamp (empty list for unknown goals)
+        """
+        result: Dict[str, List[Activity]] = {goal_id: [] for goal_id in goal_ids}
+        for activity in self.find_all():
+            goal_activities = result.get(activity.goal_id)
+            if goal_activities is not None:
+                goal_activities.append(activity)
+        return result
+    
+    def iter_activities(
+        self,
+        goal_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Iterator[Activity]:
+        """
+        Lazily iterate activities, optionally filtered by goal and time range.
+        
+        Intended for streaming (export, batch jobs): implementations should
+        avoid materializing the whole result. Order is by goal, then time.
+        
+        Args:
+            goal_id: Restrict to one goal
+            start: Inclusive lower bound on timestamp (UTC if naive)
+            end: Exclusive upper bound on timestamp (UTC if naive)
+        """
+        activities = self.find_by_goal_id(goal_id) if goal_id is not None else self.find_all()
+        start = to_utc(start) if start else None
+        end = to_utc(end) if end else None
+        for activity in activities:
+            timestamp = to_utc(activity.timestamp)
+            if (start is None or timestamp >= start) and (end is None or timestamp < end):
+                yield activity
+    
     @abstractmethod
     def count_by_goal_id(self, goal_id: str) -> int:
         """
@@ -61,6 +250,22 @@ class ActivityRepository(ABC):
         """
         pass
     
+    def compact_before(self, cutoff: datetime) -> int:
+        """
+        Fold raw activities older than ``cutoff`` into daily rollups.
+        
+        After compaction the ``find_*`` methods return DailyRollup entries in
+        place of the folded rows, and compact listeners are notified per goal. Backends without a compacted tier keep all
+        raw rows and return 0.
+        
+        Args:
+            cutoff: Activities strictly before this UTC time are compacted
+            
+        Returns:
+            Number of raw activities compacted
+        """
+        return 0
+    
     @abstractmethod
     def clear(self) -> None:
         """Clear all activities from storage (useful for testing)."""
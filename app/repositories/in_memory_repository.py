@@ -4,57 +4,261 @@ In-memory implementation of the ActivityRepository interface.
 This implementation uses Python data structures for storage.
 Thread-safe operations can be added using threading.Lock if needed.
 """
-from typing import List
+from bisect import bisect_left, insort
+from heapq import merge
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
 from app.models.activity import Activity
+from app.models.rollup import DailyRollup
 from app.repositories.activity_repository import ActivityRepository
+from app.utils.date_helpers import to_utc, utc_date
+
+
+def _timestamp_key(activity: Activity):
+    """Sort key placing naive and aware timestamps on one UTC timeline."""
+    return to_utc(activity.timestamp)
 
 
 class InMemoryActivityRepository(ActivityRepository):
     """
     In-memory storage implementation using a dictionary.
     
-    Data structure: {activity_id: Activity}
+    Data structure: {activity_id: Activity} for raw activities
+    Derived index:  {goal_id: [Activity | DailyRollup, ...]} sorted by timestamp
+    Compacted tier: {goal_id: {(day, activity_type): DailyRollup}}
     Optimized for fast lookups and filtering operations.
     """
     
     def __init__(self):
+        super().__init__()
         self._storage: dict[str, Activity] = {}
+        self._goal_index: dict[str, list[Activity]] = {}
+        self._goal_counts: dict[str, int] = {}
+        self._rollups: dict[str, dict[tuple, DailyRollup]] = {}
+        self._compacted_count = 0
     
     def save(self, activity: Activity) -> Activity:
         """Store activity in memory using activity_id as key."""
+        previous = self._store(activity)
+        if previous is not None:
+            self._notify_delete(previous)
+        self._notify_save(activity)
+        return activity
+    
+    def save_many(self, activities: List[Activity]) -> List[Activity]:
+        """
+        Store a batch of activities, then notify listeners.
+        
+        New rows are grouped and sorted per goal, then appended to (or merged
+        with) each goal index in one pass instead of one insertion per row. All rows are visible to readers before any
+        listener runs, so listeners observe a consistent post-batch state.
+        Rows replaced by the batch are reported to delete listeners first.
+        """
+        added: dict[str, list[Activity]] = {}
+        replaced: list[Activity] = []
+        for activity in activities:
+            previous = self._storage.get(activity.activity_id)
+            if previous is not None and self._unindex(previous, added):
+                replaced.append(previous)
+            self._storage[activity.activity_id] = activity
+            added.setdefault(activity.goal_id, []).append(activity)
+        
+        for goal_id, goal_activities in added.items():
+            goal_activities.sort(key=_timestamp_key)
+            entries = self._goal_index.setdefault(goal_id, [])
+            if not entries or _timestamp_key(entries[-1]) <= _timestamp_key(goal_activities[0]):
+                entries.extend(goal_activities)
+            elif len(goal_activities) * len(entries).bit_length() < len(entries):
+                # Few late rows into a long history: binary insertion is cheaper
+                for activity in goal_activities:
+                    insort(entries, activity, key=_timestamp_key)
+            else:
+                # Out-of-order batch: linear merge of two sorted runs
+                self._goal_index[goal_id] = list(merge(entries, goal_activities, key=_timestamp_key))
+            self._goal_counts[goal_id] = self._goal_counts.get(goal_id, 0) + len(goal_activities)
+        
+        for previous in replaced:
+            self._notify_delete(previous)
+        for activity in activities:
+            if self._storage.get(activity.activity_id) is activity:
+                self._notify_save(activity)
+        return activities
+    
+    def _unindex(self, previous: Activity, pending: dict[str, list[Activity]]) -> bool:
+        """
+        Remove an overwritten activity from the goal index (or the pending batch).
+        
+        Returns:
+            True if it was committed before (listeners have seen it)
+        """
+        batch = pending.get(previous.goal_id)
+        if batch and previous in batch:
+            batch.remove(previous)
+            return False
+        self._remove_from_index(previous)
+        return True
+    
+    def _remove_from_index(self, activity: Activity) -> None:
+        """
+        Remove one activity from its goal index.
+        
+        Time complexity: O(log k) search (plus same-timestamp ties) + O(k)
+        memmove shift, mirroring insertion
+        """
+        entries = self._goal_index[activity.goal_id]
+        position = bisect_left(entries, _timestamp_key(activity), key=_timestamp_key)
+        while entries[position] is not activity:
+            position += 1
+        del entries[position]
+        self._goal_counts[activity.goal_id] -= 1
+    
+    def _store(self, activity: Activity) -> Optional[Activity]:
+        """
+        Insert into primary storage and the per-goal time index.
+        
+        Time complexity: O(log k) search + O(k) shift where k is the goal's
+        activity count; appends in time order hit the cheap end of the list.
+        
+        Returns:
+            The activity previously stored under the same id, if any
+        """
+        previous = self._storage.get(activity.activity_id)
+        if previous is not None:
+            self._remove_from_index(previous)
+        
         self._storage[activity.activity_id] = activity
+        insort(self._goal_index.setdefault(activity.goal_id, []), activity, key=_timestamp_key)
+        self._goal_counts[activity.goal_id] = self._goal_counts.get(activity.goal_id, 0) + 1
+        return previous
+    
+    def delete(self, activity_id: str) -> Optional[Activity]:
+        """
+        Remove a raw activity from storage and its goal index.
+        
+        Time complexity: O(log k) search + O(k) shift, like insertion
+        """
+        activity = self._storage.pop(activity_id, None)
+        if activity is None:
+            return None
+        self._remove_from_index(activity)
+        self._notify_delete(activity)
         return activity
     
+    def find_by_id(self, activity_id: str) -> Optional[Activity]:
+        """Look up a raw activity by id in O(1)."""
+        return self._storage.get(activity_id)
+    
     def find_by_goal_id(self, goal_id: str) -> List[Activity]:
         """
-        Filter activities by goal_id and sort by timestamp.
+        Return a goal's activities and rollups sorted by timestamp.
         
-        Time complexity: O(n log n) where n is total activities
-        Space complexity: O(k) where k is matching activities
+        Time complexity: O(k) where k is matching entries
+        Space complexity: O(k) for the returned copy
         """
-        matching_activities = [
-            activity for activity in self._storage.values()
-            if activity.goal_id == goal_id
-        ]
-        # Sort by timestamp (oldest first)
-        return sorted(matching_activities, key=lambda a: a.timestamp)
+        return list(self._goal_index.get(goal_id, ()))
+    
+    def find_by_goal_ids(self, goal_ids: Iterable[str]) -> Dict[str, List[Activity]]:
+        """
+        Fetch several goals straight from the goal index.
+        
+        Time complexity: O(sum of k) over the requested goals, no full scan
+        """
+        return {goal_id: self.find_by_goal_id(goal_id) for goal_id in goal_ids}
     
     def find_all(self) -> List[Activity]:
-        """Return all activities sorted by timestamp."""
-        return sorted(self._storage.values(), key=lambda a: a.timestamp)
+        """Return all activities and rollups sorted by timestamp."""
+        rollups = [
+            rollup
+            for goal_rollups in self._rollups.values()
+            for rollup in goal_rollups.values()
+        ]
+        return sorted([*self._storage.values(), *rollups], key=_timestamp_key)
+    
+    def iter_activities(
+        self,
+        goal_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Iterator[Activity]:
+        """
+        Stream activities goal by goal from the time-sorted goal index.
+        
+        The time range is located by binary search; only one goal's slice
+        is copied at a time, so memory stays O(largest goal).
+        """
+        goal_ids = [goal_id] if goal_id is not None else list(self._goal_index)
+        for current_goal in goal_ids:
+            entries = self._goal_index.get(current_goal, [])
+            lo = bisect_left(entries, to_utc(start), key=_timestamp_key) if start else 0
+            hi = bisect_left(entries, to_utc(end), key=_timestamp_key) if end else len(entries)
+            yield from entries[lo:hi]
     
     def count_by_goal_id(self, goal_id: str) -> int:
         """
-        Count activities for a specific goal.
+        Count activities for a specific goal, including compacted ones.
         
-        Time complexity: O(n) where n is total activities
+        Time complexity: O(1)
+        """
+        return self._goal_counts.get(goal_id, 0)
+    
+    def compact_before(self, cutoff: datetime) -> int:
         """
-        return sum(1 for activity in self._storage.values() if activity.goal_id == goal_id)
+        Fold raw activities before ``cutoff`` into per-goal daily rollups.
+        
+        Only each goal's prefix older than the cutoff is touched; it is
+        located by binary search on the time-sorted goal index. Rollups
+        created by this pass are merged into the goal's (already sorted)
+        existing rollups rather than re-sorting them.
+        
+        Time complexity: O(g log k) to locate the prefixes, plus
+        O(k + c log c) per goal with c rows to compact (one linear rebuild
+        of its index)
+        """
+        cutoff = to_utc(cutoff)
+        compacted = 0
+        
+        for goal_id, entries in self._goal_index.items():
+            split = bisect_left(entries, cutoff, key=_timestamp_key)
+            old_raw = [entry for entry in entries[:split] if not isinstance(entry, DailyRollup)]
+            if not old_raw:
+                continue
+            
+            goal_rollups = self._rollups.setdefault(goal_id, {})
+            touched: dict[tuple, DailyRollup] = {}
+            created: list[DailyRollup] = []
+            for activity in old_raw:
+                day = utc_date(activity.timestamp)
+                key = (day, activity.activity_type)
+                rollup = goal_rollups.get(key)
+                if rollup is None:
+                    rollup = goal_rollups[key] = DailyRollup(goal_id, activity.activity_type, day)
+                    created.append(rollup)
+                rollup.add(activity)
+                touched[key] = rollup
+                del self._storage[activity.activity_id]
+            
+            # A rollup starts its UTC day, so it sorts no later than the rows
+            # it folds: every rollup lies before the cutoff, ahead of entries[split:]
+            existing = [entry for entry in entries[:split] if isinstance(entry, DailyRollup)]
+            created.sort(key=_timestamp_key)
+            self._goal_index[goal_id] = [
+                *merge(existing, created, key=_timestamp_key),
+                *entries[split:]
+            ]
+            compacted += len(old_raw)
+            self._notify_compact(goal_id, old_raw, list(touched.values()))
+        
+        self._compacted_count += compacted
+        return compacted
     
     def clear(self) -> None:
         """Clear all stored activities."""
         self._storage.clear()
+        self._goal_index.clear()
+        self._goal_counts.clear()
+        self._rollups.clear()
+        self._compacted_count = 0
     
     def __len__(self) -> int:
-        """Return total number of stored activities."""
-        return len(self._storage)
+        """Return total number of stored activities, including compacted ones."""
+        return len(self._storage) + self._compacted_count
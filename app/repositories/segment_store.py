@@ -0,0 +1,488 @@
+"""
+Immutable, memory-mapped columnar segment files for sealed activity history.
+
+Segment layout (little-endian, every section 8-byte aligned):
+
+    header        magic, version, row_count, goal_count, section offsets,
+                  smallest and largest id slot (version 2), string id
+                  table offset (version 3)
+    timestamps    int64   epoch microseconds (UTC)
+    utc_offsets   int16   original UTC offset in minutes (NAIVE_OFFSET = naive)
+    values        float64
+    type_codes    uint8   index into ACTIVITY_TYPES
+    goal_codes    uint32  index into the goal table
+    activity_ids  16 bytes per row (id slot, see below)
+    goal_offsets  uint64 pairs (first_row, row_count) per goal code
+    goal_table    uint32 length + UTF-8 bytes per goal code
+    string_ids    uint32 entry count, then uint64 row + uint32 length +
+                  UTF-8 bytes per row whose id is not a canonical UUID
+                  (version 3)
+
+An id slot holds the UUID's 16 bytes when the id is a canonical UUID
+string, and otherwise a 16-byte BLAKE2b digest of the id, whose original
+string is kept in the string id table; lookups compare the string for
+those rows, so a digest can never resolve to the wrong id.
+
+Rows are sorted by (goal_code, timestamp), so each goal's rows form one
+contiguous run located through the offset table. The header's id range
+lets id lookups skip a segment without scanning its id column: time-ordered
+(UUIDv7) ids sealed together span a narrow range, while segments holding
+random v4 ids (or written in version 1, still readable) are always scanned.
+Columns are exposed as memoryviews over the mapping: nothing is copied or
+parsed at open time except the goal and string id tables, and the OS page
+cache decides what stays resident.
+
+Segments are never modified in place. Deleting a sealed row appends a
+tombstone (row number + 16-byte id) to a ``.tomb`` sidecar file; reads skip
+tombstoned rows, and compaction rewrites a segment without them. A
+tombstone whose id no longer matches its row (left over from a compaction
+interrupted before the sidecar was removed) is ignored.
+"""
+import mmap
+import os
+import struct
+from array import array
+from datetime import datetime, timedelta, timezone
+from hashlib import blake2b
+from typing import Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+from app.models.activity import Activity
+from app.utils.date_helpers import to_utc
+
+
+MAGIC = b"LDSEG\x00\x00\x01"
+FORMAT_VERSION = 3
+READABLE_VERSIONS = (1, 2, 3)
+SEGMENT_SUFFIX = ".seg"
+TOMBSTONE_SUFFIX = ".tomb"
+
+# Tombstone record: row number, 16-byte activity id
+_TOMBSTONE = struct.Struct("<Q16s")
+
+# magic, version, row_count, goal_count, 8 section offsets, then (version 2)
+# the smallest and largest 16-byte id slot, then (version 3) the offset of
+# the string id table
+_HEADER_V1 = struct.Struct("<8sIQI8Q")
+_HEADER_V2 = struct.Struct("<8sIQI8Q16s16s")
+_HEADER = struct.Struct("<8sIQI8Q16s16sQ")
+_STRING_ID = struct.Struct("<QI")
+_NO_ID_RANGE = (bytes(16), b"\xff" * 16)
+
+ACTIVITY_TYPES = ("Learning", "Health", "Fitness", "Other")
+_TYPE_CODES = {name: code for code, name in enumerate(ACTIVITY_TYPES)}
+
+NAIVE_OFFSET = -32768
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def is_uuid_id(activity_id: str) -> bool:
+    """True if the id is a canonical UUID string (stored as its own 16 bytes)."""
+    try:
+        return str(UUID(activity_id)) == activity_id
+    except ValueError:
+        return False
+
+
+def encode_activity_id(activity_id: str) -> bytes:
+    """
+    Encode an activity id as its 16-byte slot.
+
+    Canonical UUID strings map to their bytes; any other id (including
+    non-canonical UUID spellings, which would not round-trip) maps to a
+    BLAKE2b digest and is stored in full in the string id table.
+    """
+    if is_uuid_id(activity_id):
+        return UUID(activity_id).bytes
+    return blake2b(activity_id.encode("utf-8"), digest_size=16).digest()
+
+
+def decode_activity_id(raw: bytes) -> str:
+    """Decode a 16-byte activity id back to its string form."""
+    return str(UUID(bytes=raw))
+
+
+def _to_epoch_micros(dt: datetime) -> int:
+    delta = to_utc(dt) - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _utc_offset_minutes(dt: datetime) -> int:
+    if dt.tzinfo is None:
+        return NAIVE_OFFSET
+    return int(dt.utcoffset().total_seconds() // 60)
+
+
+def write_segment(path: str, activities: List[Activity]) -> int:
+    """
+    Write activities to a new immutable segment file.
+
+    The file is written under a temporary name and renamed into place, so
+    readers never observe a partial segment.
+
+    Returns:
+        Number of rows written
+    """
+    goal_ids = sorted({activity.goal_id for activity in activities})
+    goal_codes = {goal_id: code for code, goal_id in enumerate(goal_ids)}
+
+    rows = sorted(
+        activities,
+        key=lambda a: (goal_codes[a.goal_id], _to_epoch_micros(a.timestamp))
+    )
+    row_count = len(rows)
+
+    timestamps = array("q", (_to_epoch_micros(a.timestamp) for a in rows))
+    utc_offsets = array("h", (_utc_offset_minutes(a.timestamp) for a in rows))
+    values = array("d", (float(a.value) for a in rows))
+    type_codes = array("B", (_TYPE_CODES[a.activity_type] for a in rows))
+    row_goal_codes = array("I", (goal_codes[a.goal_id] for a in rows))
+    encoded_ids = [encode_activity_id(a.activity_id) for a in rows]
+    activity_ids = b"".join(encoded_ids)
+    id_range = (min(encoded_ids), max(encoded_ids)) if encoded_ids else _NO_ID_RANGE
+    string_ids = [
+        (row, a.activity_id.encode("utf-8")) for row, a in enumerate(rows) if not is_uuid_id(a.activity_id)
+    ]
+
+    goal_offsets = array("Q", [0] * (2 * len(goal_ids)))
+    for row, code in enumerate(row_goal_codes):
+        if goal_offsets[2 * code + 1] == 0:
+            goal_offsets[2 * code] = row
+        goal_offsets[2 * code + 1] += 1
+
+    goal_table = b"".join(
+        struct.pack("<I", len(encoded)) + encoded
+        for encoded in (goal_id.encode() for goal_id in goal_ids)
+    )
+
+    sections = [
+        timestamps.tobytes(),
+        utc_offsets.tobytes(),
+        values.tobytes(),
+        type_codes.tobytes(),
+        row_goal_codes.tobytes(),
+        activity_ids,
+        goal_offsets.tobytes(),
+        goal_table,
+        struct.pack("<I", len(string_ids)) + b"".join(
+            _STRING_ID.pack(row, len(encoded)) + encoded for row, encoded in string_ids
+        )
+    ]
+    offsets = []
+    position = _align(_HEADER.size)
+    for section in sections:
+        offsets.append(position)
+        position = _align(position + len(section))
+
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "wb") as handle:
+            handle.write(_HEADER.pack(MAGIC, FORMAT_VERSION, row_count, len(goal_ids), *offsets[:8], *id_range, offsets[8]))
+            for offset, section in zip(offsets, sections):
+                handle.seek(offset)
+                handle.write(section)
+            handle.truncate(position)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return row_count
+
+
+class Segment:
+    """
+    Read-only view of one segment file through a memory mapping.
+
+    Opening costs O(goal_count) to decode the goal table, plus one entry
+    per non-UUID id in the string id table; row data is only touched when
+    a goal's rows are read.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, row_count, goal_count, *offsets = _HEADER_V1.unpack_from(self._map, 0)
+        if magic != MAGIC or version not in READABLE_VERSIONS:
+            raise ValueError(f"{path} is not a readable activity segment (versions {READABLE_VERSIONS})")
+        self.min_id, self.max_id = (
+            _HEADER_V2.unpack_from(self._map, 0)[-2:] if version >= 2 else _NO_ID_RANGE
+        )
+        self.row_count = row_count
+        self._ids_offset = offsets[5]
+
+        view = memoryview(self._map)
+        self._views = [view]
+        self.timestamps = self._column(view, offsets[0], row_count * 8, "q")
+        self.utc_offsets = self._column(view, offsets[1], row_count * 2, "h")
+        self.values = self._column(view, offsets[2], row_count * 8, "d")
+        self.type_codes = self._column(view, offsets[3], row_count, "B")
+        self.goal_codes = self._column(view, offsets[4], row_count * 4, "I")
+        self.activity_ids = self._column(view, offsets[5], row_count * 16, "B")
+        goal_offsets = self._column(view, offsets[6], goal_count * 16, "Q")
+
+        self.goal_ids: List[str] = []
+        self._goal_ranges: Dict[str, Tuple[int, int]] = {}
+        position = offsets[7]
+        for code in range(goal_count):
+            (length,) = struct.unpack_from("<I", self._map, position)
+            goal_id = bytes(view[position + 4:position + 4 + length]).decode()
+            position += 4 + length
+            self.goal_ids.append(goal_id)
+            self._goal_ranges[goal_id] = (goal_offsets[2 * code], goal_offsets[2 * code + 1])
+        goal_offsets.release()
+
+        # row -> id for rows whose slot is a digest (none before version 3)
+        self._string_ids: Dict[int, str] = {}
+        if version >= 3:
+            position = _HEADER.unpack_from(self._map, 0)[-1]
+            (entries,) = struct.unpack_from("<I", self._map, position)
+            position += 4
+            for _ in range(entries):
+                row, length = _STRING_ID.unpack_from(self._map, position)
+                position += _STRING_ID.size
+                self._string_ids[row] = bytes(view[position:position + length]).decode("utf-8")
+                position += length
+
+        self.tombstone_path = path[:-len(SEGMENT_SUFFIX)] + TOMBSTONE_SUFFIX
+        self.deleted: set = set()
+        self._deleted_by_goal: Dict[str, int] = {}
+        self._load_tombstones()
+
+    def _load_tombstones(self) -> None:
+        if not os.path.exists(self.tombstone_path):
+            return
+        with open(self.tombstone_path, "rb") as handle:
+            data = handle.read()
+        for position in range(0, len(data) - len(data) % _TOMBSTONE.size, _TOMBSTONE.size):
+            row, raw_id = _TOMBSTONE.unpack_from(data, position)
+            if row < self.row_count and bytes(self.activity_ids[row * 16:row * 16 + 16]) == raw_id:
+                self._mark_deleted(row)
+
+    def _mark_deleted(self, row: int) -> None:
+        if row in self.deleted:
+            return
+        self.deleted.add(row)
+        goal_id = self.goal_ids[self.goal_codes[row]]
+        self._deleted_by_goal[goal_id] = self._deleted_by_goal.get(goal_id, 0) + 1
+
+    def _column(self, view: memoryview, offset: int, length: int, fmt: str) -> memoryview:
+        column = view[offset:offset + length].cast(fmt)
+        self._views.append(column)
+        return column
+
+    # ===== Reads =====
+
+    def count_by_goal_id(self, goal_id: str) -> int:
+        return self._goal_ranges.get(goal_id, (0, 0))[1] - self._deleted_by_goal.get(goal_id, 0)
+
+    def find_by_goal_id(self, goal_id: str) -> List[Activity]:
+        """Materialize a goal's live rows (already in time order)."""
+        start, count = self._goal_ranges.get(goal_id, (0, 0))
+        deleted = self.deleted
+        return [self._activity(row, goal_id) for row in range(start, start + count) if row not in deleted]
+
+    def iter_activities(self) -> Iterator[Activity]:
+        """Yield every live row, grouped by goal and time-ordered within a goal."""
+        deleted = self.deleted
+        for goal_id in self.goal_ids:
+            start, count = self._goal_ranges[goal_id]
+            for row in range(start, start + count):
+                if row not in deleted:
+                    yield self._activity(row, goal_id)
+
+    def find_row_by_id(self, activity_id: str) -> Optional[int]:
+        """
+        Locate a row by id with a C-level search over the id column.
+
+        Ids outside the segment's id range are rejected without a scan.
+        """
+        needle = encode_activity_id(activity_id)
+        if not self.min_id <= needle <= self.max_id:
+            return None
+        start = self._ids_offset
+        end = start + self.row_count * 16
+        position = self._map.find(needle, start, end)
+        while position != -1:
+            if (position - start) % 16 == 0:
+                row = (position - start) // 16
+                if self._activity_id(row) == activity_id:
+                    return row if row not in self.deleted else None
+            position = self._map.find(needle, position + 1, end)
+        return None
+
+    def _activity_id(self, row: int) -> str:
+        activity_id = self._string_ids.get(row)
+        if activity_id is None:
+            activity_id = decode_activity_id(bytes(self.activity_ids[row * 16:row * 16 + 16]))
+        return activity_id
+
+    def find_by_id(self, activity_id: str) -> Optional[Activity]:
+        row = self.find_row_by_id(activity_id)
+        if row is None:
+            return None
+        return self._activity(row, self.goal_ids[self.goal_codes[row]])
+
+    def delete_row(self, row: int) -> None:
+        """Tombstone a row: durable append to the sidecar, then hide it."""
+        raw_id = bytes(self.activity_ids[row * 16:row * 16 + 16])
+        with open(self.tombstone_path, "ab") as handle:
+            handle.write(_TOMBSTONE.pack(row, raw_id))
+            handle.flush()
+            os.fsync(handle.fileno())
+        self._mark_deleted(row)
+
+    def live_activities(self) -> List[Activity]:
+        return list(self.iter_activities())
+
+    @property
+    def dead_fraction(self) -> float:
+        return len(self.deleted) / self.row_count if self.row_count else 0.0
+
+    def _activity(self, row: int, goal_id: str) -> Activity:
+        timestamp = _EPOCH + timedelta(microseconds=self.timestamps[row])
+        offset = self.utc_offsets[row]
+        if offset == NAIVE_OFFSET:
+            timestamp = timestamp.replace(tzinfo=None)
+        elif offset:
+            timestamp = timestamp.astimezone(timezone(timedelta(minutes=offset)))
+        return Activity(
+            goal_id=goal_id,
+            activity_type=ACTIVITY_TYPES[self.type_codes[row]],
+            value=self.values[row],
+            timestamp=timestamp,
+            activity_id=self._activity_id(row)
+        )
+
+    def close(self) -> None:
+        """Release the column views, the mapping and the file handle."""
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        self._map.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return self.row_count - len(self.deleted)
+
+
+class SegmentStore:
+    """
+    Directory of sealed segments, opened lazily via mmap.
+
+    Segment files are named by a zero-padded sequence number so that lexical
+    order is creation order.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # A sidecar without its segment is left over from an interrupted compaction
+        for name in os.listdir(directory):
+            if name.endswith(TOMBSTONE_SUFFIX):
+                if not os.path.exists(os.path.join(directory, name[:-len(TOMBSTONE_SUFFIX)] + SEGMENT_SUFFIX)):
+                    os.remove(os.path.join(directory, name))
+        self.segments: List[Segment] = [
+            Segment(os.path.join(directory, name))
+            for name in sorted(os.listdir(directory))
+            if name.endswith(SEGMENT_SUFFIX)
+        ]
+
+    def _next_path(self) -> str:
+        sequence = 0
+        if self.segments:
+            sequence = int(os.path.basename(self.segments[-1].path)[:-len(SEGMENT_SUFFIX)]) + 1
+        return os.path.join(self.directory, f"{sequence:010d}{SEGMENT_SUFFIX}")
+
+    def seal(self, activities: List[Activity]) -> Optional[Segment]:
+        """Write activities to a new segment and map it."""
+        if not activities:
+            return None
+        path = self._next_path()
+        write_segment(path, activities)
+        segment = Segment(path)
+        self.segments.append(segment)
+        return segment
+
+    def count_by_goal_id(self, goal_id: str) -> int:
+        return sum(segment.count_by_goal_id(goal_id) for segment in self.segments)
+
+    def find_by_goal_id(self, goal_id: str) -> List[Activity]:
+        activities: List[Activity] = []
+        for segment in self.segments:
+            activities.extend(segment.find_by_goal_id(goal_id))
+        return activities
+
+    def iter_activities(self) -> Iterator[Activity]:
+        for segment in self.segments:
+            yield from segment.iter_activities()
+
+    def find_by_id(self, activity_id: str) -> Optional[Activity]:
+        for segment in reversed(self.segments):
+            activity = segment.find_by_id(activity_id)
+            if activity is not None:
+                return activity
+        return None
+
+    def delete(self, activity_id: str) -> Optional[Activity]:
+        """Tombstone a sealed row; returns the removed activity, if found."""
+        for segment in reversed(self.segments):
+            row = segment.find_row_by_id(activity_id)
+            if row is not None:
+                activity = segment._activity(row, segment.goal_ids[segment.goal_codes[row]])
+                segment.delete_row(row)
+                return activity
+        return None
+
+    def compact(self, min_dead_fraction: float = 0.2) -> int:
+        """
+        Rewrite segments whose tombstoned share reaches ``min_dead_fraction``.
+
+        The live rows are written to the same path (atomically replaced) and
+        the sidecar is removed afterwards; a fully dead segment is deleted.
+
+        Returns:
+            Number of tombstoned rows reclaimed
+        """
+        reclaimed = 0
+        for index, segment in enumerate(self.segments):
+            if not segment.deleted or segment.dead_fraction < min_dead_fraction:
+                continue
+            live = segment.live_activities()
+            path, tombstone_path, dead = segment.path, segment.tombstone_path, len(segment.deleted)
+            if live:
+                write_segment(path, live)
+                segment.close()
+                os.remove(tombstone_path)
+                self.segments[index] = Segment(path)
+            else:
+                segment.close()
+                os.remove(path)
+                os.remove(tombstone_path)
+                self.segments[index] = None
+            reclaimed += dead
+        self.segments = [segment for segment in self.segments if segment is not None]
+        return reclaimed
+
+    def close(self) -> None:
+        for segment in self.segments:
+            segment.close()
+        self.segments.clear()
+
+    def destroy(self) -> None:
+        """Close and delete every segment file and tombstone sidecar."""
+        paths = [segment.path for segment in self.segments]
+        paths += [segment.tombstone_path for segment in self.segments if os.path.exists(segment.tombstone_path)]
+        self.close()
+        for path in paths:
+            os.remove(path)
+
+    def __len__(self) -> int:
+        return sum(len(segment) for segment in self.segments)
@@ -0,0 +1,154 @@
+"""
+Tiered repository: recent activities in memory, sealed history in mmap segments.
+
+Recent (mutable-window) activities live in the in-memory tier exactly as in
+InMemoryActivityRepository. Periodically, activities older than the seal
+window are written to an immutable segment file and dropped from memory.
+Reopening the directory maps existing segments instead of reloading them.
+"""
+from bisect import bisect_left
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+from app.models.activity import Activity
+from app.models.rollup import DailyRollup
+from app.repositories.in_memory_repository import InMemoryActivityRepository, _timestamp_key
+from app.repositories.segment_store import SegmentStore
+from app.utils.date_helpers import to_utc
+
+
+class SegmentedActivityRepository(InMemoryActivityRepository):
+    """
+    InMemoryActivityRepository backed by a SegmentStore for sealed rows.
+
+    Reads merge both tiers: a goal's sealed rows are materialized from its
+    contiguous run in each segment, then combined with the in-memory rows.
+    Sealed rows change only through ``update``/``delete`` (a tombstone plus,
+    for updates, a new in-memory row); ``save`` never searches the segments.
+    """
+
+    def __init__(self, directory: str):
+        super().__init__()
+        self.segment_store = SegmentStore(directory)
+        self._seal_listeners: List[Callable[[List[Activity]], None]] = []
+
+    def add_seal_listener(self, listener: Callable[[List[Activity]], None]) -> None:
+        """
+        Register a callback receiving the activities moved into each new segment.
+
+        Sealed rows stay in the repository (reads still return them), so
+        they are not reported as deletes; in-memory mirrors of the hot tier
+        can drop them and read ``segment_store`` instead.
+        """
+        self._seal_listeners.append(listener)
+
+    def seal_before(self, cutoff: datetime) -> int:
+        """
+        Move raw in-memory activities older than ``cutoff`` into a new segment.
+
+        The segment is written and fsynced before any row leaves memory, so
+        a failed write leaves the in-memory tier unchanged.
+
+        Returns:
+            Number of activities sealed
+        """
+        cutoff = to_utc(cutoff)
+        sealed_by_goal: Dict[str, List[Activity]] = {}
+
+        for goal_id, entries in self._goal_index.items():
+            split = bisect_left(entries, cutoff, key=_timestamp_key)
+            old_raw = [entry for entry in entries[:split] if not isinstance(entry, DailyRollup)]
+            if old_raw:
+                sealed_by_goal[goal_id] = old_raw
+
+        sealed = [activity for old_raw in sealed_by_goal.values() for activity in old_raw]
+        self.segment_store.seal(sealed)
+
+        for goal_id, old_raw in sealed_by_goal.items():
+            self._goal_index[goal_id] = [
+                entry for entry in self._goal_index[goal_id]
+                if isinstance(entry, DailyRollup) or to_utc(entry.timestamp) >= cutoff
+            ]
+            self._goal_counts[goal_id] -= len(old_raw)
+        for activity in sealed:
+            del self._storage[activity.activity_id]
+        if sealed:
+            for listener in self._seal_listeners:
+                listener(sealed)
+        return len(sealed)
+
+    def delete(self, activity_id: str) -> Optional[Activity]:
+        """Remove from memory, or tombstone the sealed row."""
+        activity = super().delete(activity_id)
+        if activity is None:
+            activity = self.segment_store.delete(activity_id)
+            if activity is not None:
+                self._notify_delete(activity)
+        return activity
+
+    def compact_segments(self, min_dead_fraction: float = 0.2) -> int:
+        """
+        Reclaim tombstoned rows by rewriting mostly-deleted segments.
+
+        Returns:
+            Number of tombstoned rows reclaimed
+        """
+        return self.segment_store.compact(min_dead_fraction)
+
+    def find_by_id(self, activity_id: str) -> Optional[Activity]:
+        """Check memory first, then search the sealed id columns."""
+        activity = super().find_by_id(activity_id)
+        if activity is None:
+            activity = self.segment_store.find_by_id(activity_id)
+        return activity
+
+    def find_by_goal_id(self, goal_id: str) -> List[Activity]:
+        """Return sealed and in-memory activities for a goal, sorted by timestamp."""
+        sealed = self.segment_store.find_by_goal_id(goal_id)
+        if not sealed:
+            return super().find_by_goal_id(goal_id)
+        return sorted([*sealed, *super().find_by_goal_id(goal_id)], key=_timestamp_key)
+
+    def find_all(self) -> List[Activity]:
+        """Return activities from both tiers sorted by timestamp."""
+        return sorted(
+            [*self.segment_store.iter_activities(), *super().find_all()],
+            key=_timestamp_key
+        )
+
+    def iter_activities(
+        self,
+        goal_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Iterator[Activity]:
+        """Stream sealed rows segment by segment, then the in-memory tier."""
+        start = to_utc(start) if start else None
+        end = to_utc(end) if end else None
+        for segment in self.segment_store.segments:
+            sealed = segment.find_by_goal_id(goal_id) if goal_id is not None else segment.iter_activities()
+            for activity in sealed:
+                timestamp = to_utc(activity.timestamp)
+                if (start is None or timestamp >= start) and (end is None or timestamp < end):
+                    yield activity
+        yield from super().iter_activities(goal_id, start, end)
+
+    def iter_persisted_activities(self) -> Iterator[Activity]:
+        """Iterate rows of the segments mapped right now (the on-disk history)."""
+        segments = list(self.segment_store.segments)
+        return (activity for segment in segments for activity in segment.iter_activities())
+
+    def count_by_goal_id(self, goal_id: str) -> int:
+        """Count activities in both tiers (segment counts come from offset tables)."""
+        return super().count_by_goal_id(goal_id) + self.segment_store.count_by_goal_id(goal_id)
+
+    def clear(self) -> None:
+        """Clear both tiers, deleting segment files."""
+        super().clear()
+        self.segment_store.destroy()
+
+    def close(self) -> None:
+        """Unmap all segments."""
+        self.segment_store.close()
+
+    def __len__(self) -> int:
+        return super().__len__() + len(self.segment_store)
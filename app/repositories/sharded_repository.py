@@ -0,0 +1,438 @@
+"""
+Hash-sharded repository: activities partitioned by goal across shard processes.
+
+Each shard process owns an InMemoryActivityRepository for the goals that
+hash to it, so raw rows and per-goal work spread over several cores and
+address spaces. Requests are ``(function, args)`` pairs applied to the
+shard's repository; the calling process keeps only an id -> shard map so
+every id-based call goes to exactly one shard.
+"""
+import multiprocessing
+import signal
+import threading
+import zlib
+from datetime import datetime
+from bisect import bisect_left
+from heapq import merge
+from itertools import islice
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.models.activity import Activity
+from app.models.rollup import DailyRollup
+from app.repositories.activity_repository import ActivityRepository
+from app.repositories.in_memory_repository import InMemoryActivityRepository, _timestamp_key
+from app.utils.date_helpers import to_utc
+
+
+# ===== Shard process =====
+# Functions sent to a shard take its repository as the first argument; they
+# are pickled by reference, so they must be importable module-level names
+# (unbound InMemoryActivityRepository methods qualify)
+
+class _ShardView:
+    """
+    Read-only view of a shard's repository for ``scatter`` functions.
+
+    ``iter_activities`` holds the shard lock for one goal's rows at a time,
+    so routed calls interleave with a long scan instead of waiting for it,
+    and every goal is read in a consistent state.
+    """
+
+    def __init__(self, repository: InMemoryActivityRepository, lock: threading.Lock):
+        self._repository = repository
+        self._lock = lock
+
+    def iter_activities(
+        self,
+        goal_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Iterator[Activity]:
+        with self._lock:
+            goal_ids = [goal_id] if goal_id is not None else list(self._repository._goal_index)
+        for current_goal in goal_ids:
+            with self._lock:
+                yield from self._repository.iter_activities(current_goal, start, end)
+
+
+def _serve_requests(connection: Connection, target: Any, lock: Optional[threading.Lock] = None) -> None:
+    """
+    Apply each ``(function, args)`` request to ``target`` until the
+    connection closes (or a ``None`` request arrives).
+
+    Answers ``(ok, result or exception, removed rows)``; removed rows are
+    those the request deleted or replaced (see ``_serve_shard``).
+    """
+    removed: List[Activity] = []
+    if lock is not None:
+        target.add_delete_listener(removed.append)
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+
+        function, args = request
+        try:
+            if lock is not None:
+                with lock:
+                    result = function(target, *args)
+            else:
+                result = function(target, *args)
+            reply = (True, result, removed[:])
+        except Exception as error:
+            reply = (False, error, removed[:])
+        removed.clear()
+        connection.send(reply)
+
+
+def _serve_shard(commands: Connection, analytics: Connection) -> None:
+    """
+    Shard process main: routed commands here, ``scatter`` requests on a thread.
+
+    Commands run under the shard lock; a scatter function gets a
+    ``_ShardView`` that takes the lock one goal at a time, so a full scan
+    does not hold up routed calls. Removed rows in a command reply let the
+    caller notify its delete listeners. Exits once the commands
+    connection closes.
+    """
+    # Ctrl+C reaches the whole process group; the server stops shards via close()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    repository = InMemoryActivityRepository()
+    lock = threading.Lock()
+    threading.Thread(
+        target=_serve_requests,
+        args=(analytics, _ShardView(repository, lock)),
+        name="shard-analytics",
+        daemon=True
+    ).start()
+    _serve_requests(commands, repository, lock)
+
+
+def _save_batch(
+    repository: InMemoryActivityRepository,
+    activities: List[Activity],
+    moved_ids: List[str]
+) -> None:
+    """Drop ids that moved to another shard, then save this shard's rows."""
+    for activity_id in moved_ids:
+        repository.delete(activity_id)
+    if activities:
+        repository.save_many(activities)
+
+
+def _find_page(
+    repository: InMemoryActivityRepository,
+    goal_id: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    cursor: Optional[Tuple[int, datetime, int]],
+    limit: int
+) -> Tuple[List[Activity], Optional[Tuple[int, datetime, int]]]:
+    """
+    Up to ``limit`` rows of ``iter_activities(goal_id, start, end)`` after ``cursor``.
+
+    The cursor is (goal position, timestamp key of the last row, rows with
+    that key already returned), so a page resumes by binary search. Goals
+    are only removed from the index by ``clear``, so positions are stable.
+
+    Returns:
+        (rows, cursor for the next page or None when done)
+    """
+    goal_ids = [goal_id] if goal_id is not None else repository._goal_index
+    position, last_key, seen = cursor or (0, None, 0)
+    rows: List[Activity] = []
+    for current_goal in islice(goal_ids, position, None):
+        entries = repository._goal_index.get(current_goal, [])
+        lo = bisect_left(entries, to_utc(start), key=_timestamp_key) if start else 0
+        hi = bisect_left(entries, to_utc(end), key=_timestamp_key) if end else len(entries)
+        if last_key is not None:
+            lo = max(lo, bisect_left(entries, last_key, key=_timestamp_key) + seen)
+        page = entries[lo:min(hi, lo + limit - len(rows))]
+        rows.extend(page)
+        if len(rows) == limit:
+            last_key = _timestamp_key(rows[-1])
+            seen = lo + len(page) - bisect_left(entries, last_key, key=_timestamp_key)
+            return rows, (position, last_key, seen)
+        position, last_key, seen = position + 1, None, 0
+    return rows, None
+
+
+def _compact_before(
+    repository: InMemoryActivityRepository,
+    cutoff: datetime
+) -> List[Tuple[str, List[Activity], List[DailyRollup]]]:
+    """Compact and return the per-goal compaction notifications."""
+    compactions: List[Tuple[str, List[Activity], List[DailyRollup]]] = []
+    repository._compact_listeners.append(lambda *compaction: compactions.append(compaction))
+    try:
+        repository.compact_before(cutoff)
+    finally:
+        repository._compact_listeners.pop()
+    return compactions
+
+
+# ===== Routing process =====
+
+class ShardedActivityRepository(ActivityRepository):
+    """
+    ActivityRepository spread over ``shards`` spawned shard processes.
+
+    - A goal lives on shard ``crc32(goal_id) % shards`` (stable across
+      restarts, unlike ``hash``), so per-goal reads are one round trip to
+      one shard
+    - An id -> shard map of the raw activities (about 100 bytes each) sends
+      a save, delete or id lookup to the owning shard only; a save that
+      moves an id to another goal's shard also deletes it on the old one.
+      Ids folded into rollups by compaction leave the map
+    - Batch writes and multi-goal or global reads are sent to every
+      involved shard before any reply is awaited, so shards work in parallel
+    - ``scatter`` runs a function over every shard's rows and returns the
+      per-shard results, for mergeable partial aggregates. Shards serve it
+      on a separate connection and thread, so routed calls are not queued
+      behind a scan (they wait for at most one goal's rows)
+    - Listeners run in this process: saves are notified with the caller's
+      objects, deletes with the rows the shards report as removed
+
+    Routed calls block the calling thread for one pipe round trip (the
+    event loop, for request handlers). That is a fixed cost per call, not
+    per row: ``iter_activities`` blocks for one page of ``ITER_PAGE_ROWS``
+    rows at a time. Global aggregates use ``scatter`` from a worker thread
+    and ``find_all``, which ships every row, is not on any request path
+    when the app runs sharded.
+    """
+
+    ITER_PAGE_ROWS = 5000
+
+
+    def __init__(self, shards: int):
+        super().__init__()
+        if shards < 1:
+            raise ValueError("At least one shard is required")
+
+        # spawn: forking a process that runs an event loop and threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        self._commands: List[Connection] = []
+        # Used only by ``scatter``, which may run on a worker thread while
+        # routed calls continue on the commands connections
+        self._analytics: List[Connection] = []
+        self._processes = []
+        for index in range(shards):
+            commands, shard_commands = context.Pipe()
+            analytics, shard_analytics = context.Pipe()
+            process = context.Process(
+                target=_serve_shard,
+                args=(shard_commands, shard_analytics),
+                name=f"activity-shard-{index}",
+                daemon=True
+            )
+            process.start()
+            shard_commands.close()
+            shard_analytics.close()
+            self._commands.append(commands)
+            self._analytics.append(analytics)
+            self._processes.append(process)
+        self._shard_by_id: Dict[str, int] = {}
+
+    @property
+    def shards(self) -> int:
+        return len(self._commands)
+
+    def shard_for(self, goal_id: str) -> int:
+        """Index of the shard owning ``goal_id``."""
+        return zlib.crc32(goal_id.encode("utf-8")) % len(self._commands)
+
+    def _request(
+        self,
+        connections: List[Connection],
+        calls: Dict[int, Tuple[Callable[..., Any], tuple]]
+    ) -> Tuple[Dict[int, Any], List[Activity], Optional[Exception]]:
+        """
+        Send every call, then collect every reply.
+
+        All replies are read even after a failure so the connections stay
+        in step; the first error is returned for the caller to raise.
+
+        Returns:
+            (shard -> result, removed rows, first error or None)
+        """
+        for shard, request in calls.items():
+            connections[shard].send(request)
+
+        results: Dict[int, Any] = {}
+        removed: List[Activity] = []
+        error: Optional[Exception] = None
+        for shard in calls:
+            ok, value, shard_removed = connections[shard].recv()
+            removed.extend(shard_removed)
+            if ok:
+                results[shard] = value
+            elif error is None:
+                error = value
+        return results, removed, error
+
+    def _call_shards(self, calls: Dict[int, Tuple[Callable[..., Any], tuple]]) -> Dict[int, Any]:
+        """Run routed calls in parallel and notify delete listeners of removed rows."""
+        results, removed, error = self._request(self._commands, calls)
+        for activity in removed:
+            self._notify_delete(activity)
+        if error is not None:
+            raise error
+        return results
+
+    def _call(self, shard: int, function: Callable[..., Any], *args) -> Any:
+        return self._call_shards({shard: (function, args)})[shard]
+
+    def _call_all(self, function: Callable[..., Any], *args) -> Dict[int, Any]:
+        return self._call_shards({shard: (function, args) for shard in range(len(self._commands))})
+
+    def scatter(self, function: Callable[..., Any], *args) -> List[Any]:
+        """
+        Apply ``function(shard_view, *args)`` on every shard in parallel.
+
+        ``function`` must be a module-level function that reads through
+        the view's ``iter_activities``. Safe to call from one worker thread
+        at a time alongside routed calls.
+
+        Returns:
+            Per-shard results, in shard order
+        """
+        calls = {shard: (function, args) for shard in range(len(self._analytics))}
+        results, _, error = self._request(self._analytics, calls)
+        if error is not None:
+            raise error
+        return [results[shard] for shard in range(len(self._analytics))]
+
+    def save(self, activity: Activity) -> Activity:
+        """Store the activity on its goal's shard."""
+        self.save_many([activity])
+        return activity
+
+    def save_many(self, activities: List[Activity]) -> List[Activity]:
+        """
+        Send each involved shard its part of the batch, all in one round.
+
+        An id that moves to another goal's shard is deleted on the shard
+        the map says holds it. Within a batch the last row per id wins, as
+        in memory.
+        """
+        latest = {activity.activity_id: activity for activity in activities}
+        batches: Dict[int, Tuple[List[Activity], List[str]]] = {}
+        for activity_id, activity in latest.items():
+            shard = self.shard_for(activity.goal_id)
+            batches.setdefault(shard, ([], []))[0].append(activity)
+            previous = self._shard_by_id.get(activity_id)
+            if previous is not None and previous != shard:
+                batches.setdefault(previous, ([], []))[1].append(activity_id)
+
+        self._call_shards({shard: (_save_batch, batch) for shard, batch in batches.items()})
+        for activity_id, activity in latest.items():
+            self._shard_by_id[activity_id] = self.shard_for(activity.goal_id)
+        for activity in latest.values():
+            self._notify_save(activity)
+        return activities
+
+    def delete(self, activity_id: str) -> Optional[Activity]:
+        """Remove an activity from the shard holding it."""
+        shard = self._shard_by_id.get(activity_id)
+        if shard is None:
+            return None
+        activity = self._call(shard, InMemoryActivityRepository.delete, activity_id)
+        del self._shard_by_id[activity_id]
+        return activity
+
+    def find_by_id(self, activity_id: str) -> Optional[Activity]:
+        """Look the id up on the shard holding it."""
+        shard = self._shard_by_id.get(activity_id)
+        if shard is None:
+            return None
+        return self._call(shard, InMemoryActivityRepository.find_by_id, activity_id)
+
+    def find_by_goal_id(self, goal_id: str) -> List[Activity]:
+        """Return the goal's activities from its shard, sorted by timestamp."""
+        return self._call(self.shard_for(goal_id), InMemoryActivityRepository.find_by_goal_id, goal_id)
+
+    def find_by_goal_ids(self, goal_ids: Iterable[str]) -> Dict[str, List[Activity]]:
+        """Ask each involved shard for its goals, all shards at once."""
+        result: Dict[str, List[Activity]] = {goal_id: [] for goal_id in goal_ids}
+        by_shard: Dict[int, List[str]] = {}
+        for goal_id in result:
+            by_shard.setdefault(self.shard_for(goal_id), []).append(goal_id)
+        calls = {
+            shard: (InMemoryActivityRepository.find_by_goal_ids, (shard_goals,))
+            for shard, shard_goals in by_shard.items()
+        }
+        for shard_result in self._call_shards(calls).values():
+            result.update(shard_result)
+        return result
+
+    def find_all(self) -> List[Activity]:
+        """
+        Merge every shard's time-sorted rows.
+
+        Ships all rows to this process. The app computes global metrics
+        with ``scatter`` instead (ShardedGlobalAnalytics, which also feeds
+        the insights stream), so this is for tools and tests.
+        """
+        return list(merge(*self._call_all(InMemoryActivityRepository.find_all).values(), key=_timestamp_key))
+
+    def iter_activities(
+        self,
+        goal_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Iterator[Activity]:
+        """Stream each shard's matching rows in pages of ``ITER_PAGE_ROWS``."""
+        shards = [self.shard_for(goal_id)] if goal_id is not None else range(len(self._commands))
+        for shard in shards:
+            cursor = None
+            while True:
+                rows, cursor = self._call(shard, _find_page, goal_id, start, end, cursor, self.ITER_PAGE_ROWS)
+                yield from rows
+                if cursor is None:
+                    break
+
+    def count_by_goal_id(self, goal_id: str) -> int:
+        """Count the goal's activities on its shard."""
+        return self._call(self.shard_for(goal_id), InMemoryActivityRepository.count_by_goal_id, goal_id)
+
+    def compact_before(self, cutoff: datetime) -> int:
+        """Compact every shard in parallel and notify compact listeners per goal."""
+        compacted = 0
+        for compactions in self._call_all(_compact_before, cutoff).values():
+            for goal_id, folded, rollups in compactions:
+                compacted += len(folded)
+                for activity in folded:
+                    self._shard_by_id.pop(activity.activity_id, None)
+                self._notify_compact(goal_id, folded, rollups)
+        return compacted
+
+    def clear(self) -> None:
+        """Clear every shard."""
+        self._call_all(InMemoryActivityRepository.clear)
+        self._shard_by_id.clear()
+
+    def close(self) -> None:
+        """Stop the shard processes."""
+        for connection in self._commands:
+            try:
+                connection.send(None)
+            except OSError:
+                # The shard already exited (e.g. killed with the process group)
+                pass
+        for connection in [*self._commands, *self._analytics]:
+            connection.close()
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._commands.clear()
+        self._analytics.clear()
+        self._processes.clear()
+        self._shard_by_id.clear()
+
+    def __len__(self) -> int:
+        """Return total number of activities, including compacted ones."""
+        return sum(self._call_all(InMemoryActivityRepository.__len__).values())
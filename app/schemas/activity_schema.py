@@ -2,7 +2,7 @@
 Pydantic schemas for request/response validation and serialization.
 """
 from datetime import datetime
-from typing import Literal
+from typing import Literal, Optional
 from pydantic import BaseModel, Field, field_validator
 
 
@@ -15,6 +15,12 @@ class ActivityCreate(BaseModel):
     )
     value: float = Field(..., gt=0, description="Numeric value representing effort (e.g., minutes)")
     timestamp: str = Field(..., description="ISO-8601 formatted datetime string")
+    client_activity_id: Optional[str] = Field(
+        None,
+        min_length=1,
+        max_length=128,
+        description="Client-generated id; re-sending the same id never creates a duplicate"
+    )
     
     @field_validator('timestamp')
     @classmethod
@@ -37,6 +43,27 @@ class ActivityCreate(BaseModel):
         }
 
 
+class ActivityUpdate(BaseModel):
+    """Schema for replacing an existing activity entry."""
+    
+    goal_id: str = Field(..., min_length=1, description="Unique identifier for the goal")
+    activity_type: Literal["Learning", "Health", "Fitness", "Other"] = Field(
+        ..., description="Category of the activity"
+    )
+    value: float = Field(..., gt=0, description="Numeric value representing effort (e.g., minutes)")
+    timestamp: str = Field(..., description="ISO-8601 formatted datetime string")
+    
+    @field_validator('timestamp')
+    @classmethod
+    def validate_timestamp(cls, v: str) -> str:
+        """Validate that timestamp is a valid ISO-8601 datetime."""
+        try:
+            datetime.fromisoformat(v.replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError('timestamp must be a valid ISO-8601 datetime string')
+        return v
+
+
 class ActivityResponse(BaseModel):
     """Schema for activity response."""
     
@@ -67,6 +94,7 @@ class DashboardResponse(BaseModel):
     activity_history: list[ActivityResponse]
     consistency_score: float = Field(..., ge=0.0, le=1.0)
     wellness_warning: bool
+    version: Optional[int] = Field(None, description="Change-log version; pass as `since` to the changes endpoint")
     
     class Config:
         json_schema_extra = {
@@ -85,6 +113,28 @@ class DashboardResponse(BaseModel):
         }
 
 
+class BatchDashboardRequest(BaseModel):
+    """Schema for requesting dashboards of several goals at once."""
+    
+    goal_ids: list[str] = Field(..., min_length=1, max_length=500, description="Goals to summarize")
+    include_history: bool = Field(False, description="Include each goal's full activity history")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "goal_ids": ["career-growth-2024", "wellness-2024"],
+                "include_history": False
+            }
+        }
+
+
+class BatchDashboardResponse(BaseModel):
+    """Schema for a multi-goal dashboard response."""
+    
+    generated_at: str = Field(..., description="Shared reference time used for all wellness windows")
+    dashboards: list[DashboardResponse]
+
+
 class InsightsResponse(BaseModel):
     """Schema for optimization insights response."""
     
@@ -100,3 +150,268 @@ class InsightsResponse(BaseModel):
                 "recommendation": "You are investing heavily in learning but neglecting physical wellness. Consider rebalancing your growth plan."
             }
         }
+
+
+class DashboardUpdateEvent(BaseModel):
+    """Schema for a pushed dashboard update (Server-Sent Events payload)."""
+    
+    goal_id: str
+    total_activities: int
+    aggregated_values: dict[str, float]
+    consistency_score: float = Field(..., ge=0.0, le=1.0)
+    wellness_warning: bool
+    new_activities: list[ActivityResponse]
+    removed_activity_ids: list[str] = Field(
+        default_factory=list,
+        description="Activities deleted since the previous update; apply before new_activities"
+    )
+    resync: bool = Field(
+        False,
+        description="True when earlier updates were dropped; the client should refetch the full dashboard"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "goal_id": "career-growth-2024",
+                "total_activities": 16,
+                "aggregated_values": {
+                    "Learning": 1860,
+                    "Health": 300,
+                    "Fitness": 450
+                },
+                "consistency_score": 0.82,
+                "wellness_warning": False,
+                "new_activities": [],
+                "resync": False
+            }
+        }
+
+
+class IngestionMetricsResponse(BaseModel):
+    """Schema for ingestion queue metrics."""
+    
+    mode: Literal["sync", "async"]
+    idempotency: dict[str, int] = Field(default_factory=dict)
+    queue_depth: int = 0
+    queue_capacity: int = 0
+    enqueued_total: int = 0
+    committed_total: int = 0
+    rejected_total: int = 0
+    failed_total: int = 0
+    batches_total: int = 0
+    last_commit_lag_ms: float = 0.0
+    max_commit_lag_ms: float = 0.0
+
+
+class HistoryEntryResponse(ActivityResponse):
+    """Schema for an activity history entry, raw or compacted."""
+    
+    count: int = Field(1, ge=1, description="Number of raw activities this entry represents")
+    compacted: bool = Field(False, description="True for a daily rollup of older activities")
+
+
+class ActivityHistoryResponse(BaseModel):
+    """Schema for a goal's activity history across storage tiers."""
+    
+    goal_id: str
+    tier: Literal["all", "raw", "compacted"]
+    entries: list[HistoryEntryResponse]
+
+
+class ImportResultResponse(BaseModel):
+    """Schema for the result of a bulk import."""
+    
+    imported: int
+    rejected: int
+    duplicates: int = Field(0, description="Rows skipped because their activity_id already exists")
+    errors: list[str] = Field(default_factory=list, description="First rejected rows with reasons")
+
+
+class GoalInsightsRequest(BaseModel):
+    """Schema for requesting per-goal recommendations."""
+    
+    goal_ids: Optional[list[str]] = Field(
+        None,
+        max_length=10000,
+        description="Goals to evaluate; omit to evaluate every goal"
+    )
+
+
+class GoalInsights(BaseModel):
+    """Schema for one goal's insights and recommendation."""
+    
+    goal_id: str
+    consistency_score: float = Field(..., ge=0.0, le=1.0)
+    wellness_warning: bool
+    recommendation: str
+    activity_gaps: dict[str, bool]
+
+
+class GoalInsightsResponse(BaseModel):
+    """Schema for per-goal insights computed in one batched pass."""
+    
+    generated_at: str
+    goals: list[GoalInsights]
+
+
+class LeaderboardEntry(BaseModel):
+    """Schema for one ranked goal on a leaderboard."""
+    
+    rank: int = Field(..., ge=1)
+    goal_id: str
+    score: float
+
+
+class LeaderboardResponse(BaseModel):
+    """Schema for one page of a leaderboard."""
+    
+    board: Literal["streaks", "learning-this-week", "wellness-risk"]
+    total: int = Field(..., ge=0, description="Number of goals currently on the board")
+    offset: int
+    limit: int
+    entries: list[LeaderboardEntry]
+
+
+class ValueDistribution(BaseModel):
+    """Schema for an approximate distribution of activity values."""
+    
+    count: int
+    min: float
+    max: float
+    median: float = Field(..., description="Approximate; rank error within ~1.7% of count")
+    p90: float = Field(..., description="Approximate; rank error within ~1.7% of count")
+    p99: float = Field(..., description="Approximate; rank error within ~1.7% of count")
+
+
+class ActivityStatisticsResponse(BaseModel):
+    """Schema for sketch-based activity statistics."""
+    
+    goal_id: Optional[str] = Field(None, description="Goal the statistics cover (None = all goals)")
+    start: Optional[str] = None
+    end: Optional[str] = None
+    distinct_active_days: int = Field(..., ge=0, description="Exact count of days with activity in range")
+    value_distributions: dict[str, ValueDistribution]
+
+
+class ProfilingSettings(BaseModel):
+    """Schema for the current request profiling settings."""
+    
+    slow_log_enabled: bool
+    sample_rate: float
+    slow_threshold_ms: float
+    slow_log_size: int
+    on_demand_enabled: bool
+
+
+class ProfilingSettingsUpdate(BaseModel):
+    """Schema for changing profiling settings at runtime (omitted fields are unchanged)."""
+    
+    slow_log_enabled: Optional[bool] = None
+    sample_rate: Optional[float] = Field(None, ge=0.0, le=1.0, description="Fraction of requests traced")
+    slow_threshold_ms: Optional[float] = Field(None, ge=0.0, description="Only slower requests are logged")
+    slow_log_size: Optional[int] = Field(None, ge=1, le=1000, description="Number of slowest requests kept")
+
+
+class SlowRequestEntry(BaseModel):
+    """Schema for a recorded slow request."""
+    
+    method: str
+    path: str
+    status_code: int
+    total_ms: float
+    stages_ms: dict[str, float] = Field(
+        ..., description="Exclusive time per stage: repository, analytics, recommendation, endpoint, serialization"
+    )
+    recorded_at: str
+
+
+class StoredProfile(BaseModel):
+    """Schema for an on-demand profile report."""
+    
+    profile_id: str
+    mode: Literal["cprofile", "sampling"]
+    method: str
+    path: str
+    total_ms: float
+    recorded_at: str
+    report: str
+
+
+class AdmissionMetricsResponse(BaseModel):
+    """Schema for admission control metrics."""
+    
+    admitted_total: int
+    rate_limited_total: int
+    shed_total: int
+    coalesced_total: int = Field(..., description="Requests answered from an identical in-flight request")
+    expensive_in_flight: int
+    max_expensive_in_flight: int
+    tracked_clients: int
+    rejected_by_rule: dict[str, int] = Field(default_factory=dict)
+    coalesced_by_rule: dict[str, int] = Field(default_factory=dict)
+
+
+class DashboardDeltaResponse(BaseModel):
+    """Schema for a goal dashboard delta since a client-held version."""
+    
+    goal_id: str
+    since: int
+    version: int = Field(..., description="Version to send as `since` next time")
+    resync: bool = Field(
+        ..., description="True if `since` is too old or unknown; refetch the full dashboard"
+    )
+    total_activities: int
+    aggregated_values: dict[str, float]
+    consistency_score: float = Field(..., ge=0.0, le=1.0)
+    wellness_warning: bool
+    changes: list[ActivityResponse] = Field(
+        default_factory=list, description="Activities added or modified after `since`, in change order"
+    )
+    removed_activity_ids: list[str] = Field(
+        default_factory=list, description="Activities deleted after `since`"
+    )
+
+
+class AggregationQueryRequest(BaseModel):
+    """Schema for a group-by aggregation query over activities."""
+    
+    goal_ids: Optional[list[str]] = Field(None, max_length=500, description="Restrict to these goals")
+    activity_types: Optional[list[Literal["Learning", "Health", "Fitness", "Other"]]] = Field(
+        None, description="Restrict to these activity types"
+    )
+    start: Optional[datetime] = Field(None, description="Inclusive lower bound on timestamp (UTC if naive)")
+    end: Optional[datetime] = Field(None, description="Exclusive upper bound on timestamp (UTC if naive)")
+    group_by: list[Literal["goal", "type", "day", "week", "month", "weekday"]] = Field(
+        default_factory=list, max_length=6, description="Grouping dimensions, in key order"
+    )
+    metrics: list[Literal["sum", "count", "avg", "min", "max"]] = Field(
+        default_factory=lambda: ["sum"], min_length=1, description="Metrics computed over `value` per group"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "activity_types": ["Learning", "Health"],
+                "start": "2024-01-01T00:00:00Z",
+                "group_by": ["type", "weekday"],
+                "metrics": ["sum", "count"]
+            }
+        }
+
+
+class AggregationGroup(BaseModel):
+    """Schema for one group of an aggregation result."""
+    
+    key: dict[str, str] = Field(..., description="Value per group-by dimension")
+    values: dict[str, float] = Field(..., description="Value per requested metric")
+
+
+class AggregationQueryResponse(BaseModel):
+    """Schema for an aggregation query result."""
+    
+    group_by: list[str]
+    metrics: list[str]
+    groups: list[AggregationGroup]
+    scanned_rows: int = Field(..., description="Rows (activities or daily rollups) aggregated")
+    cached: bool = Field(..., description="True if served from the result cache")
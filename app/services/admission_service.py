@@ -0,0 +1,197 @@
+"""
+Admission control: cost-weighted per-client rate limits, load shedding and
+single-flight coalescing of identical expensive reads.
+
+Every request is matched to a CostRule. The client's token bucket must hold
+the rule's cost, so one insights call spends as much as many cheap writes.
+Expensive requests additionally share a global concurrency limit, and
+identical in-flight GETs on coalescing routes are computed once.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class CostRule:
+    """Cost and handling for requests whose path starts with ``prefix``."""
+
+    name: str
+    method: str
+    prefix: str
+    cost: float
+    expensive: bool = False
+    coalesce: bool = False
+
+
+# First matching rule wins; unmatched requests cost DEFAULT_COST
+DEFAULT_COST_RULES: Tuple[CostRule, ...] = (
+    CostRule("insights-optimization", "GET", "/insights/optimization", 20, expensive=True, coalesce=True),
+    CostRule("insights-goals", "POST", "/insights/goals", 20, expensive=True),
+    CostRule("insights-statistics", "GET", "/insights/statistics", 5, coalesce=True),
+    CostRule("dashboard-batch", "POST", "/dashboard/batch", 10, expensive=True),
+    CostRule("dashboard", "GET", "/dashboard/", 2, coalesce=True),
+    CostRule("export", "GET", "/activities/export", 20, expensive=True),
+    CostRule("import", "POST", "/activities/import", 20, expensive=True),
+    CostRule("leaderboards", "GET", "/leaderboards/", 1, coalesce=True),
+    # Filters are in the body, so every query is priced as an unfiltered scan
+    CostRule("aggregations", "POST", "/aggregations/query", 10, expensive=True),
+    CostRule("log-activity", "POST", "/activities", 1),
+)
+DEFAULT_COST = 1.0
+
+# Never rate limited: probes, docs and long-lived streams
+EXEMPT_PREFIXES = ("/health", "/ready", "/docs", "/redoc", "/openapi.json", "/stream/")
+
+
+class TokenBucket:
+    """Refills ``rate`` tokens per second up to ``capacity``."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def try_consume(self, cost: float, now: float) -> float:
+        """
+        Take ``cost`` tokens if available.
+
+        Returns:
+            0.0 on success, otherwise seconds until enough tokens accrue
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (min(cost, self.capacity) - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Decides whether a request may run and tracks admission metrics.
+
+    Client buckets live in an LRU map bounded by ``max_clients``; an
+    evicted client simply starts again with a full bucket.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float = 20.0,
+        burst: float = 60.0,
+        max_expensive_in_flight: int = 4,
+        rules: Sequence[CostRule] = DEFAULT_COST_RULES,
+        max_clients: int = 10000
+    ):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_expensive_in_flight = max_expensive_in_flight
+        self.rules = tuple(rules)
+        self.max_clients = max_clients
+
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._flights: Dict[Tuple[str, bytes], asyncio.Future] = {}
+        self.expensive_in_flight = 0
+
+        self.admitted_total = 0
+        self.rate_limited_total = 0
+        self.shed_total = 0
+        self.coalesced_total = 0
+        self.rejected_by_rule: Dict[str, int] = {}
+        self.coalesced_by_rule: Dict[str, int] = {}
+
+    def match(self, method: str, path: str) -> Optional[CostRule]:
+        """Return the rule for a request, None for exempt paths."""
+        if path.startswith(EXEMPT_PREFIXES) or path == "/":
+            return None
+        for rule in self.rules:
+            if method == rule.method and (path == rule.prefix or path.startswith(rule.prefix)):
+                return rule
+        return CostRule("default", method, "", DEFAULT_COST)
+
+    def admit(self, client: str, rule: CostRule) -> float:
+        """
+        Charge the client's bucket for one request.
+
+        Returns:
+            0.0 if admitted, otherwise the Retry-After delay in seconds
+        """
+        now = time.monotonic()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate_per_second, self.burst, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+
+        retry_after = bucket.try_consume(rule.cost, now)
+        if retry_after:
+            self.rate_limited_total += 1
+            self._count(self.rejected_by_rule, rule.name)
+        else:
+            self.admitted_total += 1
+        return retry_after
+
+    def try_start_expensive(self, rule: CostRule) -> bool:
+        """Reserve an expensive-request slot; False means shed the request."""
+        if self.expensive_in_flight >= self.max_expensive_in_flight:
+            self.shed_total += 1
+            self._count(self.rejected_by_rule, rule.name)
+            return False
+        self.expensive_in_flight += 1
+        return True
+
+    def finish_expensive(self) -> None:
+        self.expensive_in_flight -= 1
+
+    # ===== Single flight =====
+
+    def join_flight(self, key: Tuple[str, bytes], rule: CostRule) -> Optional[asyncio.Future]:
+        """Return the in-flight computation for ``key``, if any."""
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced_total += 1
+            self._count(self.coalesced_by_rule, rule.name)
+        return flight
+
+    def lead_flight(self, key: Tuple[str, bytes]) -> asyncio.Future:
+        """Register this request as the one computing ``key``."""
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        return flight
+
+    def end_flight(self, key: Tuple[str, bytes], flight: asyncio.Future, result) -> None:
+        """Publish the leader's response (None if it failed) to followers."""
+        del self._flights[key]
+        flight.set_result(result)
+
+    # ===== Metrics =====
+
+    @staticmethod
+    def _count(counter: Dict[str, int], name: str) -> None:
+        counter[name] = counter.get(name, 0) + 1
+
+    def metrics(self) -> Dict[str, object]:
+        return {
+            "admitted_total": self.admitted_total,
+            "rate_limited_total": self.rate_limited_total,
+            "shed_total": self.shed_total,
+            "coalesced_total": self.coalesced_total,
+            "expensive_in_flight": self.expensive_in_flight,
+            "max_expensive_in_flight": self.max_expensive_in_flight,
+            "tracked_clients": len(self._buckets),
+            "rejected_by_rule": dict(self.rejected_by_rule),
+            "coalesced_by_rule": dict(self.coalesced_by_rule)
+        }
+
+
+def retry_after_header(seconds: float) -> str:
+    """Retry-After takes whole seconds; never advertise 0."""
+    return str(max(1, math.ceil(seconds)))
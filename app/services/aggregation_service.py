@@ -0,0 +1,257 @@
+"""
+Ad-hoc group-by aggregation over activities.
+
+A query filters by goal, activity type and time range, groups by any of
+goal, type, day, week, month and weekday, and computes sum, count, avg,
+min and max per group. Each query is compiled once into a key function and
+an accumulator loop, so new slices need no new hand-written loops.
+
+Compacted daily rollups answer day-or-coarser groupings exactly: a rollup
+contributes its total, its count and the min/max of the folded values (time
+range filters see a rollup at UTC midnight of its day). Results are cached by normalized query and dropped when a save,
+delete or compaction touches a goal the query covers.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from app.models.activity import Activity
+from app.models.rollup import DailyRollup
+from app.repositories.activity_repository import ActivityRepository
+from app.utils.date_helpers import to_utc, utc_date
+
+
+DIMENSIONS = ("goal", "type", "day", "week", "month", "weekday")
+TIME_DIMENSIONS = ("day", "week", "month", "weekday")
+METRICS = ("sum", "count", "avg", "min", "max")
+WEEKDAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
+@dataclass(frozen=True)
+class AggregationQuery:
+    """
+    Normalized aggregation query, usable as a cache key.
+
+    Filters are sorted and de-duplicated, group-by keeps the caller's order
+    (it defines the key order) and times are converted to UTC.
+    """
+
+    goal_ids: Optional[Tuple[str, ...]]
+    activity_types: Optional[Tuple[str, ...]]
+    start: Optional[datetime]
+    end: Optional[datetime]
+    group_by: Tuple[str, ...]
+    metrics: Tuple[str, ...]
+
+    @classmethod
+    def normalize(
+        cls,
+        goal_ids: Optional[Iterable[str]] = None,
+        activity_types: Optional[Iterable[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        group_by: Iterable[str] = (),
+        metrics: Iterable[str] = ("sum",)
+    ) -> "AggregationQuery":
+        group_by = tuple(dict.fromkeys(group_by))
+        metrics = tuple(metric for metric in METRICS if metric in set(metrics))
+        unknown = [dim for dim in group_by if dim not in DIMENSIONS]
+        if unknown or not metrics:
+            raise ValueError(f"Unknown dimensions {unknown}" if unknown else "At least one metric is required")
+        return cls(
+            goal_ids=tuple(sorted(set(goal_ids))) if goal_ids is not None else None,
+            activity_types=tuple(sorted(set(activity_types))) if activity_types is not None else None,
+            start=to_utc(start) if start else None,
+            end=to_utc(end) if end else None,
+            group_by=group_by,
+            metrics=metrics
+        )
+
+    def covers_goal(self, goal_id: str) -> bool:
+        return self.goal_ids is None or goal_id in self.goal_ids
+
+
+@dataclass(frozen=True)
+class AggregationResult:
+    """Groups as (rendered key per dimension, metric values), in key order."""
+
+    groups: List[Tuple[Dict[str, str], Dict[str, float]]]
+    scanned_rows: int
+
+
+# ===== Key extraction =====
+# Each extractor maps (activity, calendar day) to a sortable key part;
+# day-derived parts are memoized since many rows share a day
+
+@lru_cache(maxsize=4096)
+def _week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+@lru_cache(maxsize=4096)
+def _month(day: date) -> Tuple[int, int]:
+    return day.year, day.month
+
+
+_EXTRACTORS: Dict[str, Callable[[Activity, date], object]] = {
+    "goal": lambda activity, day: activity.goal_id,
+    "type": lambda activity, day: activity.activity_type,
+    "day": lambda activity, day: day,
+    "week": lambda activity, day: _week_start(day),
+    "month": lambda activity, day: _month(day),
+    "weekday": lambda activity, day: day.weekday()
+}
+
+_RENDERERS: Dict[str, Callable[[object], str]] = {
+    "goal": str,
+    "type": str,
+    "day": date.isoformat,
+    "week": date.isoformat,
+    "month": lambda month: f"{month[0]:04d}-{month[1]:02d}",
+    "weekday": lambda weekday: WEEKDAY_NAMES[weekday]
+}
+
+
+def compile_key(group_by: Tuple[str, ...]) -> Callable[[Activity], tuple]:
+    """Build the grouping key function for a group-by list."""
+    getters = tuple(_EXTRACTORS[dim] for dim in group_by)
+    if not any(dim in TIME_DIMENSIONS for dim in group_by):
+        return lambda activity: tuple(get(activity, None) for get in getters)
+
+    def key(activity: Activity) -> tuple:
+        # The activity's UTC calendar date, as used by streaks and rollups
+        day = utc_date(activity.timestamp)
+        return tuple(get(activity, day) for get in getters)
+    return key
+
+
+class AggregationService:
+    """
+    Executes aggregation queries with a bounded result cache.
+
+    Scans are pushed down to ``iter_activities`` per goal and time range;
+    type filters and grouping run in one pass over the matching rows.
+    """
+
+    MAX_CACHED_RESULTS = 256
+
+    def __init__(self, repository: ActivityRepository, max_cached_results: int = MAX_CACHED_RESULTS):
+        self.repository = repository
+        self.max_cached_results = max_cached_results
+        self._cache: "OrderedDict[AggregationQuery, AggregationResult]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        repository.add_save_listener(self.on_activity_saved)
+        repository.add_delete_listener(self.on_activity_saved)
+        repository.add_compact_listener(self.on_goal_compacted)
+
+    def on_activity_saved(self, activity: Activity) -> None:
+        """Repository save/delete listener: drop cached results covering the goal."""
+        self._invalidate_goal(activity.goal_id)
+
+    def on_goal_compacted(self, goal_id: str, folded: List[Activity], rollups: List[DailyRollup]) -> None:
+        """
+        Repository compaction listener: drop cached results covering the goal.
+
+        Day-or-coarser results would survive compaction unchanged, but
+        sub-day time ranges and partially covered days do not.
+        """
+        self._invalidate_goal(goal_id)
+
+    def _invalidate_goal(self, goal_id: str) -> None:
+        stale = [query for query in self._cache if query.covers_goal(goal_id)]
+        for query in stale:
+            del self._cache[query]
+
+    def query(self, query: AggregationQuery) -> Tuple[AggregationResult, bool]:
+        """
+        Answer a normalized query.
+
+        Time complexity: O(1) on a cache hit, otherwise O(n + g log g) for n
+        matching rows (after goal/time pushdown) and g groups
+
+        Returns:
+            (result, True if served from the cache)
+        """
+        result = self._cache.get(query)
+        if result is not None:
+            self._cache.move_to_end(query)
+            self.cache_hits += 1
+            return result, True
+
+        self.cache_misses += 1
+        result = self._execute(query)
+        self._cache[query] = result
+        if len(self._cache) > self.max_cached_results:
+            self._cache.popitem(last=False)
+        return result, False
+
+    def _rows(self, query: AggregationQuery) -> Iterable[Activity]:
+        if query.goal_ids is None:
+            return self.repository.iter_activities(None, query.start, query.end)
+        return (
+            activity
+            for goal_id in query.goal_ids
+            for activity in self.repository.iter_activities(goal_id, query.start, query.end)
+        )
+
+    def _execute(self, query: AggregationQuery) -> AggregationResult:
+        key_of = compile_key(query.group_by)
+        types = frozenset(query.activity_types) if query.activity_types is not None else None
+
+        # Accumulator per group: [sum, count, min, max]
+        groups: Dict[tuple, list] = {}
+        scanned = 0
+        for activity in self._rows(query):
+            if types is not None and activity.activity_type not in types:
+                continue
+            scanned += 1
+            value = activity.value
+            count = getattr(activity, "count", 1)
+            if count == 1:
+                low = high = value
+            else:
+                # Rollup: fall back to the mean if folded extremes are unknown
+                mean = value / count if count else value
+                low = getattr(activity, "min_value", None)
+                high = getattr(activity, "max_value", None)
+                low = mean if low is None else low
+                high = mean if high is None else high
+
+            key = key_of(activity)
+            accumulator = groups.get(key)
+            if accumulator is None:
+                groups[key] = [value, count, low, high]
+            else:
+                accumulator[0] += value
+                accumulator[1] += count
+                if low < accumulator[2]:
+                    accumulator[2] = low
+                if high > accumulator[3]:
+                    accumulator[3] = high
+
+        renderers = [_RENDERERS[dim] for dim in query.group_by]
+        rendered = []
+        for key in sorted(groups):
+            total, count, low, high = groups[key]
+            all_metrics = {
+                "sum": total,
+                "count": count,
+                "avg": total / count if count else 0.0,
+                "min": low,
+                "max": high
+            }
+            rendered.append((
+                {dim: render(part) for dim, render, part in zip(query.group_by, renderers, key)},
+                {metric: all_metrics[metric] for metric in query.metrics}
+            ))
+        return AggregationResult(groups=rendered, scanned_rows=scanned)
+
+    def clear(self) -> None:
+        """Drop all cached results."""
+        self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
@@ -3,13 +3,14 @@ Analytics service for computing metrics and insights from activity data.
 
 This service transforms raw activity logs into meaningful business metrics.
 """
-from datetime import datetime, timedelta
-from typing import List, Dict
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Optional
 from app.models.activity import Activity
 from app.utils.date_helpers import (
     calculate_consecutive_days,
     get_week_start,
-    filter_last_n_days
+    filter_last_n_days,
+    to_utc
 )
 
 
@@ -24,6 +25,7 @@ class AnalyticsService:
     """
     
     WELLNESS_THRESHOLD_MINUTES = 150  # WHO recommendation: 150 min/week
+    WELLNESS_WINDOW_DAYS = 7
     
     def calculate_consistency_score(self, activities: List[Activity]) -> float:
         """
@@ -55,13 +57,32 @@ class AnalyticsService:
         timestamps = [activity.timestamp for activity in activities]
         consecutive_days = calculate_consecutive_days(timestamps)
         
+        return self.score_consecutive_days(consecutive_days)
+    
+    def score_consecutive_days(self, consecutive_days: int) -> float:
+        """
+        Map a streak length to the 0-1 consistency score.
+        
+        Args:
+            consecutive_days: Length of the current activity streak
+            
+        Returns:
+            Consistency score between 0.0 and 1.0
+        """
+        if consecutive_days <= 0:
+            return 0.0
+        
         # Normalize using asymptotic formula
         # This rewards consistency but has diminishing returns
         score = consecutive_days / (consecutive_days + 7)
         
         return round(score, 2)
     
-    def check_wellness_warning(self, activities: List[Activity]) -> bool:
+    def check_wellness_warning(
+        self,
+        activities: List[Activity],
+        now: Optional[datetime] = None
+    ) -> bool:
         """
         Determine if user has insufficient health-related activity.
         
@@ -70,6 +91,7 @@ class AnalyticsService:
         
         Args:
             activities: List of Activity objects
+            now: Reference time for the 7-day window (defaults to current UTC time)
             
         Returns:
             True if wellness warning should be triggered
@@ -78,19 +100,57 @@ class AnalyticsService:
             return True  # No activity is a warning
         
         # Calculate cutoff date (7 days ago)
-        from datetime import datetime, timedelta, timezone
-        cutoff = datetime.now(timezone.utc) - timedelta(days=7)
+        cutoff = self._wellness_cutoff(now)
         
         # Filter activities from last 7 days and calculate Health minutes
         recent_health_minutes = sum(
             activity.value
             for activity in activities
-            if (activity.timestamp if activity.timestamp.tzinfo else activity.timestamp.replace(tzinfo=timezone.utc)) >= cutoff
-            and activity.activity_type == "Health"
+            if activity.activity_type == "Health" and to_utc(activity.timestamp) >= cutoff
         )
         
         return recent_health_minutes < self.WELLNESS_THRESHOLD_MINUTES
     
+    def wellness_expiry(
+        self,
+        activities: List[Activity],
+        now: Optional[datetime] = None
+    ) -> Optional[datetime]:
+        """
+        Find when the wellness result next changes if no new activity arrives.
+        
+        That is the moment the oldest Health activity still inside the
+        7-day window ages out of it.
+        
+        Returns:
+            Expiry time in UTC, or None if no Health activity is in the window
+        """
+        cutoff = self._wellness_cutoff(now)
+        in_window = [
+            to_utc(activity.timestamp)
+            for activity in activities
+            if activity.activity_type == "Health" and to_utc(activity.timestamp) >= cutoff
+        ]
+        if not in_window:
+            return None
+        return min(in_window) + timedelta(days=self.WELLNESS_WINDOW_DAYS)
+    
+    def _wellness_cutoff(self, now: Optional[datetime]) -> datetime:
+        now = to_utc(now) if now else datetime.now(timezone.utc)
+        return now - timedelta(days=self.WELLNESS_WINDOW_DAYS)
+    
+    def count_activities(self, activities: List[Activity]) -> int:
+        """
+        Count logged activities, expanding compacted daily rollups.
+        
+        Args:
+            activities: List of Activity objects (may include DailyRollup entries)
+            
+        Returns:
+            Number of raw activities represented
+        """
+        return sum(getattr(activity, "count", 1) for activity in activities)
+    
     def aggregate_by_type(self, activities: List[Activity]) -> Dict[str, float]:
         """
         Aggregate total values by activity type.
@@ -0,0 +1,267 @@
+"""
+Streaming bulk export and import of activities.
+
+Export is a chain of generators over ``ActivityRepository.iter_activities``,
+so memory use is bounded by the chunk size rather than the dataset size.
+Import parses NDJSON or CSV line by line and loads activities in batches
+through ``save_many``, validating fields directly instead of building a
+Pydantic model per row. Parsing and writing are separate steps, so a
+server can parse off the event loop and write on it. A row whose
+``activity_id`` already exists (in memory or in a sealed segment) is
+skipped as a duplicate, so re-importing an export adds nothing; rows
+already folded into a rollup no longer have an id to match and would be
+imported again.
+
+Compacted daily rollups are exported like activities, with their
+``count`` of folded rows (1 for every raw activity) and their
+``rollup:...`` id, so an export always accounts for all history. They
+cannot be re-imported: a rollup is not a raw activity, and importing it as
+one would turn a day's total into a single logged value. Import reports
+such rows as rejected.
+"""
+import csv
+import io
+import json
+import math
+from datetime import datetime
+from uuid import UUID
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from app.models.activity import Activity
+from app.repositories.activity_repository import ActivityRepository
+from app.utils.date_helpers import parse_iso_datetime
+
+
+EXPORT_FIELDS = ("activity_id", "goal_id", "activity_type", "value", "timestamp", "count")
+VALID_ACTIVITY_TYPES = frozenset({"Learning", "Health", "Fitness", "Other"})
+
+# Rows per yielded chunk (one HTTP body chunk / one write call)
+EXPORT_CHUNK_ROWS = 1000
+
+
+def export_ndjson(activities: Iterable[Activity]) -> Iterator[str]:
+    """Encode activities as newline-delimited JSON, chunked."""
+    dumps = json.dumps
+    chunk: List[str] = []
+    for activity in activities:
+        chunk.append(dumps({
+            "activity_id": activity.activity_id,
+            "goal_id": activity.goal_id,
+            "activity_type": activity.activity_type,
+            "value": activity.value,
+            "timestamp": activity.timestamp.isoformat(),
+            "count": getattr(activity, "count", 1)
+        }))
+        if len(chunk) >= EXPORT_CHUNK_ROWS:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+def export_csv(activities: Iterable[Activity]) -> Iterator[str]:
+    """Encode activities as CSV with a header row, chunked."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_FIELDS)
+    rows = 0
+    for activity in activities:
+        writer.writerow((
+            activity.activity_id,
+            activity.goal_id,
+            activity.activity_type,
+            activity.value,
+            activity.timestamp.isoformat(),
+            getattr(activity, "count", 1)
+        ))
+        rows += 1
+        if rows >= EXPORT_CHUNK_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class ImportRowError(ValueError):
+    """Raised for a row that cannot be imported."""
+
+
+def build_activity(record: Dict[str, object]) -> Activity:
+    """
+    Validate a decoded record and build an Activity.
+
+    Applies the same rules as ActivityCreate (non-empty goal_id, known
+    activity_type, positive finite value, ISO-8601 timestamp) without
+    Pydantic.
+    An ``activity_id``, if given, must be a UUID string and is stored in
+    canonical form; an exported rollup (``count`` other than 1) is rejected.
+
+    Raises:
+        ImportRowError: If the record is invalid
+    """
+    try:
+        goal_id = record["goal_id"]
+        activity_type = record["activity_type"]
+        value = float(record["value"])
+        timestamp = record["timestamp"]
+    except KeyError as e:
+        raise ImportRowError(f"missing field {e.args[0]}")
+    except (TypeError, ValueError):
+        raise ImportRowError("value must be a number")
+
+    if not isinstance(goal_id, str) or not goal_id:
+        raise ImportRowError("goal_id must be a non-empty string")
+    if activity_type not in VALID_ACTIVITY_TYPES:
+        raise ImportRowError(f"unknown activity_type {activity_type!r}")
+    if not math.isfinite(value):
+        raise ImportRowError("value must be a finite number")
+    if not value > 0:
+        raise ImportRowError("value must be greater than 0")
+    if isinstance(timestamp, str):
+        try:
+            timestamp = parse_iso_datetime(timestamp)
+        except ValueError:
+            raise ImportRowError("timestamp must be a valid ISO-8601 datetime string")
+    elif not isinstance(timestamp, datetime):
+        raise ImportRowError("timestamp must be a valid ISO-8601 datetime string")
+
+    if record.get("count", 1) not in (1, "1", ""):
+        raise ImportRowError("compacted daily rollups cannot be re-imported")
+    activity_id = record.get("activity_id")
+    if activity_id is not None and activity_id != "":
+        if not isinstance(activity_id, str):
+            raise ImportRowError("activity_id must be a UUID string")
+        try:
+            activity_id = str(UUID(activity_id))
+        except ValueError:
+            raise ImportRowError("activity_id must be a UUID string")
+
+    return Activity(
+        goal_id=goal_id,
+        activity_type=activity_type,
+        value=value,
+        timestamp=timestamp,
+        activity_id=activity_id or None
+    )
+
+
+class BulkImporter:
+    """
+    Incremental importer fed with lines of NDJSON or CSV.
+
+    Usage:
+        importer = BulkImporter(repository, "ndjson")
+        for line in lines:
+            importer.feed_line(line)
+        importer.finish()
+
+    or, to parse and write in separate steps:
+        for batch, given_ids in importer.parse_lines(lines):
+            importer.write_batch(batch, given_ids)
+        importer.finish()
+    """
+
+    BATCH_SIZE = 5000
+    MAX_REPORTED_ERRORS = 20
+
+    def __init__(self, repository: ActivityRepository, format: str):
+        if format not in ("ndjson", "csv"):
+            raise ValueError(f"unsupported import format {format!r}")
+        self.repository = repository
+        self.format = format
+        self.imported = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.errors: List[str] = []
+        self._line_number = 0
+        self._csv_header: Optional[List[str]] = None
+        self._batch: List[Activity] = []
+        # Ids taken from the input; only these can already exist
+        self._given_ids: Set[str] = set()
+
+    def feed_line(self, line: str) -> None:
+        """Parse one line and buffer the resulting activity."""
+        if self._parse(line):
+            self._flush()
+
+    def feed_lines(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.feed_line(line)
+
+    def parse_lines(self, lines: Iterable[str]) -> List[Tuple[List[Activity], Set[str]]]:
+        """
+        Parse lines without writing; returns the batches that filled up.
+
+        Each batch comes with its input-supplied ids, for ``write_batch``.
+        Rows of a partial batch stay buffered until ``finish``.
+        """
+        batches = []
+        for line in lines:
+            if self._parse(line):
+                batches.append(self._take_batch())
+        return batches
+
+    def write_batch(self, batch: List[Activity], given_ids: Set[str]) -> None:
+        """Save a parsed batch, skipping rows whose activity_id already exists."""
+        if given_ids:
+            find_by_id = self.repository.find_by_id
+            existing = {activity_id for activity_id in given_ids if find_by_id(activity_id) is not None}
+            if existing:
+                fresh = [activity for activity in batch if activity.activity_id not in existing]
+                self.duplicates += len(batch) - len(fresh)
+                batch = fresh
+        if batch:
+            self.repository.save_many(batch)
+            self.imported += len(batch)
+
+    def finish(self) -> None:
+        """Write any buffered activities."""
+        self._flush()
+
+    def _parse(self, line: str) -> bool:
+        """Buffer one line's activity; returns True once the batch is full."""
+        self._line_number += 1
+        if not line.strip():
+            return False
+        try:
+            record = self._decode(line)
+            if record is None:
+                return False
+            activity = build_activity(record)
+        except (ImportRowError, ValueError) as e:
+            self._reject(str(e))
+            return False
+        self._batch.append(activity)
+        if record.get("activity_id"):
+            self._given_ids.add(activity.activity_id)
+        return len(self._batch) >= self.BATCH_SIZE
+
+    def _take_batch(self) -> Tuple[List[Activity], Set[str]]:
+        batch, given_ids = self._batch, self._given_ids
+        self._batch, self._given_ids = [], set()
+        return batch, given_ids
+
+    def _decode(self, line: str) -> Optional[Dict[str, object]]:
+        if self.format == "ndjson":
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ImportRowError("each line must be a JSON object")
+            return record
+
+        fields = next(csv.reader((line,)))
+        if self._csv_header is None:
+            self._csv_header = [field.strip() for field in fields]
+            return None
+        if len(fields) != len(self._csv_header):
+            raise ImportRowError(f"expected {len(self._csv_header)} columns, got {len(fields)}")
+        return dict(zip(self._csv_header, fields))
+
+    def _reject(self, reason: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < self.MAX_REPORTED_ERRORS:
+            self.errors.append(f"line {self._line_number}: {reason}")
+
+    def _flush(self) -> None:
+        if self._batch:
+            self.write_batch(*self._take_batch())
@@ -0,0 +1,129 @@
+"""
+Per-goal change log for delta synchronisation of dashboards.
+
+Every save and delete is stamped with a version from one process-wide counter, so
+versions increase monotonically within each goal. The counter starts at the
+boot time in microseconds: versions handed out by an earlier process are
+always older than anything this process can answer, and clients holding them
+are told to resync instead of receiving a wrong delta.
+"""
+import time
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+from app.models.activity import Activity
+from app.models.rollup import DailyRollup
+from app.repositories.activity_repository import ActivityRepository
+
+
+class _GoalChanges:
+    """Bounded version -> activity id log of one goal."""
+
+    __slots__ = ("floor", "versions", "activity_ids", "latest")
+
+    def __init__(self, floor: int):
+        # Deltas can be computed for any ``since`` >= floor
+        self.floor = floor
+        self.versions: List[int] = []
+        self.activity_ids: List[str] = []
+        # Newest version per activity id, so a modified activity is sent once
+        self.latest: Dict[str, int] = {}
+
+    @property
+    def version(self) -> int:
+        return self.versions[-1] if self.versions else self.floor
+
+
+class GoalChangeLog:
+    """
+    Monotonic per-goal versions and the activities changed after a version.
+
+    - A save or delete appends (version, activity_id) to its goal's log; a
+      later change to the same id supersedes its earlier entry, and readers
+      tell deletions apart by the id no longer resolving to this goal
+    - Each goal keeps at most ``max_changes_per_goal`` entries; clients
+      behind the oldest retained entry must resync
+    - ``invalidate`` forces every client of a goal (or of all goals) to
+      resync, for changes that bypass the save path; compaction does so
+      per compacted goal through the repository's compact listener
+    """
+
+    MAX_CHANGES_PER_GOAL = 1000
+
+    def __init__(self, repository: ActivityRepository, max_changes_per_goal: int = MAX_CHANGES_PER_GOAL):
+        self.max_changes_per_goal = max_changes_per_goal
+        self.boot_version = time.time_ns() // 1000
+        self._clock = self.boot_version
+        self._goals: Dict[str, _GoalChanges] = {}
+
+        repository.add_save_listener(self.on_activity_saved)
+        repository.add_delete_listener(self.on_activity_saved)
+        repository.add_compact_listener(self.on_goal_compacted)
+
+    def on_activity_saved(self, activity: Activity) -> None:
+        """Repository save/delete listener: stamp the activity with a new version."""
+        self._clock += 1
+        log = self._goals.get(activity.goal_id)
+        if log is None:
+            log = self._goals[activity.goal_id] = _GoalChanges(self.boot_version)
+        log.versions.append(self._clock)
+        log.activity_ids.append(activity.activity_id)
+        log.latest[activity.activity_id] = self._clock
+
+        if len(log.versions) > 2 * self.max_changes_per_goal:
+            self._trim(log)
+
+    def on_goal_compacted(self, goal_id: str, folded: List[Activity], rollups: List[DailyRollup]) -> None:
+        """Repository compaction listener: rows were replaced by rollups, so clients resync."""
+        self.invalidate(goal_id)
+
+    def _trim(self, log: _GoalChanges) -> None:
+        """Drop the oldest entries, keeping the newest ``max_changes_per_goal``."""
+        cut = len(log.versions) - self.max_changes_per_goal
+        log.floor = log.versions[cut - 1]
+        for version, activity_id in zip(log.versions[:cut], log.activity_ids[:cut]):
+            if log.latest.get(activity_id) == version:
+                del log.latest[activity_id]
+        del log.versions[:cut]
+        del log.activity_ids[:cut]
+
+    def current_version(self, goal_id: str) -> int:
+        """Version a client holds after reading the goal's full dashboard now."""
+        log = self._goals.get(goal_id)
+        return log.version if log is not None else self.boot_version
+
+    def changes_since(self, goal_id: str, since: int) -> Tuple[int, Optional[List[str]]]:
+        """
+        Activity ids saved, modified or deleted after version ``since``.
+
+        Time complexity: O(log n + c) for c changes
+
+        Returns:
+            (current version, ids in version order), with ids None when the
+            client must resync (``since`` predates the log or is unknown)
+        """
+        log = self._goals.get(goal_id)
+        if log is None:
+            log = _GoalChanges(self.boot_version)
+        if since < log.floor or since > log.version:
+            return log.version, None
+
+        start = bisect_right(log.versions, since)
+        changed = [
+            activity_id
+            for version, activity_id in zip(log.versions[start:], log.activity_ids[start:])
+            if log.latest.get(activity_id) == version
+        ]
+        return log.version, changed
+
+    def invalidate(self, goal_id: Optional[str] = None) -> None:
+        """Require a resync from every client of ``goal_id`` (all goals if None)."""
+        self._clock += 1
+        if goal_id is None:
+            self.boot_version = self._clock
+            self._goals.clear()
+        else:
+            self._goals[goal_id] = _GoalChanges(self._clock)
+
+    def __len__(self) -> int:
+        """Number of goals with logged changes."""
+        return len(self._goals)
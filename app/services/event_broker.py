@@ -0,0 +1,241 @@
+"""
+Event broker for pushing dashboard and insights updates to live subscribers.
+
+Writes are observed through the repository's save listeners, coalesced over a
+short window, and fanned out to every subscriber of the affected topic.
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set
+from app.models.activity import Activity
+from app.repositories.activity_repository import ActivityRepository
+from app.schemas.activity_schema import (
+    ActivityResponse,
+    DashboardUpdateEvent,
+    InsightsResponse
+)
+from app.services.analytics_service import AnalyticsService
+from app.services.recommendation_service import RecommendationService
+
+
+logger = logging.getLogger(__name__)
+
+INSIGHTS_TOPIC = "insights"
+
+
+def dashboard_topic(goal_id: str) -> str:
+    """Build the topic name for a goal's dashboard updates."""
+    return f"dashboard:{goal_id}"
+
+
+class Subscription:
+    """
+    A single subscriber's mailbox.
+
+    The queue is bounded: when a slow consumer falls behind, the oldest
+    pending event is discarded so the writer never waits. The next delivered
+    event is then flagged with ``resync`` so the client can refetch.
+    """
+
+    def __init__(self, topic: str, max_pending: int):
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.dropped = False
+
+    def offer(self, event: str, payload) -> None:
+        """Enqueue an event without blocking, evicting the oldest if full."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped = True
+        self.queue.put_nowait((event, payload))
+
+    async def next_event(self) -> tuple[str, str]:
+        """Wait for the next event and return (event_name, json_data)."""
+        event, payload = await self.queue.get()
+        if self.dropped and isinstance(payload, DashboardUpdateEvent):
+            payload = payload.model_copy(update={"resync": True})
+            self.dropped = False
+        return event, payload.model_dump_json()
+
+
+class DashboardEventBroker:
+    """
+    Fan-out hub for dashboard and insights updates.
+
+    - Each save marks its goal as dirty and remembers the new activity;
+      each delete remembers the removed id
+    - Dirty goals are flushed once per coalescing window, so a burst of
+      writes produces a single recomputation and push per topic
+    - Topics without subscribers are ignored at save time (no extra work)
+    - With ``global_analytics`` the insights payload is computed by that
+      GlobalAnalyticsOffloader in a worker process instead of on the loop
+    """
+
+    COALESCE_WINDOW_SECONDS = 0.25
+    MAX_PENDING_EVENTS = 16
+
+    def __init__(
+        self,
+        repository: ActivityRepository,
+        analytics_service: AnalyticsService,
+        recommendation_service: RecommendationService,
+        coalesce_window: float = COALESCE_WINDOW_SECONDS,
+        global_analytics=None
+    ):
+        self.repository = repository
+        self.analytics_service = analytics_service
+        self.recommendation_service = recommendation_service
+        self.coalesce_window = coalesce_window
+        self.global_analytics = global_analytics
+
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._pending: Dict[str, List[Activity]] = {}
+        self._removed: Dict[str, List[str]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flush_scheduled = False
+        # Offloaded insights publications in flight; referenced until done
+        self._insights_tasks: Set[asyncio.Task] = set()
+
+        repository.add_save_listener(self.on_activity_saved)
+        repository.add_delete_listener(self.on_activity_deleted)
+
+    # ===== Subscription management =====
+
+    def subscribe(self, topic: str) -> Subscription:
+        """Register a new subscriber for a topic."""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(topic, self.MAX_PENDING_EVENTS)
+        self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscriber; empty topics are dropped."""
+        subscribers = self._subscribers.get(subscription.topic)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.topic]
+
+    def subscriber_count(self) -> int:
+        """Return the number of active subscriptions across all topics."""
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    # ===== Write path =====
+
+    def on_activity_saved(self, activity: Activity) -> None:
+        """
+        Repository save listener.
+
+        Only records the change; recomputation happens in the coalesced flush.
+        """
+        goal_subscribed = dashboard_topic(activity.goal_id) in self._subscribers
+        if not goal_subscribed and INSIGHTS_TOPIC not in self._subscribers:
+            return
+
+        self._pending.setdefault(activity.goal_id, []).append(activity)
+        self._schedule_flush()
+
+    def on_activity_deleted(self, activity: Activity) -> None:
+        """
+        Repository delete listener.
+
+        A removal cancels a not-yet-published append of the same activity.
+        """
+        goal_subscribed = dashboard_topic(activity.goal_id) in self._subscribers
+        if not goal_subscribed and INSIGHTS_TOPIC not in self._subscribers:
+            return
+
+        pending = self._pending.setdefault(activity.goal_id, [])
+        pending[:] = [entry for entry in pending if entry is not activity]
+        self._removed.setdefault(activity.goal_id, []).append(activity.activity_id)
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if not self._flush_scheduled and self._loop is not None:
+            self._flush_scheduled = True
+            self._loop.call_soon_threadsafe(
+                self._loop.call_later, self.coalesce_window, self._flush
+            )
+
+    def _flush(self) -> None:
+        """Recompute and publish one event per dirty topic."""
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, {}
+        removed, self._removed = self._removed, {}
+
+        for goal_id, new_activities in pending.items():
+            topic = dashboard_topic(goal_id)
+            if topic in self._subscribers:
+                self._publish(
+                    topic,
+                    "dashboard",
+                    self.build_dashboard_event(goal_id, new_activities, removed.get(goal_id, []))
+                )
+
+        if pending and INSIGHTS_TOPIC in self._subscribers:
+            if self.global_analytics is not None:
+                task = asyncio.ensure_future(self._publish_offloaded_insights())
+                self._insights_tasks.add(task)
+                task.add_done_callback(self._insights_published)
+            else:
+                self._publish(INSIGHTS_TOPIC, "insights", self.build_insights_event())
+
+    async def _publish_offloaded_insights(self) -> None:
+        self._publish(INSIGHTS_TOPIC, "insights", await self.insights_snapshot())
+
+    def _insights_published(self, task: asyncio.Task) -> None:
+        self._insights_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Failed to publish offloaded insights", exc_info=task.exception())
+
+    def _publish(self, topic: str, event: str, payload) -> None:
+        for subscription in list(self._subscribers.get(topic, ())):
+            subscription.offer(event, payload)
+
+    # ===== Payload builders =====
+
+    def build_dashboard_event(
+        self,
+        goal_id: str,
+        new_activities: List[Activity],
+        removed_activity_ids: Optional[List[str]] = None
+    ) -> DashboardUpdateEvent:
+        """Compute the current metrics for a goal plus the appended and removed activities."""
+        activities = self.repository.find_by_goal_id(goal_id)
+        return DashboardUpdateEvent(
+            goal_id=goal_id,
+            total_activities=self.analytics_service.count_activities(activities),
+            aggregated_values=self.analytics_service.aggregate_by_type(activities),
+            consistency_score=self.analytics_service.calculate_consistency_score(activities),
+            wellness_warning=self.analytics_service.check_wellness_warning(activities),
+            new_activities=[
+                ActivityResponse(**activity.to_dict())
+                for activity in sorted(new_activities, key=lambda a: a.timestamp)
+            ],
+            removed_activity_ids=removed_activity_ids or []
+        )
+
+    async def insights_snapshot(self) -> InsightsResponse:
+        """
+        Current global insights, computed by ``global_analytics`` when set.
+
+        Without it this is ``build_insights_event`` on the loop.
+        """
+        if self.global_analytics is None:
+            return self.build_insights_event()
+        metrics = await self.global_analytics.get_global_metrics()
+        return InsightsResponse(
+            consistency_score=metrics.consistency_score,
+            wellness_warning=metrics.wellness_warning,
+            recommendation=metrics.recommendation
+        )
+
+    def build_insights_event(self) -> InsightsResponse:
+        """Compute the global insights payload from every row (no ``global_analytics``)."""
+        all_activities = self.repository.find_all()
+        return InsightsResponse(
+            consistency_score=self.analytics_service.calculate_consistency_score(all_activities),
+            wellness_warning=self.analytics_service.check_wellness_warning(all_activities),
+            recommendation=self.recommendation_service.generate_recommendation(all_activities)
+        )
@@ -0,0 +1,194 @@
+"""
+Idempotent ingestion: de-duplication of client-supplied activity keys.
+
+Retries and re-sent offline journals carry the same idempotency key (or
+client activity id). Keys are scoped to their goal, and each (goal, key)
+pair deterministically maps to one activity_id, so the repository itself
+is the authoritative duplicate check; a Bloom filter keeps that check
+cheap, and activities still queued for async ingestion are held until the
+writer commits them.
+"""
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+from uuid import NAMESPACE_URL, uuid5
+from app.models.activity import Activity
+from app.repositories.activity_repository import ActivityRepository
+from app.utils.bloom_filter import BloomFilter
+
+
+# Namespace for activity ids derived from client idempotency keys
+IDEMPOTENCY_NAMESPACE = uuid5(NAMESPACE_URL, "life-design/activities/idempotency-key")
+
+
+def _is_derived_id(activity_id: str) -> bool:
+    """True for a canonical version-5 UUID string, the form ``activity_id_for`` returns."""
+    return len(activity_id) == 36 and activity_id[14] == "5"
+
+
+class IdempotencyIndex:
+    """
+    Layered duplicate detector for goal-scoped idempotency keys.
+
+    Lookup order:
+    1. Bloom filter - a miss (the common, non-duplicate case) costs only
+       a few hash probes and ends the check
+    2. Pending activities - submitted to the async ingestion queue but not
+       yet committed, so not yet visible in the repository
+    3. Repository - ``find_by_id`` on the derived activity_id resolves
+       Bloom false positives and every committed duplicate
+
+    The same key sent for two different goals names two activities, so
+    clients cannot read each other's activities by reusing a key.
+
+    Persisted history (e.g. sealed segments) is added to the filter by
+    ``load`` during startup; until ``mark_warmed`` runs, a filter miss
+    falls through to the repository instead of ending the check, so a
+    retry is never taken for new right after a restart.
+
+    The filter is rotated once it holds ``bloom_capacity`` keys, keeping the
+    previous generation, so memory stays bounded. A key forgotten by both
+    generations is saved again under the same derived activity_id: that
+    replaces the original while it is a raw row in memory, but duplicates
+    it once the original has been sealed into a segment or folded into a
+    daily rollup.
+    """
+
+    DEFAULT_BLOOM_CAPACITY = 1_000_000
+    DEFAULT_ERROR_RATE = 0.001
+    DEFAULT_PENDING_CAPACITY = 100_000
+
+    def __init__(
+        self,
+        repository: ActivityRepository,
+        bloom_capacity: int = DEFAULT_BLOOM_CAPACITY,
+        error_rate: float = DEFAULT_ERROR_RATE,
+        pending_capacity: int = DEFAULT_PENDING_CAPACITY
+    ):
+        self.repository = repository
+        self.bloom_capacity = bloom_capacity
+        self.error_rate = error_rate
+        self.pending_capacity = pending_capacity
+
+        self._current = BloomFilter(bloom_capacity, error_rate)
+        self._previous: Optional[BloomFilter] = None
+        # activity_id -> Activity, oldest first; bounded in case a queued
+        # write is never committed
+        self._pending: OrderedDict[str, Activity] = OrderedDict()
+        self.warmed = False
+
+        # Metrics
+        self.checks_total = 0
+        self.bloom_negatives = 0
+        self.pending_hits = 0
+        self.repository_hits = 0
+        self.false_positives = 0
+
+        repository.add_save_listener(self.on_activity_committed)
+        repository.add_delete_listener(self.on_activity_committed)
+
+    @staticmethod
+    def activity_id_for(goal_id: str, key: str) -> str:
+        """Derive the stable activity_id used for an idempotency key within a goal."""
+        # Length prefix keeps ("ab", "c") and ("a", "bc") apart
+        return str(uuid5(IDEMPOTENCY_NAMESPACE, f"{len(goal_id)}:{goal_id}:{key}"))
+
+    def lookup(self, goal_id: str, key: str) -> Optional[Activity]:
+        """
+        Return the activity previously ingested under ``key`` for the goal, if any.
+
+        Args:
+            goal_id: Goal the activity is logged against
+            key: Client idempotency key or client activity id
+
+        Returns:
+            The original Activity for a duplicate, otherwise None
+        """
+        self.checks_total += 1
+        activity_id = self.activity_id_for(goal_id, key)
+
+        if self.warmed and not self._might_contain(activity_id):
+            self.bloom_negatives += 1
+            return None
+
+        activity = self._pending.get(activity_id)
+        if activity is not None:
+            self.pending_hits += 1
+            return activity
+
+        activity = self.repository.find_by_id(activity_id)
+        if activity is None:
+            self.false_positives += 1
+            return None
+
+        self.repository_hits += 1
+        return activity
+
+    def remember(self, activity: Activity, pending: bool = False) -> None:
+        """
+        Record that an activity with a derived id has been ingested.
+
+        Args:
+            activity: The activity saved under ``activity_id_for(goal_id, key)``
+            pending: True if it was queued and is not yet in the repository
+        """
+        self._add(activity.activity_id)
+        if pending:
+            self._pending[activity.activity_id] = activity
+            while len(self._pending) > self.pending_capacity:
+                self._pending.popitem(last=False)
+
+    def load(self, activities: Iterable[Activity]) -> None:
+        """Add persisted activities with key-derived (name-based, v5) ids to the filter."""
+        for activity in activities:
+            if _is_derived_id(activity.activity_id):
+                self._add(activity.activity_id)
+
+    def mark_warmed(self) -> None:
+        """History is loaded: filter misses are now authoritative."""
+        self.warmed = True
+
+    def _add(self, activity_id: str) -> None:
+        if self._current.is_saturated():
+            self._previous, self._current = self._current, BloomFilter(self.bloom_capacity, self.error_rate)
+        self._current.add(activity_id)
+
+    def _might_contain(self, activity_id: str) -> bool:
+        if self._current.might_contain(activity_id):
+            return True
+        return self._previous is not None and self._previous.might_contain(activity_id)
+
+    def on_activity_committed(self, activity: Activity) -> None:
+        """
+        Repository save/delete listener: stop holding a queued activity.
+
+        From then on lookups resolve through the repository, which returns
+        the committed (or updated) version, and nothing after a delete.
+        """
+        self._pending.pop(activity.activity_id, None)
+
+    def on_ingestion_failed(self, activities: List[Activity]) -> None:
+        """
+        Ingestion failure listener: forget queued activities that were dropped.
+
+        A retry with the same key then misses the pending map and the
+        repository, and is ingested again.
+        """
+        for activity in activities:
+            self._pending.pop(activity.activity_id, None)
+
+    def clear(self) -> None:
+        """Forget all keys."""
+        self._current = BloomFilter(self.bloom_capacity, self.error_rate)
+        self._previous = None
+        self._pending.clear()
+
+    def metrics(self) -> dict:
+        """Counters describing how duplicate checks were resolved."""
+        return {
+            "checks_total": self.checks_total,
+            "bloom_negatives": self.bloom_negatives,
+            "pending_hits": self.pending_hits,
+            "repository_hits": self.repository_hits,
+            "false_positives": self.false_positives,
+            "pending_keys": len(self._pending)
+        }
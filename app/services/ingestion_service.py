@@ -0,0 +1,192 @@
+"""
+Asynchronous ingestion queue for activity writes.
+
+In async ingestion mode, request handlers only validate and enqueue; a single
+background writer drains the queue in batches into the repository. This keeps
+bursts of writes from interleaving with dashboard reads one row at a time.
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, List, Optional
+from app.models.activity import Activity
+from app.repositories.activity_repository import ActivityRepository
+
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionQueueFull(Exception):
+    """Raised when the ingestion queue cannot accept more activities."""
+
+    def __init__(self, retry_after_seconds: int):
+        super().__init__("Ingestion queue is full")
+        self.retry_after_seconds = retry_after_seconds
+
+
+class IngestionQueue:
+    """
+    Bounded queue with a batching background writer.
+
+    - ``submit`` never blocks: a full queue raises IngestionQueueFull so the
+      API can shed load instead of piling up requests
+    - The writer takes whatever is queued (up to ``batch_size``) and commits
+      it with a single ``save_many`` call
+    - A batch that fails is retried row by row, so only rows that fail on
+      their own are lost; those are logged, counted in ``failed_total`` and
+      reported to failure listeners (clients were already answered 202)
+    - Commit lag is the time between enqueue and commit of an activity
+    """
+
+    DEFAULT_MAX_SIZE = 10_000
+    DEFAULT_BATCH_SIZE = 500
+
+    def __init__(
+        self,
+        repository: ActivityRepository,
+        max_size: int = DEFAULT_MAX_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ):
+        self.repository = repository
+        self.max_size = max_size
+        self.batch_size = batch_size
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._failure_listeners: List[Callable[[List[Activity]], None]] = []
+
+        # Metrics
+        self.enqueued_total = 0
+        self.committed_total = 0
+        self.rejected_total = 0
+        self.failed_total = 0
+        self.batches_total = 0
+        self.last_commit_lag_seconds = 0.0
+        self.max_commit_lag_seconds = 0.0
+
+    # ===== Lifecycle =====
+
+    def start(self) -> None:
+        """Create the queue and start the writer on the running loop."""
+        if self._writer is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._writer = asyncio.create_task(self._drain_forever(), name="ingestion-writer")
+
+    async def stop(self) -> None:
+        """Stop the writer after committing everything already accepted."""
+        if self._writer is None:
+            return
+        self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
+        self._writer = None
+        while not self._queue.empty():
+            self._commit(self._take_batch([]))
+
+    @property
+    def running(self) -> bool:
+        return self._writer is not None
+
+    def add_failure_listener(self, listener: Callable[[List[Activity]], None]) -> None:
+        """Register a callback receiving accepted activities that could not be committed."""
+        self._failure_listeners.append(listener)
+
+    # ===== Write path =====
+
+    def submit(self, activity: Activity) -> Activity:
+        """
+        Enqueue an activity for asynchronous persistence.
+
+        Raises:
+            IngestionQueueFull: If the queue is at capacity
+            RuntimeError: If the writer is not running (before ``start`` or
+                after ``stop``); callers should then save inline
+        """
+        if self._writer is None:
+            raise RuntimeError("Ingestion queue is not running; call start() first")
+        try:
+            self._queue.put_nowait((time.monotonic(), activity))
+        except asyncio.QueueFull:
+            self.rejected_total += 1
+            raise IngestionQueueFull(self._retry_after_seconds())
+        self.enqueued_total += 1
+        return activity
+
+    def _retry_after_seconds(self) -> int:
+        """Rough time for the writer to make room, based on the last lag."""
+        return max(1, round(self.last_commit_lag_seconds))
+
+    async def _drain_forever(self) -> None:
+        while True:
+            first = await self._queue.get()
+            self._commit(self._take_batch([first]))
+            # Yield so readers get a turn between batches
+            await asyncio.sleep(0)
+
+    def _take_batch(self, batch: List[tuple]) -> List[tuple]:
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    def _commit(self, batch: List[tuple]) -> None:
+        if not batch:
+            return
+        try:
+            self.repository.save_many([activity for _, activity in batch])
+        except Exception:
+            logger.exception("Failed to commit ingestion batch of %d activities; retrying row by row", len(batch))
+            batch = self._commit_rows(batch)
+            if not batch:
+                return
+
+        now = time.monotonic()
+        oldest_enqueued_at = batch[0][0]
+        self.last_commit_lag_seconds = now - oldest_enqueued_at
+        self.max_commit_lag_seconds = max(self.max_commit_lag_seconds, self.last_commit_lag_seconds)
+        self.committed_total += len(batch)
+        self.batches_total += 1
+
+    def _commit_rows(self, batch: List[tuple]) -> List[tuple]:
+        """
+        Save a failed batch one row at a time.
+
+        Rows the batch had already stored are replaced under the same id,
+        not duplicated.
+
+        Returns:
+            The entries that were committed
+        """
+        committed, failed = [], []
+        for entry in batch:
+            try:
+                self.repository.save(entry[1])
+            except Exception:
+                logger.exception("Dropped accepted activity %s", entry[1].activity_id)
+                failed.append(entry[1])
+            else:
+                committed.append(entry)
+        if failed:
+            self.failed_total += len(failed)
+            for listener in self._failure_listeners:
+                listener(failed)
+        return committed
+
+    # ===== Observability =====
+
+    def depth(self) -> int:
+        """Number of accepted activities not yet committed."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def metrics(self) -> dict:
+        """Snapshot of queue depth, throughput counters and commit lag."""
+        return {
+            "queue_depth": self.depth(),
+            "queue_capacity": self.max_size,
+            "enqueued_total": self.enqueued_total,
+            "committed_total": self.committed_total,
+            "rejected_total": self.rejected_total,
+            "failed_total": self.failed_total,
+            "batches_total": self.batches_total,
+            "last_commit_lag_ms": round(self.last_commit_lag_seconds * 1000, 3),
+            "max_commit_lag_ms": round(self.max_commit_lag_seconds * 1000, 3)
+        }
@@ -0,0 +1,332 @@
+"""
+Incrementally maintained cross-goal leaderboards.
+
+Each board is a sorted index of (score, goal_id) updated in place whenever a
+save or the clock changes a goal's score, so reading the top K entries never
+touches other goals or their activities.
+
+Boards:
+- ``streaks``: current streak in days (alive while the latest active day is
+  today or yesterday), longest first; activity days and "today" are both
+  UTC calendar days, as in AnalyticsService's consistency streak
+- ``learning-this-week``: Learning minutes in the current UTC week (Monday
+  start), highest first
+- ``wellness-risk``: goals with activities whose Health minutes over the
+  last 7 days are below the wellness threshold, fewest minutes first
+"""
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from datetime import date, datetime, timedelta, timezone
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+from app.models.activity import Activity
+from app.repositories.activity_repository import ActivityRepository
+from app.services.analytics_service import AnalyticsService
+from app.utils.date_helpers import get_week_start, to_utc, utc_date
+
+
+STREAKS_BOARD = "streaks"
+LEARNING_BOARD = "learning-this-week"
+WELLNESS_RISK_BOARD = "wellness-risk"
+BOARDS = (STREAKS_BOARD, LEARNING_BOARD, WELLNESS_RISK_BOARD)
+
+
+class RankedIndex:
+    """
+    Sorted (score, goal_id) list with a goal -> score map.
+
+    ``update`` locates the old and new positions by binary search
+    (O(log G) comparisons; the list shift is a memmove), and ``page`` slices
+    the list in O(K). Ties are broken by goal_id for stable pagination.
+    """
+
+    def __init__(self, descending: bool):
+        self.descending = descending
+        self._entries: List[Tuple[float, str]] = []
+        self._scores: Dict[str, float] = {}
+
+    def _key(self, goal_id: str, score: float) -> Tuple[float, str]:
+        return (-score if self.descending else score, goal_id)
+
+    def update(self, goal_id: str, score: Optional[float]) -> None:
+        """Set a goal's score; None removes the goal from the board."""
+        previous = self._scores.get(goal_id)
+        if previous == score:
+            return
+        if previous is not None:
+            position = bisect_left(self._entries, self._key(goal_id, previous))
+            del self._entries[position]
+            del self._scores[goal_id]
+        if score is not None:
+            insort(self._entries, self._key(goal_id, score))
+            self._scores[goal_id] = score
+
+    def page(self, offset: int, limit: int) -> List[Tuple[int, str, float]]:
+        """Return (rank, goal_id, score) for ranks offset+1 .. offset+limit."""
+        return [
+            (offset + index + 1, goal_id, self._scores[goal_id])
+            for index, (_, goal_id) in enumerate(self._entries[offset:offset + limit])
+        ]
+
+    def goal_ids(self) -> List[str]:
+        return list(self._scores)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DayRuns:
+    """
+    Maximal runs of consecutive active days, as sorted run starts plus a
+    start -> end map.
+
+    Activating or deactivating a day merges or splits at most two runs and
+    finding the run containing a day is a binary search, so both cost
+    O(log R) for R runs rather than a walk over the streak's days.
+    """
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self):
+        self.starts: List[date] = []
+        self.ends: Dict[date, date] = {}
+
+    def run_containing(self, day: date) -> Optional[Tuple[date, date]]:
+        """The (start, end) run containing ``day``, if it is active."""
+        position = bisect_right(self.starts, day) - 1
+        if position >= 0 and self.ends[self.starts[position]] >= day:
+            start = self.starts[position]
+            return start, self.ends[start]
+        return None
+
+    def add(self, day: date) -> None:
+        """Activate a day that was inactive."""
+        start, end = day, day
+        before = self.run_containing(day - timedelta(days=1))
+        if before is not None:
+            start = before[0]
+            self._remove(start)
+        after_start = day + timedelta(days=1)
+        if after_start in self.ends:
+            end = self.ends[after_start]
+            self._remove(after_start)
+        insort(self.starts, start)
+        self.ends[start] = end
+
+    def discard(self, day: date) -> None:
+        """Deactivate an active day, splitting its run."""
+        start, end = self.run_containing(day)
+        self._remove(start)
+        for part_start, part_end in ((start, day - timedelta(days=1)), (day + timedelta(days=1), end)):
+            if part_start <= part_end:
+                insort(self.starts, part_start)
+                self.ends[part_start] = part_end
+
+    def _remove(self, start: date) -> None:
+        del self.starts[bisect_left(self.starts, start)]
+        del self.ends[start]
+
+
+class _GoalState:
+    """Per-goal inputs from which the board scores are derived."""
+
+    __slots__ = ("active_days", "day_runs", "weekly_learning", "health_window", "health_minutes")
+
+    def __init__(self):
+        # Activities per active UTC day, so a delete knows when a day goes inactive
+        self.active_days: Dict[date, int] = {}
+        self.day_runs = DayRuns()
+        self.weekly_learning: Dict[date, float] = {}
+        # Sorted by time; entries expire from the left
+        self.health_window: Deque[Tuple[datetime, float]] = deque()
+        self.health_minutes = 0.0
+
+
+class LeaderboardService:
+    """
+    Keeps the leaderboards current from save events and scheduled ticks.
+
+    - ``on_activity_saved`` and ``on_activity_deleted`` (repository
+      listeners) add or subtract one activity and update only its goal
+    - ``expire_wellness_windows`` drops Health minutes that aged out of the
+      7-day window, using a min-heap of expiry times to visit only the goals
+      that actually changed
+    - ``rollover`` runs after each UTC midnight: it re-evaluates every
+      goal's streak (a goal with activity dated ahead of the old day may
+      join the board) and rebuilds the weekly board when a new week starts
+
+    Activities that already existed when the service was created (persisted
+    history) are fed in through ``load``.
+    """
+
+    def __init__(self, repository: ActivityRepository, analytics_service: AnalyticsService):
+        self.analytics_service = analytics_service
+        self.window = timedelta(days=analytics_service.WELLNESS_WINDOW_DAYS)
+        self.boards: Dict[str, RankedIndex] = {
+            STREAKS_BOARD: RankedIndex(descending=True),
+            LEARNING_BOARD: RankedIndex(descending=True),
+            WELLNESS_RISK_BOARD: RankedIndex(descending=False)
+        }
+
+        self._states: Dict[str, _GoalState] = {}
+        self._expiries: List[Tuple[datetime, str]] = []
+
+        now = datetime.now(timezone.utc)
+        self._today = now.date()
+        self._week_start = get_week_start(now).date()
+
+        repository.add_save_listener(self.on_activity_saved)
+        repository.add_delete_listener(self.on_activity_deleted)
+
+    # ===== Write path =====
+
+    def load(self, activities: Iterable[Activity]) -> None:
+        """Apply activities saved before this service was created."""
+        now = datetime.now(timezone.utc)
+        for activity in activities:
+            self._apply(activity, now)
+
+    def on_activity_saved(self, activity: Activity) -> None:
+        """Repository save listener."""
+        self._apply(activity, datetime.now(timezone.utc))
+
+    def on_activity_deleted(self, activity: Activity) -> None:
+        """Repository delete listener: subtract the activity's contributions."""
+        if activity.goal_id in self._states:
+            self._apply(activity, datetime.now(timezone.utc), sign=-1)
+
+    def _apply(self, activity: Activity, now: datetime, sign: int = 1) -> None:
+        goal_id = activity.goal_id
+        state = self._states.get(goal_id)
+        if state is None:
+            state = self._states[goal_id] = _GoalState()
+
+        day = utc_date(activity.timestamp)
+        remaining = state.active_days.get(day, 0) + sign
+        if remaining > 0:
+            if day not in state.active_days:
+                state.day_runs.add(day)
+            state.active_days[day] = remaining
+        elif state.active_days.pop(day, None) is not None:
+            state.day_runs.discard(day)
+        self._update_streak(goal_id, state)
+
+        if activity.activity_type == "Learning":
+            week_start = get_week_start(activity.timestamp).date()
+            if week_start >= self._week_start:
+                minutes = state.weekly_learning.get(week_start, 0.0) + sign * activity.value
+                if minutes > 1e-9:
+                    state.weekly_learning[week_start] = minutes
+                else:
+                    state.weekly_learning.pop(week_start, None)
+                self._update_learning(goal_id, state)
+
+        if activity.activity_type == "Health":
+            timestamp = to_utc(activity.timestamp)
+            entry = (timestamp, activity.value)
+            if sign > 0 and timestamp >= now - self.window:
+                if state.health_window and entry < state.health_window[-1]:
+                    insort(state.health_window, entry)
+                else:
+                    state.health_window.append(entry)
+                state.health_minutes += activity.value
+                heapq.heappush(self._expiries, (timestamp + self.window, goal_id))
+            elif sign < 0:
+                # Still in the window unless it already expired
+                position = bisect_left(state.health_window, entry)
+                if position < len(state.health_window) and state.health_window[position] == entry:
+                    del state.health_window[position]
+                    state.health_minutes -= activity.value
+                    if not state.health_window:
+                        state.health_minutes = 0.0
+
+        self._update_wellness(goal_id, state)
+        if not state.active_days:
+            # Every activity of the goal was deleted
+            del self._states[goal_id]
+
+    # ===== Score updates =====
+
+    def _update_streak(self, goal_id: str, state: _GoalState) -> None:
+        """Time complexity: O(log R + log G) for R runs of active days and G goals."""
+        streak = 0
+        for day in (self._today, self._today - timedelta(days=1)):
+            run = state.day_runs.run_containing(day)
+            if run is not None:
+                streak = (day - run[0]).days + 1
+                break
+        self.boards[STREAKS_BOARD].update(goal_id, streak or None)
+
+    def _update_learning(self, goal_id: str, state: _GoalState) -> None:
+        minutes = state.weekly_learning.get(self._week_start, 0.0)
+        self.boards[LEARNING_BOARD].update(goal_id, minutes or None)
+
+    def _update_wellness(self, goal_id: str, state: _GoalState) -> None:
+        # A goal left without activities is not at risk, it is gone
+        at_risk = (
+            bool(state.active_days)
+            and state.health_minutes < self.analytics_service.WELLNESS_THRESHOLD_MINUTES
+        )
+        self.boards[WELLNESS_RISK_BOARD].update(goal_id, state.health_minutes if at_risk else None)
+
+    # ===== Scheduled maintenance =====
+
+    def expire_wellness_windows(self, now: Optional[datetime] = None) -> int:
+        """
+        Remove Health minutes older than the wellness window.
+
+        Returns:
+            Number of goals whose wellness score changed
+        """
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - self.window
+        changed = set()
+        while self._expiries and self._expiries[0][0] <= now:
+            _, goal_id = heapq.heappop(self._expiries)
+            state = self._states.get(goal_id)
+            if state is None:
+                continue
+            while state.health_window and state.health_window[0][0] < cutoff:
+                _, value = state.health_window.popleft()
+                state.health_minutes -= value
+                changed.add(goal_id)
+        for goal_id in changed:
+            self._update_wellness(goal_id, self._states[goal_id])
+        return len(changed)
+
+    def rollover(self, now: Optional[datetime] = None) -> None:
+        """Advance the board calendar to the current UTC day and week."""
+        now = now or datetime.now(timezone.utc)
+        today = now.date()
+        if today == self._today:
+            return
+        self._today = today
+
+        for goal_id, state in self._states.items():
+            self._update_streak(goal_id, state)
+
+        week_start = get_week_start(now).date()
+        if week_start != self._week_start:
+            self._week_start = week_start
+            for goal_id, state in self._states.items():
+                state.weekly_learning = {
+                    week: minutes for week, minutes in state.weekly_learning.items() if week >= week_start
+                }
+                self._update_learning(goal_id, state)
+
+        self.expire_wellness_windows(now)
+
+    # ===== Reads =====
+
+    def top(self, board: str, offset: int = 0, limit: int = 10) -> Tuple[int, List[Tuple[int, str, float]]]:
+        """
+        Read one page of a board.
+
+        Returns:
+            (total entries on the board, [(rank, goal_id, score), ...])
+
+        Raises:
+            KeyError: If the board does not exist
+        """
+        index = self.boards[board]
+        return len(index), index.page(offset, limit)
@@ -0,0 +1,243 @@
+"""
+Precomputed goal and global metrics kept fresh by writes and by the clock.
+
+Dashboard and insights metrics depend on the current time (the 7-day
+wellness window), so a cached value can go stale without any new write.
+Each entry therefore records when it expires. Expired entries are
+recomputed lazily by the next read; the background scheduler only evicts
+them (so they do not hold memory) and precomputes recently written goals
+while writes are quiet. The cache holds at most ``max_entries`` goals,
+evicting the least recently used.
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+from app.models.activity import Activity
+from app.repositories.activity_repository import ActivityRepository
+from app.services.analytics_service import AnalyticsService
+from app.services.recommendation_service import RecommendationService
+from app.utils.date_helpers import next_utc_midnight
+
+
+# Cache key for metrics computed over all goals
+GLOBAL_SCOPE = None
+
+
+@dataclass(frozen=True)
+class ScopeMetrics:
+    """Metrics computed for one goal (or globally) at a point in time."""
+
+    total_activities: int
+    aggregated_values: Dict[str, float]
+    consistency_score: float
+    wellness_warning: bool
+    computed_at: datetime
+    expires_at: datetime
+    recommendation: Optional[str] = None
+
+
+class MetricsCache:
+    """
+    Write-invalidated, time-expiring cache of per-goal and global metrics.
+
+    - A save or delete drops the affected goal's entry and the global entry
+    - An entry expires at the next UTC midnight or when the oldest Health
+      activity in its wellness window ages out, whichever comes first
+    - Expired entries are recomputed on the next read, never eagerly
+    - At most ``max_entries`` entries are kept (least recently used evicted)
+    - Goals written recently are remembered as "active" so they can be
+      precomputed when the service is idle
+    - With ``offload_global`` set, idle precompute never computes the
+      global entry on the event loop; GlobalAnalyticsOffloader refills it
+      from a worker
+    """
+
+    MAX_ENTRIES = 10_000
+
+    def __init__(
+        self,
+        repository: ActivityRepository,
+        analytics_service: AnalyticsService,
+        recommendation_service: RecommendationService,
+        max_entries: int = MAX_ENTRIES
+    ):
+        self.repository = repository
+        self.analytics_service = analytics_service
+        self.recommendation_service = recommendation_service
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[Optional[str], ScopeMetrics]" = OrderedDict()
+        self._active_goals: Set[str] = set()
+        self.last_write_monotonic = 0.0
+        self.offload_global = False
+
+        repository.add_save_listener(self.on_activity_saved)
+        repository.add_delete_listener(self.on_activity_deleted)
+
+    def on_activity_saved(self, activity: Activity) -> None:
+        """Repository save listener: invalidate affected scopes."""
+        self._entries.pop(activity.goal_id, None)
+        self._entries.pop(GLOBAL_SCOPE, None)
+        self._active_goals.add(activity.goal_id)
+        self.last_write_monotonic = time.monotonic()
+
+    def on_activity_deleted(self, activity: Activity) -> None:
+        """Repository delete listener: a removal invalidates like a save."""
+        self.on_activity_saved(activity)
+
+    # ===== Reads =====
+
+    def get_goal_metrics(
+        self,
+        goal_id: str,
+        activities: Optional[List[Activity]] = None,
+        now: Optional[datetime] = None
+    ) -> ScopeMetrics:
+        """
+        Return fresh metrics for a goal, computing them on a miss.
+
+        Args:
+            goal_id: Unique identifier for the goal
+            activities: The goal's activities, if the caller already fetched them
+            now: Reference time shared by a batch of reads (defaults to current UTC time)
+        """
+        now = now or datetime.now(timezone.utc)
+        entry = self._fresh_entry(goal_id, now)
+        if entry is None:
+            if activities is None:
+                activities = self.repository.find_by_goal_id(goal_id)
+            entry = self._compute(goal_id, activities, now)
+        return entry
+
+    def get_global_metrics(self) -> ScopeMetrics:
+        """Return fresh global metrics including the recommendation."""
+        entry = self._fresh_entry(GLOBAL_SCOPE)
+        if entry is None:
+            entry = self._compute(GLOBAL_SCOPE, self.repository.find_all())
+        return entry
+
+    def cached_global(self, now: Optional[datetime] = None) -> Optional[ScopeMetrics]:
+        """Return the global entry if it is still fresh, without computing."""
+        return self._fresh_entry(GLOBAL_SCOPE, now)
+
+    def store_global(self, entry: ScopeMetrics) -> None:
+        """Cache global metrics computed elsewhere."""
+        self._store(GLOBAL_SCOPE, entry)
+
+    def _fresh_entry(self, scope: Optional[str], now: Optional[datetime] = None) -> Optional[ScopeMetrics]:
+        entry = self._entries.get(scope)
+        if entry is not None and entry.expires_at > (now or datetime.now(timezone.utc)):
+            self._entries.move_to_end(scope)
+            return entry
+        return None
+
+    def _store(self, scope: Optional[str], entry: ScopeMetrics) -> None:
+        self._entries[scope] = entry
+        self._entries.move_to_end(scope)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _compute(
+        self,
+        scope: Optional[str],
+        activities: List[Activity],
+        now: Optional[datetime] = None
+    ) -> ScopeMetrics:
+        now = now or datetime.now(timezone.utc)
+        analytics = self.analytics_service
+
+        expires_at = next_utc_midnight(now)
+        wellness_expiry = analytics.wellness_expiry(activities, now)
+        if wellness_expiry is not None:
+            expires_at = min(expires_at, wellness_expiry)
+
+        consistency_score = analytics.calculate_consistency_score(activities)
+        wellness_warning = analytics.check_wellness_warning(activities, now)
+
+        recommendation = None
+        if scope is GLOBAL_SCOPE:
+            recommendation = self.recommendation_service.generate_recommendation(
+                activities, consistency_score, wellness_warning
+            )
+
+        entry = ScopeMetrics(
+            total_activities=analytics.count_activities(activities),
+            aggregated_values=analytics.aggregate_by_type(activities),
+            consistency_score=consistency_score,
+            wellness_warning=wellness_warning,
+            computed_at=now,
+            expires_at=expires_at,
+            recommendation=recommendation
+        )
+        self._store(scope, entry)
+        return entry
+
+    # ===== Scheduled maintenance =====
+
+    def evict_expired(self) -> int:
+        """
+        Drop entries whose wellness window or day has rolled over.
+
+        Reads recompute them on demand, so no scan runs here.
+
+        Returns:
+            Number of entries evicted
+        """
+        now = datetime.now(timezone.utc)
+        expired = [scope for scope, entry in self._entries.items() if entry.expires_at <= now]
+        for scope in expired:
+            del self._entries[scope]
+        return len(expired)
+
+    def evict_all(self) -> int:
+        """
+        Drop every cached entry (run at day boundaries, when all expire).
+
+        Returns:
+            Number of entries evicted
+        """
+        evicted = len(self._entries)
+        self._entries.clear()
+        return evicted
+
+    def precompute_active(self, idle_seconds: float, limit: int = 100) -> int:
+        """
+        Fill missing entries for recently written goals while writes are quiet.
+
+        Args:
+            idle_seconds: Minimum time since the last write to count as idle
+            limit: Maximum number of goals to compute in one run
+
+        Returns:
+            Number of entries computed
+        """
+        if time.monotonic() - self.last_write_monotonic < idle_seconds:
+            return 0
+
+        computed = 0
+        while self._active_goals and computed < limit:
+            goal_id = self._active_goals.pop()
+            if goal_id not in self._entries:
+                self._recompute(goal_id)
+                computed += 1
+
+        if not self._active_goals and GLOBAL_SCOPE not in self._entries and not self.offload_global:
+            self._recompute(GLOBAL_SCOPE)
+            computed += 1
+        return computed
+
+    def _recompute(self, scope: Optional[str]) -> None:
+        if scope is GLOBAL_SCOPE:
+            self._compute(GLOBAL_SCOPE, self.repository.find_all())
+        else:
+            self._compute(scope, self.repository.find_by_goal_id(scope))
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        self._entries.clear()
+        self._active_goals.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,486 @@
+"""
+Global analytics off the event loop: a columnar activity log, shared-memory
+snapshots and a process pool (or, with a sharded repository, partial
+aggregates merged across shard processes).
+
+The log keeps one row per in-memory activity in typed arrays (the segment
+column encoding plus a count column), appended by a save listener.
+Compaction replaces folded rows by their daily rollups, and rows sealed
+into segments leave the log: a snapshot reads sealed history straight from
+the segments' mapped columns instead. Computing global metrics publishes
+the columns into a ``SharedMemory`` block with one memcpy per column and
+segment, and a worker process reads the columns in place; no Activity
+objects are pickled. The event loop only awaits the result.
+"""
+import asyncio
+import multiprocessing
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from app.models.activity import Activity
+from app.models.rollup import DailyRollup
+from app.repositories.activity_repository import ActivityRepository
+from app.repositories.segment_store import (
+    ACTIVITY_TYPES,
+    _EPOCH,
+    _TYPE_CODES,
+    Segment,
+    _to_epoch_micros,
+    _utc_offset_minutes
+)
+from app.repositories.segmented_repository import SegmentedActivityRepository
+from app.services.analytics_service import AnalyticsService
+from app.services.metrics_cache import MetricsCache, ScopeMetrics
+from app.services.recommendation_service import ActivityFeatures, RecommendationService
+from app.utils.date_helpers import next_utc_midnight
+
+
+DAY_MICROS = 86_400_000_000
+_HEALTH_CODE = _TYPE_CODES["Health"]
+
+# Snapshot sections, in order, each 8-byte aligned
+SNAPSHOT_COLUMNS = (
+    ("timestamps", "q"),
+    ("utc_offsets", "h"),
+    ("values", "d"),
+    ("type_codes", "B"),
+    ("counts", "I")
+)
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def snapshot_layout(rows: int) -> Tuple[List[int], int]:
+    """Return (section offsets, total size) for a snapshot of ``rows`` rows."""
+    offsets = []
+    position = 0
+    for _, fmt in SNAPSHOT_COLUMNS:
+        offsets.append(position)
+        position = _align(position + rows * array(fmt).itemsize)
+    return offsets, max(position, 8)
+
+
+class ColumnarActivityLog:
+    """
+    Append-mostly columnar copy of the in-memory activities (~23 bytes of
+    column data per row plus an id -> row map).
+
+    Re-saving an existing id overwrites its row in place, so the log holds
+    the same logical set as the repository's in-memory tier. A removed,
+    compacted or sealed row becomes a tombstone (count 0, skipped by the
+    worker); once tombstones make up half of the log it is rewritten
+    without them, so the log shrinks with the tier it mirrors.
+    """
+
+    MIN_REWRITE_ROWS = 1024
+
+    def __init__(self):
+        self.columns: Dict[str, array] = {name: array(fmt) for name, fmt in SNAPSHOT_COLUMNS}
+        self._row_by_id: Dict[str, int] = {}
+        self.dead_rows = 0
+        self.version = 0
+
+    def append(self, activity: Activity) -> None:
+        """Repository save listener."""
+        fields = (
+            _to_epoch_micros(activity.timestamp),
+            _utc_offset_minutes(activity.timestamp),
+            float(activity.value),
+            _TYPE_CODES[activity.activity_type],
+            getattr(activity, "count", 1)
+        )
+        row = self._row_by_id.get(activity.activity_id)
+        if row is None:
+            self._row_by_id[activity.activity_id] = len(self)
+            for (name, _), value in zip(SNAPSHOT_COLUMNS, fields):
+                self.columns[name].append(value)
+        else:
+            for (name, _), value in zip(SNAPSHOT_COLUMNS, fields):
+                self.columns[name][row] = value
+        self.version += 1
+
+    def remove(self, activity: Activity) -> None:
+        """Repository delete listener."""
+        row = self._row_by_id.pop(activity.activity_id, None)
+        if row is None:
+            return
+        self.columns["counts"][row] = 0
+        self.dead_rows += 1
+        self.version += 1
+        if self.dead_rows >= self.MIN_REWRITE_ROWS and 2 * self.dead_rows >= len(self):
+            self._rewrite()
+
+    def _rewrite(self) -> None:
+        """Drop tombstoned rows; O(n), amortized over at least n/2 deletes."""
+        live = sorted(self._row_by_id.items(), key=lambda item: item[1])
+        for name, fmt in SNAPSHOT_COLUMNS:
+            column = self.columns[name]
+            self.columns[name] = array(fmt, (column[row] for _, row in live))
+        self._row_by_id = {activity_id: row for row, (activity_id, _) in enumerate(live)}
+        self.dead_rows = 0
+
+    def compact(self, goal_id: str, folded: List[Activity], rollups: List[DailyRollup]) -> None:
+        """Repository compaction listener: rows give way to their (new or grown) rollups."""
+        for activity in folded:
+            self.remove(activity)
+        for rollup in rollups:
+            self.append(rollup)
+
+    def seal(self, activities: List[Activity]) -> None:
+        """Seal listener: the rows are now read from their segment."""
+        for activity in activities:
+            self.remove(activity)
+
+    def load(self, activities: Iterable[Activity]) -> None:
+        """Add activities saved before the log was attached."""
+        for activity in activities:
+            self.append(activity)
+
+    def publish(self, segments: Sequence[Segment] = ()) -> Tuple[SharedMemory, int]:
+        """
+        Copy the columns, followed by those of ``segments``, into a new
+        shared-memory block.
+
+        Segment rows get count 1, or 0 if tombstoned. The caller owns the
+        block and must ``close()`` and ``unlink()`` it.
+
+        Returns:
+            (block, number of rows in the snapshot)
+        """
+        segment_counts = []
+        for segment in segments:
+            counts = array("I", [1]) * segment.row_count
+            for row in segment.deleted:
+                counts[row] = 0
+            segment_counts.append(counts)
+
+        rows = len(self) + sum(segment.row_count for segment in segments)
+        offsets, size = snapshot_layout(rows)
+        block = SharedMemory(create=True, size=size)
+        for (name, _), offset in zip(SNAPSHOT_COLUMNS, offsets):
+            parts = [self.columns[name]]
+            parts += segment_counts if name == "counts" else [getattr(segment, name) for segment in segments]
+            for part in parts:
+                data = memoryview(part).cast("B")
+                block.buf[offset:offset + len(data)] = data
+                offset += len(data)
+                data.release()
+        return block, rows
+
+    def __len__(self) -> int:
+        return len(self.columns["timestamps"])
+
+
+class GlobalPartial:
+    """
+    Mergeable partial of the global metrics over a subset of rows.
+
+    Every field combines exactly (sums, earliest first-seen times, a union
+    of active days), so partials of disjoint row sets merge into the
+    partial of their union and ``finish`` gives the same metrics as one
+    scan over all rows.
+    """
+
+    __slots__ = ("total", "type_totals", "first_seen", "active_days", "recent_health", "oldest_recent_health")
+
+    def __init__(self):
+        self.total = 0
+        self.type_totals = [0.0] * len(ACTIVITY_TYPES)
+        self.first_seen: Dict[int, int] = {}
+        self.active_days = set()
+        self.recent_health = 0.0
+        self.oldest_recent_health: Optional[int] = None
+
+    def scan(self, rows: Iterable[Tuple[int, int, float, int, int]], cutoff_micros: int) -> "GlobalPartial":
+        """
+        Add encoded rows of (epoch micros, UTC offset, value, type code, count).
+
+        Rows with count 0 (tombstones) are skipped; Health rows at or after
+        ``cutoff_micros`` count towards the wellness window.
+        """
+        total = self.total
+        type_totals = self.type_totals
+        first_seen = self.first_seen
+        active_days = self.active_days
+        recent_health = self.recent_health
+        oldest_recent_health = self.oldest_recent_health
+
+        for timestamp, offset, value, code, count in rows:
+            if count == 0:
+                continue
+            total += count
+            type_totals[code] += value
+            if code not in first_seen or timestamp < first_seen[code]:
+                first_seen[code] = timestamp
+            active_days.add(timestamp // DAY_MICROS)
+            if code == _HEALTH_CODE and timestamp >= cutoff_micros:
+                recent_health += value
+                if oldest_recent_health is None or timestamp < oldest_recent_health:
+                    oldest_recent_health = timestamp
+
+        self.total = total
+        self.recent_health = recent_health
+        self.oldest_recent_health = oldest_recent_health
+        return self
+
+    def merge(self, other: "GlobalPartial") -> "GlobalPartial":
+        """Fold another partial (over disjoint rows) into this one."""
+        self.total += other.total
+        for code, value in enumerate(other.type_totals):
+            self.type_totals[code] += value
+        for code, timestamp in other.first_seen.items():
+            if code not in self.first_seen or timestamp < self.first_seen[code]:
+                self.first_seen[code] = timestamp
+        self.active_days |= other.active_days
+        self.recent_health += other.recent_health
+        if other.oldest_recent_health is not None and (
+            self.oldest_recent_health is None or other.oldest_recent_health < self.oldest_recent_health
+        ):
+            self.oldest_recent_health = other.oldest_recent_health
+        return self
+
+    def finish(self, window_days: int, threshold_minutes: float) -> Dict[str, object]:
+        """Streak, scores and recommendation from the merged partial."""
+        streak = 0
+        if self.active_days:
+            day = max(self.active_days)
+            while day in self.active_days:
+                streak += 1
+                day -= 1
+
+        analytics_service = AnalyticsService()
+        consistency_score = analytics_service.score_consecutive_days(streak)
+        wellness_warning = self.total == 0 or self.recent_health < threshold_minutes
+        aggregated = {
+            ACTIVITY_TYPES[code]: self.type_totals[code]
+            for code in sorted(self.first_seen, key=self.first_seen.get)
+        }
+        features = ActivityFeatures(
+            activity_count=self.total,
+            type_totals=aggregated,
+            streak_days=streak,
+            consistency_score=consistency_score,
+            recent_health_minutes=self.recent_health,
+            wellness_warning=wellness_warning
+        )
+        return {
+            "total_activities": self.total,
+            "aggregated_values": aggregated,
+            "consistency_score": consistency_score,
+            "wellness_warning": wellness_warning,
+            "wellness_expiry_micros": (
+                self.oldest_recent_health + window_days * DAY_MICROS
+                if self.oldest_recent_health is not None else None
+            ),
+            "recommendation": RecommendationService(analytics_service).evaluate(features)
+        }
+
+
+def compute_global_metrics(
+    block_name: str,
+    rows: int,
+    now_micros: int,
+    window_days: int,
+    threshold_minutes: float
+) -> Dict[str, object]:
+    """
+    Worker entry point: global metrics from a published snapshot.
+
+    Mirrors MetricsCache's global computation (counts, per-type totals,
+    consistency streak over UTC dates, 7-day Health minutes and
+    the wellness expiry) and then applies the recommendation rules.
+    """
+    # Spawned workers share the server's resource tracker, so attaching does
+    # not take ownership; the server unlinks the block after the call
+    block = SharedMemory(name=block_name)
+    offsets, _ = snapshot_layout(rows)
+    views = [
+        block.buf[offset:offset + rows * array(fmt).itemsize].cast(fmt)
+        for (_, fmt), offset in zip(SNAPSHOT_COLUMNS, offsets)
+    ]
+    try:
+        partial = GlobalPartial().scan(zip(*views), now_micros - window_days * DAY_MICROS)
+    finally:
+        for view in views:
+            view.release()
+        block.close()
+    return partial.finish(window_days, threshold_minutes)
+
+
+def shard_global_partial(repository: ActivityRepository, now_micros: int, window_days: int) -> GlobalPartial:
+    """Shard entry point (see ShardedActivityRepository.scatter): partial over the shard's rows."""
+    rows = (
+        (
+            _to_epoch_micros(activity.timestamp),
+            _utc_offset_minutes(activity.timestamp),
+            float(activity.value),
+            _TYPE_CODES[activity.activity_type],
+            getattr(activity, "count", 1)
+        )
+        for activity in repository.iter_activities()
+    )
+    return GlobalPartial().scan(rows, now_micros - window_days * DAY_MICROS)
+
+
+class GlobalAnalyticsOffloader:
+    """
+    Computes global metrics in a worker process and caches them in MetricsCache.
+
+    - A fresh cached entry is returned without any work
+    - Concurrent callers share one in-flight computation
+    - A result is cached only if no write landed while it was computed;
+      otherwise it is still returned (it was correct for its snapshot)
+    """
+
+    def __init__(
+        self,
+        repository: ActivityRepository,
+        analytics_service: AnalyticsService,
+        metrics_cache: MetricsCache,
+        max_workers: int = 1
+    ):
+        self.analytics_service = analytics_service
+        self.metrics_cache = metrics_cache
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight: Optional[asyncio.Future] = None
+
+        metrics_cache.offload_global = True
+        self._attach(repository)
+
+    def _attach(self, repository: ActivityRepository) -> None:
+        self.log = ColumnarActivityLog()
+        repository.add_save_listener(self.log.append)
+        repository.add_delete_listener(self.log.remove)
+        repository.add_compact_listener(self.log.compact)
+        # Sealed history is read from the segments' own columns at snapshot time
+        self.segment_store = None
+        if isinstance(repository, SegmentedActivityRepository):
+            self.segment_store = repository.segment_store
+            repository.add_seal_listener(self.log.seal)
+
+    def _version(self) -> int:
+        """Changes whenever a write lands (guards caching of stale results)."""
+        return self.log.version
+
+    def load(self, activities: Iterable[Activity]) -> None:
+        """HistoryLoader consumer for persisted activities."""
+        if self.segment_store is not None:
+            # Persisted history is the segments, already part of every snapshot
+            return
+        self.log.load(activities)
+
+    async def get_global_metrics(self) -> ScopeMetrics:
+        """Return fresh global metrics, computing them off the event loop on a miss."""
+        entry = self.metrics_cache.cached_global()
+        if entry is not None:
+            return entry
+        if self._in_flight is None:
+            self._in_flight = asyncio.ensure_future(self._compute())
+            self._in_flight.add_done_callback(self._clear_in_flight)
+        return await asyncio.shield(self._in_flight)
+
+    async def precompute(self, idle_seconds: float) -> bool:
+        """
+        Scheduler job: refill a missing global entry while writes are quiet.
+
+        Returns:
+            True if a computation ran
+        """
+        if time.monotonic() - self.metrics_cache.last_write_monotonic < idle_seconds:
+            return False
+        if self.metrics_cache.cached_global() is not None:
+            return False
+        await self.get_global_metrics()
+        return True
+
+    def _clear_in_flight(self, _) -> None:
+        self._in_flight = None
+
+    async def _compute(self) -> ScopeMetrics:
+        now = datetime.now(timezone.utc)
+        version = self._version()
+        result = await self._gather(now)
+
+        expires_at = next_utc_midnight(now)
+        expiry_micros = result.pop("wellness_expiry_micros")
+        if expiry_micros is not None:
+            expires_at = min(expires_at, _EPOCH + timedelta(microseconds=expiry_micros))
+        entry = ScopeMetrics(computed_at=now, expires_at=expires_at, **result)
+
+        if self._version() == version:
+            self.metrics_cache.store_global(entry)
+        return entry
+
+    async def _gather(self, now: datetime) -> Dict[str, object]:
+        """Run ``compute_global_metrics`` in the pool over a fresh snapshot."""
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+
+        segments = self.segment_store.segments if self.segment_store is not None else ()
+        block, rows = self.log.publish(segments)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor,
+                compute_global_metrics,
+                block.name,
+                rows,
+                _to_epoch_micros(now),
+                self.analytics_service.WELLNESS_WINDOW_DAYS,
+                self.analytics_service.WELLNESS_THRESHOLD_MINUTES
+            )
+        finally:
+            block.close()
+            block.unlink()
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class ShardedGlobalAnalytics(GlobalAnalyticsOffloader):
+    """
+    Global metrics by scatter-gather over a ShardedActivityRepository.
+
+    Each shard process scans its own rows into a GlobalPartial; only the
+    partials cross process boundaries and are merged here. Caching and
+    single-flight behave as in GlobalAnalyticsOffloader.
+    """
+
+    def _attach(self, repository: ActivityRepository) -> None:
+        self.repository = repository
+        self.writes = 0
+        repository.add_save_listener(self._count_write)
+        repository.add_delete_listener(self._count_write)
+
+    def _count_write(self, _: Activity) -> None:
+        self.writes += 1
+
+    def _version(self) -> int:
+        return self.writes
+
+    def load(self, activities: Iterable[Activity]) -> None:
+        """Shards hold their rows themselves; nothing to load."""
+
+    async def _gather(self, now: datetime) -> Dict[str, object]:
+        window_days = self.analytics_service.WELLNESS_WINDOW_DAYS
+        # The shards compute in parallel; a thread keeps the event loop free
+        # while their replies are awaited
+        partials = await asyncio.to_thread(
+            self.repository.scatter, shard_global_partial, _to_epoch_micros(now), window_days
+        )
+        merged = GlobalPartial()
+        for partial in partials:
+            merged.merge(partial)
+        return merged.finish(window_days, self.analytics_service.WELLNESS_THRESHOLD_MINUTES)
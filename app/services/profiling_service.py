@@ -0,0 +1,336 @@
+"""
+Request profiling: per-stage timing traces, a slow-request log and
+on-demand profiler runs.
+
+Stage timing is exclusive: while a nested stage runs (e.g. the repository
+called from AnalyticsService), its parent's clock is paused, so stage
+durations add up to the traced request time.
+"""
+import cProfile
+import heapq
+import hmac
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+
+STAGE_REPOSITORY = "repository"
+STAGE_ANALYTICS = "analytics"
+STAGE_RECOMMENDATION = "recommendation"
+STAGE_ENDPOINT = "endpoint"
+STAGE_SERIALIZATION = "serialization"
+
+PROFILE_MODES = ("cprofile", "sampling")
+
+
+class RequestTrace:
+    """Exclusive wall-clock time per stage for one request."""
+
+    __slots__ = ("stages", "_stack")
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self._stack: List[List] = []
+
+    def enter(self, stage: str) -> None:
+        now = time.perf_counter()
+        if self._stack:
+            parent = self._stack[-1]
+            self.stages[parent[0]] = self.stages.get(parent[0], 0.0) + now - parent[1]
+        self._stack.append([stage, now])
+
+    def exit(self) -> None:
+        now = time.perf_counter()
+        stage, started = self._stack.pop()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - started
+        if self._stack:
+            self._stack[-1][1] = now
+
+    def breakdown_ms(self) -> Dict[str, float]:
+        return {stage: round(seconds * 1000, 3) for stage, seconds in self.stages.items()}
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+def start_trace() -> RequestTrace:
+    """Attach a new trace to the current request context."""
+    trace = RequestTrace()
+    _current_trace.set(trace)
+    return trace
+
+
+def end_trace() -> None:
+    _current_trace.set(None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+def _timed(function, stage: str):
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        trace = _current_trace.get()
+        if trace is None:
+            return function(*args, **kwargs)
+        trace.enter(stage)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            trace.exit()
+    return wrapper
+
+
+def _timed_iterator(function, stage: str):
+    """Time each step of a returned iterator, not just its creation."""
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        trace = _current_trace.get()
+        iterator = function(*args, **kwargs)
+        if trace is None:
+            return iterator
+        return _TimedIterator(iterator, trace, stage)
+    return wrapper
+
+
+class _TimedIterator:
+    __slots__ = ("_iterator", "_trace", "_stage")
+
+    def __init__(self, iterator, trace: RequestTrace, stage: str):
+        self._iterator = iter(iterator)
+        self._trace = trace
+        self._stage = stage
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self._trace.enter(self._stage)
+        try:
+            return next(self._iterator)
+        finally:
+            self._trace.exit()
+
+
+def instrument(target: object, stage: str, iterator_methods=("iter_activities", "iter_persisted_activities")) -> object:
+    """
+    Attribute the time of ``target``'s public methods to ``stage``.
+
+    Wrappers are installed on the instance, so calls through ``self`` are
+    timed too. Without an active trace a wrapper costs one context-variable
+    lookup.
+
+    Returns:
+        The same (now instrumented) object
+    """
+    for name in dir(type(target)):
+        if name.startswith("_"):
+            continue
+        attribute = getattr(target, name)
+        if not callable(attribute) or isinstance(attribute, type):
+            continue
+        wrap = _timed_iterator if name in iterator_methods else _timed
+        setattr(target, name, wrap(attribute, stage))
+    return target
+
+
+class SamplingProfiler:
+    """
+    Stack sampler for one thread (stdlib only).
+
+    A daemon thread reads the target thread's current frame every
+    ``interval`` seconds and counts collapsed call stacks; the report lists
+    the most frequent stacks, i.e. where wall-clock time was spent.
+    """
+
+    def __init__(self, interval: float = 0.001, max_depth: int = 40):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def report(self, limit: int = 30) -> str:
+        total = sum(self.samples.values())
+        lines = [f"{total} samples at {self.interval * 1000:g} ms"]
+        for stack, count in self.samples.most_common(limit):
+            lines.append(f"{count:6d} {count / total:6.1%}  {stack}")
+        return "\n".join(lines)
+
+
+class RequestProfiler:
+    """
+    Profiling state shared by the middleware and the debug endpoints.
+
+    - Slow-request log: a sampled fraction of requests are traced; the
+      ``slow_log_size`` slowest traced requests above ``slow_threshold_ms``
+      are kept in a min-heap (O(log K) per recorded request)
+    - On-demand profiles: a request carrying the profiling token (in the
+      ``X-Profile-Token`` header) runs under cProfile or the sampling
+      profiler; the report is stored under an id (last
+      ``MAX_STORED_PROFILES`` kept). Both profilers observe the event
+      loop thread, so work interleaved from concurrent requests can appear;
+      one on-demand run is active at a time
+
+    All settings can be changed at runtime through ``configure``.
+    """
+
+    MAX_STORED_PROFILES = 20
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        slow_log_enabled: bool = True,
+        sample_rate: float = 0.01,
+        slow_threshold_ms: float = 50.0,
+        slow_log_size: int = 50
+    ):
+        self.token = token
+        self.slow_log_enabled = slow_log_enabled
+        self.sample_rate = sample_rate
+        self.slow_threshold_ms = slow_threshold_ms
+        self.slow_log_size = slow_log_size
+        self._slowest: List[tuple] = []
+        self._sequence = 0
+        self._sample_credit = 0.0
+        self.profiles: "OrderedDict[str, Dict[str, object]]" = OrderedDict()
+        self._profile_active = False
+
+    # ===== Settings =====
+
+    def configure(self, **settings) -> None:
+        """Update settings in place; unknown names raise ValueError."""
+        for name, value in settings.items():
+            if name not in ("slow_log_enabled", "sample_rate", "slow_threshold_ms", "slow_log_size"):
+                raise ValueError(f"unknown profiling setting {name!r}")
+            if value is not None:
+                setattr(self, name, value)
+        while len(self._slowest) > self.slow_log_size:
+            heapq.heappop(self._slowest)
+
+    def settings(self) -> Dict[str, object]:
+        return {
+            "slow_log_enabled": self.slow_log_enabled,
+            "sample_rate": self.sample_rate,
+            "slow_threshold_ms": self.slow_threshold_ms,
+            "slow_log_size": self.slow_log_size,
+            "on_demand_enabled": self.token is not None
+        }
+
+    # ===== Slow-request log =====
+
+    def should_trace(self) -> bool:
+        """Deterministic sampling: trace every (1 / sample_rate)-th request."""
+        if not self.slow_log_enabled or self.sample_rate <= 0:
+            return False
+        self._sample_credit += self.sample_rate
+        if self._sample_credit >= 1.0:
+            self._sample_credit -= 1.0
+            return True
+        return False
+
+    def record(self, method: str, path: str, status_code: int, total_ms: float, trace: RequestTrace) -> None:
+        """Offer a finished request to the slow log."""
+        if total_ms < self.slow_threshold_ms:
+            return
+        if len(self._slowest) >= self.slow_log_size and total_ms <= self._slowest[0][0]:
+            return
+        self._sequence += 1
+        entry = {
+            "method": method,
+            "path": path,
+            "status_code": status_code,
+            "total_ms": round(total_ms, 3),
+            "stages_ms": trace.breakdown_ms(),
+            "recorded_at": datetime.now(timezone.utc).isoformat()
+        }
+        item = (total_ms, self._sequence, entry)
+        if len(self._slowest) < self.slow_log_size:
+            heapq.heappush(self._slowest, item)
+        else:
+            heapq.heapreplace(self._slowest, item)
+
+    def slowest(self) -> List[Dict[str, object]]:
+        """Recorded slow requests, slowest first."""
+        return [entry for _, _, entry in sorted(self._slowest, reverse=True)]
+
+    def clear_slow_log(self) -> None:
+        self._slowest.clear()
+
+    # ===== On-demand profiles =====
+
+    def authorize(self, token: Optional[str]) -> bool:
+        """Check a presented token in constant time (False when on-demand is disabled)."""
+        return self.token is not None and token is not None and hmac.compare_digest(token, self.token)
+
+    def start_profile(self, mode: str):
+        """
+        Start a profiler run.
+
+        Returns:
+            Opaque handle for ``finish_profile``, or None if another run is active
+        """
+        if self._profile_active:
+            return None
+        self._profile_active = True
+        if mode == "sampling":
+            profiler = SamplingProfiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    def finish_profile(self, handle, method: str, path: str, total_ms: float) -> str:
+        """Stop a profiler run, store its report and return the profile id."""
+        self._profile_active = False
+        if isinstance(handle, SamplingProfiler):
+            handle.stop()
+            mode, report = "sampling", handle.report()
+        else:
+            handle.disable()
+            buffer = io.StringIO()
+            pstats.Stats(handle, stream=buffer).sort_stats("cumulative").print_stats(40)
+            mode, report = "cprofile", buffer.getvalue()
+
+        profile_id = uuid4().hex
+        self.profiles[profile_id] = {
+            "profile_id": profile_id,
+            "mode": mode,
+            "method": method,
+            "path": path,
+            "total_ms": round(total_ms, 3),
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "report": report
+        }
+        while len(self.profiles) > self.MAX_STORED_PROFILES:
+            self.profiles.popitem(last=False)
+        return profile_id
@@ -2,10 +2,103 @@
 Recommendation engine for generating personalized productivity insights.
 
 This service analyzes activity patterns and provides actionable guidance.
+
+The engine runs in two stages:
+1. Feature extraction - one pass over a scope's activities (a goal, or all
+   goals) builds a compact ActivityFeatures record
+2. Rule evaluation - the detection rules run over feature records only,
+   so many scopes can be evaluated in one batched pass
 """
-from typing import List, Dict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
 from app.models.activity import Activity
 from app.services.analytics_service import AnalyticsService
+from app.utils.date_helpers import calculate_consecutive_days, get_date_only, to_utc
+
+
+ACTIVITY_TYPES = ("Learning", "Health", "Fitness", "Other")
+GAP_THRESHOLD_MINUTES = 60.0
+
+
+@dataclass(frozen=True)
+class ActivityFeatures:
+    """Compact per-scope feature record consumed by the recommendation rules."""
+    
+    activity_count: int
+    type_totals: Dict[str, float]
+    streak_days: int
+    consistency_score: float
+    recent_health_minutes: float
+    wellness_warning: bool
+    
+    @property
+    def learning_total(self) -> float:
+        return self.type_totals.get("Learning", 0.0)
+    
+    @property
+    def physical_wellness(self) -> float:
+        return self.type_totals.get("Health", 0.0) + self.type_totals.get("Fitness", 0.0)
+    
+    @property
+    def learning_to_physical_ratio(self) -> Optional[float]:
+        """Learning minutes per physical-wellness minute (None if either is zero)."""
+        if self.learning_total > 0 and self.physical_wellness > 0:
+            return self.learning_total / self.physical_wellness
+        return None
+
+
+class FeatureAccumulator:
+    """
+    Streaming builder for ActivityFeatures.
+    
+    Activities can be added one at a time in any order, which lets a single
+    scan over the repository feed one accumulator per goal.
+    """
+    
+    def __init__(self, wellness_cutoff: datetime):
+        self.wellness_cutoff = wellness_cutoff
+        self.activity_count = 0
+        self.type_totals: Dict[str, float] = {}
+        self.recent_health_minutes = 0.0
+        self.active_days: set = set()
+    
+    def add(self, activity: Activity) -> None:
+        activity_type = activity.activity_type
+        self.activity_count += getattr(activity, "count", 1)
+        self.type_totals[activity_type] = self.type_totals.get(activity_type, 0.0) + activity.value
+        self.active_days.add(get_date_only(activity.timestamp))
+        if activity_type == "Health" and to_utc(activity.timestamp) >= self.wellness_cutoff:
+            self.recent_health_minutes += activity.value
+    
+    def finish(
+        self,
+        analytics_service: AnalyticsService,
+        consistency_score: Optional[float] = None,
+        wellness_warning: Optional[bool] = None
+    ) -> ActivityFeatures:
+        """
+        Freeze the accumulated state into a feature record.
+        
+        Precomputed consistency/wellness values, when provided, are used
+        as-is instead of being derived again.
+        """
+        streak_days = calculate_consecutive_days(list(self.active_days))
+        if consistency_score is None:
+            consistency_score = analytics_service.score_consecutive_days(streak_days)
+        if wellness_warning is None:
+            wellness_warning = (
+                self.activity_count == 0
+                or self.recent_health_minutes < analytics_service.WELLNESS_THRESHOLD_MINUTES
+            )
+        return ActivityFeatures(
+            activity_count=self.activity_count,
+            type_totals=self.type_totals,
+            streak_days=streak_days,
+            consistency_score=consistency_score,
+            recent_health_minutes=self.recent_health_minutes,
+            wellness_warning=wellness_warning
+        )
 
 
 class RecommendationService:
@@ -18,49 +111,96 @@ class RecommendationService:
     def __init__(self, analytics_service: AnalyticsService):
         self.analytics_service = analytics_service
     
-    def generate_recommendation(self, activities: List[Activity]) -> str:
+    # ===== Stage 1: feature extraction =====
+    
+    def new_accumulator(self, now: Optional[datetime] = None) -> FeatureAccumulator:
+        """Create an accumulator whose wellness window ends at ``now``."""
+        now = to_utc(now) if now else datetime.now(timezone.utc)
+        return FeatureAccumulator(now - timedelta(days=self.analytics_service.WELLNESS_WINDOW_DAYS))
+    
+    def extract_features(
+        self,
+        activities: Iterable[Activity],
+        now: Optional[datetime] = None,
+        consistency_score: Optional[float] = None,
+        wellness_warning: Optional[bool] = None
+    ) -> ActivityFeatures:
         """
-        Generate a personalized recommendation based on activity patterns.
+        Build the feature record for one scope in a single pass.
+        
+        Args:
+            activities: The scope's activities
+            now: Reference time for the wellness window
+            consistency_score: Already computed consistency score, if any
+            wellness_warning: Already computed wellness flag, if any
+        """
+        accumulator = self.new_accumulator(now)
+        for activity in activities:
+            accumulator.add(activity)
+        return accumulator.finish(self.analytics_service, consistency_score, wellness_warning)
+    
+    def extract_features_by_goal(
+        self,
+        activities: Iterable[Activity],
+        goal_ids: Optional[Iterable[str]] = None,
+        now: Optional[datetime] = None
+    ) -> Dict[str, ActivityFeatures]:
+        """
+        Build feature records for many goals from one scan.
+        
+        Args:
+            activities: Activities of any number of goals, in any order
+            goal_ids: Restrict to these goals (goals without activity still
+                get a record); None means every goal seen in the scan
+            now: Shared reference time for all wellness windows
+        """
+        now = to_utc(now) if now else datetime.now(timezone.utc)
+        accumulators: Dict[str, FeatureAccumulator] = {}
+        if goal_ids is not None:
+            accumulators = {goal_id: self.new_accumulator(now) for goal_id in goal_ids}
+        
+        for activity in activities:
+            accumulator = accumulators.get(activity.goal_id)
+            if accumulator is None:
+                if goal_ids is not None:
+                    continue
+                accumulator = accumulators[activity.goal_id] = self.new_accumulator(now)
+            accumulator.add(activity)
+        
+        return {
+            goal_id: accumulator.finish(self.analytics_service)
+            for goal_id, accumulator in accumulators.items()
+        }
+    
+    # ===== Stage 2: rule evaluation =====
+    
+    def evaluate(self, features: ActivityFeatures) -> str:
+        """
+        Apply the detection rules to a feature record.
         
         Detection Rules:
         1. High Learning + Low Health/Fitness = Rebalancing needed
         2. Low consistency = Focus on building habits
         3. Wellness warning = Prioritize physical health
         4. Balanced activities = Maintain current approach
-        
-        Args:
-            activities: List of all user activities
-            
-        Returns:
-            Human-readable recommendation string
         """
-        if not activities:
+        if features.activity_count == 0:
             return (
                 "Start your growth journey by logging your first activity! "
                 "Consistent small efforts compound into remarkable results."
             )
         
-        aggregated = self.analytics_service.aggregate_by_type(activities)
-        consistency_score = self.analytics_service.calculate_consistency_score(activities)
-        wellness_warning = self.analytics_service.check_wellness_warning(activities)
-        
         # Rule 1: Detect Learning/Health imbalance
-        learning_total = aggregated.get("Learning", 0.0)
-        health_total = aggregated.get("Health", 0.0)
-        fitness_total = aggregated.get("Fitness", 0.0)
-        physical_wellness = health_total + fitness_total
-        
-        if learning_total > 0 and physical_wellness > 0:
-            ratio = learning_total / physical_wellness
-            if ratio > 3.0:  # Learning is 3x more than physical wellness
-                return (
-                    "You are investing heavily in learning but neglecting physical wellness. "
-                    "Consider rebalancing your growth plan. Research shows that physical "
-                    "activity enhances cognitive performance and learning retention."
-                )
+        ratio = features.learning_to_physical_ratio
+        if ratio is not None and ratio > 3.0:  # Learning is 3x more than physical wellness
+            return (
+                "You are investing heavily in learning but neglecting physical wellness. "
+                "Consider rebalancing your growth plan. Research shows that physical "
+                "activity enhances cognitive performance and learning retention."
+            )
         
         # Rule 2: Low consistency
-        if consistency_score < 0.3:
+        if features.consistency_score < 0.3:
             return (
                 "Your consistency score is low. Focus on building a daily habit, "
                 "even if it's just 15 minutes. Consistency beats intensity for "
@@ -68,7 +208,7 @@ class RecommendationService:
             )
         
         # Rule 3: Wellness warning
-        if wellness_warning:
+        if features.wellness_warning:
             return (
                 "⚠️ Wellness Alert: You haven't met the recommended 150 minutes of "
                 "health-related activity this week. Your body is the foundation of all "
@@ -76,7 +216,7 @@ class RecommendationService:
             )
         
         # Rule 4: High learning, no physical activity at all
-        if learning_total > 300 and physical_wellness == 0:
+        if features.learning_total > 300 and features.physical_wellness == 0:
             return (
                 "You're making great progress in learning! However, you have zero "
                 "physical wellness activities logged. A healthy body fuels a sharp mind. "
@@ -84,7 +224,7 @@ class RecommendationService:
             )
         
         # Rule 5: Excellent balance
-        if consistency_score >= 0.7 and not wellness_warning:
+        if features.consistency_score >= 0.7 and not features.wellness_warning:
             return (
                 "Excellent work! You're maintaining strong consistency and a balanced "
                 "approach to growth. Keep up this momentum. Consider setting a new "
@@ -98,21 +238,50 @@ class RecommendationService:
             "plan based on what energizes you most."
         )
     
-    def detect_activity_gaps(self, activities: List[Activity]) -> Dict[str, bool]:
+    def evaluate_gaps(self, features: ActivityFeatures) -> Dict[str, bool]:
         """
-        Identify which activity types are missing or underrepresented.
+        Flag activity types that are missing or underrepresented.
         
         Returns:
             Dictionary mapping activity_type to whether it's missing (True = gap exists)
         """
-        aggregated = self.analytics_service.aggregate_by_type(activities)
-        
-        activity_types = ["Learning", "Health", "Fitness", "Other"]
-        gaps = {}
+        # Consider it a gap if total is 0 or very low (< 60 minutes total)
+        return {
+            activity_type: features.type_totals.get(activity_type, 0.0) < GAP_THRESHOLD_MINUTES
+            for activity_type in ACTIVITY_TYPES
+        }
+    
+    # ===== Convenience entry points =====
+    
+    def generate_recommendation(
+        self,
+        activities: List[Activity],
+        consistency_score: Optional[float] = None,
+        wellness_warning: Optional[bool] = None
+    ) -> str:
+        """
+        Generate a personalized recommendation based on activity patterns.
         
-        for activity_type in activity_types:
-            # Consider it a gap if total is 0 or very low (< 60 minutes total)
-            total = aggregated.get(activity_type, 0.0)
-            gaps[activity_type] = total < 60.0
+        Args:
+            activities: List of all user activities
+            consistency_score: Already computed consistency score, if available
+            wellness_warning: Already computed wellness flag, if available
+            
+        Returns:
+            Human-readable recommendation string
+        """
+        features = self.extract_features(
+            activities,
+            consistency_score=consistency_score,
+            wellness_warning=wellness_warning
+        )
+        return self.evaluate(features)
+    
+    def detect_activity_gaps(self, activities: List[Activity]) -> Dict[str, bool]:
+        """
+        Identify which activity types are missing or underrepresented.
         
-        return gaps
+        Returns:
+            Dictionary mapping activity_type to whether it's missing (True = gap exists)
+        """
+        return self.evaluate_gaps(self.extract_features(activities))
@@ -0,0 +1,54 @@
+"""
+Retention policy: compaction of old raw activities into daily rollups.
+
+Raw rows are only needed for recent windows (7-day wellness, the current
+streak). Older activities are folded into per-goal daily rollups, which keep
+type totals, weekly totals and streaks exact while bounding memory.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from app.repositories.activity_repository import ActivityRepository
+from app.services.analytics_service import AnalyticsService
+from app.utils.date_helpers import next_utc_midnight
+
+
+class RetentionService:
+    """
+    Applies a retention window to an ActivityRepository.
+
+    Activities logged before midnight UTC ``retention_days`` ago are compacted.
+    """
+
+    # The wellness window must stay fully raw; the cutoff is rounded down to
+    # a UTC midnight, so one extra day covers the window's partial first day
+    # and a second is kept as slack.
+    MIN_RETENTION_DAYS = AnalyticsService.WELLNESS_WINDOW_DAYS + 2
+
+    def __init__(self, repository: ActivityRepository, retention_days: int):
+        if retention_days < self.MIN_RETENTION_DAYS:
+            raise ValueError(
+                f"retention_days must be at least {self.MIN_RETENTION_DAYS} "
+                "to keep the wellness window exact"
+            )
+        self.repository = repository
+        self.retention_days = retention_days
+        self.last_compacted = 0
+        self.total_compacted = 0
+
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        """Return the UTC midnight before which raw activities are compacted."""
+        now = now or datetime.now(timezone.utc)
+        today = next_utc_midnight(now) - timedelta(days=1)
+        return today - timedelta(days=self.retention_days)
+
+    def compact(self, now: Optional[datetime] = None) -> int:
+        """
+        Compact activities older than the retention window.
+
+        Returns:
+            Number of raw activities folded into rollups
+        """
+        compacted = self.repository.compact_before(self.cutoff(now))
+        self.last_compacted = compacted
+        self.total_compacted += compacted
+        return compacted
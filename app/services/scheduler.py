@@ -0,0 +1,80 @@
+"""
+In-process asyncio scheduler for time-driven background jobs.
+
+Jobs are plain callables executed on the event loop, either at a fixed
+interval or once per UTC day boundary. A failing job is logged and retried
+at its next tick; it never stops the scheduler.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+from app.utils.date_helpers import next_utc_midnight
+
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], object]
+
+
+class BackgroundScheduler:
+    """
+    Minimal job scheduler bound to the running event loop.
+
+    Usage:
+        scheduler.add_interval_job("evict", 60, cache.evict_expired)
+        scheduler.add_daily_job("rollover", cache.evict_all)
+        scheduler.start()   # inside the running loop (app startup)
+        await scheduler.stop()
+    """
+
+    def __init__(self):
+        self._jobs: List[tuple[str, Callable[[], float], Job]] = []
+        self._tasks: List[asyncio.Task] = []
+        self.last_run: Dict[str, datetime] = {}
+
+    def add_interval_job(self, name: str, interval_seconds: float, job: Job) -> None:
+        """Run ``job`` every ``interval_seconds``."""
+        self._jobs.append((name, lambda: interval_seconds, job))
+
+    def add_daily_job(self, name: str, job: Job) -> None:
+        """Run ``job`` right after every UTC midnight."""
+        def seconds_until_midnight() -> float:
+            now = datetime.now(timezone.utc)
+            return (next_utc_midnight(now) - now).total_seconds()
+
+        self._jobs.append((name, seconds_until_midnight, job))
+
+    def start(self) -> None:
+        """Start one task per registered job on the running loop."""
+        if self._tasks:
+            return
+        for name, next_delay, job in self._jobs:
+            self._tasks.append(
+                asyncio.create_task(self._run(name, next_delay, job), name=f"scheduler:{name}")
+            )
+
+    async def stop(self) -> None:
+        """Cancel all job tasks and wait for them to finish."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def _run(self, name: str, next_delay: Callable[[], float], job: Job) -> None:
+        while True:
+            await asyncio.sleep(next_delay())
+            try:
+                result = job()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception:
+                logger.exception("Scheduled job %s failed", name)
+            self.last_run[name] = datetime.now(timezone.utc)
+
+    def job_names(self) -> List[str]:
+        return [name for name, _, _ in self._jobs]
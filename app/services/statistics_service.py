@@ -0,0 +1,208 @@
+"""
+Approximate value distributions and active-day counts, maintained on save.
+
+Each (goal, activity type) pair keeps a KLL quantile sketch of activity
+values, and each goal keeps an ActiveDaySet. Goal-level and global value
+statistics merge the per-pair sketches on demand; the global active-day
+set is maintained alongside the per-goal ones. No request ever reads or
+sorts raw activities.
+"""
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from app.models.activity import Activity
+from app.models.rollup import DailyRollup
+from app.repositories.activity_repository import ActivityRepository
+from app.utils.date_helpers import utc_date
+from app.utils.sketches import ActiveDaySet, KLLSketch
+
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+
+class StatisticsService:
+    """
+    Save-listener maintained sketches.
+
+    Memory per goal is bounded by the number of activity types times the
+    sketch size (about 3 * k values each) plus one ActiveDaySet and a
+    per-day activity count. A day counts once in the global set however
+    many goals were active on it; a per-day goal count retires it when the
+    last of them goes inactive. Compacted rollups carry sums, not individual values,
+    so they only contribute active days; the values they replaced are kept
+    in a second, compacted-history sketch per (goal, type), fed by the
+    repository's compact listener.
+
+    Deletes retire a day once its count drops to zero. Quantile sketches
+    cannot subtract a value, so a delete marks the (goal, type) sketch stale
+    and it is rebuilt on its next read from the compacted-history sketch
+    plus the goal's remaining raw activities.
+    """
+
+    def __init__(self, repository: ActivityRepository, k: int = 200):
+        self.repository = repository
+        self.k = k
+        self._value_sketches: Dict[Tuple[str, str], KLLSketch] = {}
+        self._active_days: Dict[str, ActiveDaySet] = {}
+        self._day_counts: Dict[str, Dict[date, int]] = {}
+        self._all_days = ActiveDaySet()
+        self._goals_per_day: Dict[date, int] = {}
+        self._compacted_sketches: Dict[Tuple[str, str], KLLSketch] = {}
+        self._stale: Set[Tuple[str, str]] = set()
+
+        repository.add_save_listener(self.on_activity_saved)
+        repository.add_delete_listener(self.on_activity_deleted)
+        repository.add_compact_listener(self.on_goal_compacted)
+
+    def load(self, activities: Iterable[Activity]) -> None:
+        """Apply activities saved before this service was created."""
+        for activity in activities:
+            self.on_activity_saved(activity)
+
+    def on_activity_saved(self, activity: Activity) -> None:
+        """Repository save listener: O(1) amortized per activity."""
+        days = self._active_days.get(activity.goal_id)
+        if days is None:
+            days = self._active_days[activity.goal_id] = ActiveDaySet()
+        day = utc_date(activity.timestamp)
+        counts = self._day_counts.setdefault(activity.goal_id, {})
+        if day not in counts:
+            days.add(day)
+            goals = self._goals_per_day.get(day, 0)
+            if not goals:
+                self._all_days.add(day)
+            self._goals_per_day[day] = goals + 1
+        counts[day] = counts.get(day, 0) + getattr(activity, "count", 1)
+
+        if isinstance(activity, DailyRollup):
+            return
+        key = (activity.goal_id, activity.activity_type)
+        if key in self._stale:
+            return
+        sketch = self._value_sketches.get(key)
+        if sketch is None:
+            sketch = self._value_sketches[key] = KLLSketch(self.k)
+        sketch.update(activity.value)
+
+    def on_activity_deleted(self, activity: Activity) -> None:
+        """Repository delete listener: O(1); the value sketch is rebuilt lazily."""
+        counts = self._day_counts.get(activity.goal_id)
+        if counts is None:
+            return
+        day = utc_date(activity.timestamp)
+        remaining = counts.get(day, 0) - getattr(activity, "count", 1)
+        if remaining > 0:
+            counts[day] = remaining
+        else:
+            if counts.pop(day, None) is not None:
+                self._active_days[activity.goal_id].discard(day)
+                goals = self._goals_per_day.pop(day) - 1
+                if goals:
+                    self._goals_per_day[day] = goals
+                else:
+                    self._all_days.discard(day)
+
+        key = (activity.goal_id, activity.activity_type)
+        self._value_sketches.pop(key, None)
+        self._stale.add(key)
+
+    def on_goal_compacted(self, goal_id: str, folded: List[Activity], rollups: List[DailyRollup]) -> None:
+        """
+        Repository compaction listener: keep the folded values for rebuilds.
+
+        The live sketches already hold these values and active days are
+        unchanged, so only the compacted-history sketches are updated.
+        """
+        for activity in folded:
+            key = (goal_id, activity.activity_type)
+            sketch = self._compacted_sketches.get(key)
+            if sketch is None:
+                sketch = self._compacted_sketches[key] = KLLSketch(self.k)
+            sketch.update(activity.value)
+
+    def _rebuild_stale(self, goal_id: Optional[str]) -> None:
+        """Recompute stale sketches (of one goal, or all) from compacted history and the repository."""
+        stale = [key for key in self._stale if goal_id is None or key[0] == goal_id]
+        for stale_goal in {key[0] for key in stale}:
+            types = {activity_type for goal, activity_type in stale if goal == stale_goal}
+            for activity_type in types:
+                key = (stale_goal, activity_type)
+                self._stale.discard(key)
+                compacted = self._compacted_sketches.get(key)
+                if compacted is not None:
+                    self._value_sketches[key] = compacted.copy()
+            for activity in self.repository.find_by_goal_id(stale_goal):
+                if activity.activity_type in types and not isinstance(activity, DailyRollup):
+                    key = (stale_goal, activity.activity_type)
+                    sketch = self._value_sketches.get(key)
+                    if sketch is None:
+                        sketch = self._value_sketches[key] = KLLSketch(self.k)
+                    sketch.update(activity.value)
+
+    def value_sketches(self, goal_id: Optional[str] = None) -> Dict[str, KLLSketch]:
+        """
+        Merge per-pair sketches into one sketch per activity type.
+
+        Args:
+            goal_id: Restrict to one goal, or None for all goals
+
+        Returns:
+            Dictionary mapping activity_type to a merged (copied) sketch
+        """
+        self._rebuild_stale(goal_id)
+        merged: Dict[str, KLLSketch] = {}
+        for (sketch_goal, activity_type), sketch in self._value_sketches.items():
+            if goal_id is not None and sketch_goal != goal_id:
+                continue
+            if activity_type in merged:
+                merged[activity_type].merge(sketch)
+            else:
+                merged[activity_type] = sketch.copy()
+        return merged
+
+    def value_quantiles(
+        self,
+        goal_id: Optional[str] = None,
+        fractions: Tuple[float, ...] = DEFAULT_QUANTILES
+    ) -> Dict[str, Dict[str, object]]:
+        """
+        Summarize value distributions per activity type.
+
+        Returns:
+            {activity_type: {"count", "min", "max", "quantiles": {fraction: value}}}
+        """
+        summary: Dict[str, Dict[str, object]] = {}
+        for activity_type, sketch in self.value_sketches(goal_id).items():
+            estimates: List[Optional[float]] = sketch.quantiles(fractions)
+            summary[activity_type] = {
+                "count": sketch.n,
+                "min": sketch.min,
+                "max": sketch.max,
+                "quantiles": dict(zip(fractions, estimates))
+            }
+        return summary
+
+    def distinct_active_days(
+        self,
+        goal_id: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> int:
+        """
+        Count days with at least one activity in [start, end] (inclusive).
+
+        For all goals, a day is counted once however many goals were active
+        on it.
+        """
+        if goal_id is None:
+            return self._all_days.count(start, end)
+        days = self._active_days.get(goal_id)
+        return days.count(start, end) if days is not None else 0
+
+    def clear(self) -> None:
+        self._value_sketches.clear()
+        self._active_days.clear()
+        self._day_counts.clear()
+        self._all_days = ActiveDaySet()
+        self._goals_per_day.clear()
+        self._compacted_sketches.clear()
+        self._stale.clear()
@@ -0,0 +1,61 @@
+"""
+Bloom filter for memory-bounded set membership tests.
+"""
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    Probabilistic set with no false negatives.
+
+    ``might_contain`` returning False is definitive; True means "possibly
+    present" with roughly ``error_rate`` probability of being wrong while
+    no more than ``capacity`` keys have been added.
+
+    Sizing (standard formulas):
+        bits   m = -n * ln(p) / ln(2)^2
+        hashes k = (m / n) * ln(2)
+    e.g. 1,000,000 keys at 0.1% -> ~1.7 MiB and 10 hash probes.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0.0 < error_rate < 1.0:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        # Kirsch-Mitzenmacher double hashing: one digest yields all k probes
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str) -> None:
+        """Insert a key."""
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def might_contain(self, key: str) -> bool:
+        """Return False if the key was definitely never added."""
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    def is_saturated(self) -> bool:
+        """True once more keys were added than the filter was sized for."""
+        return self.count >= self.capacity
+
+    def __contains__(self, key: str) -> bool:
+        return self.might_contain(key)
@@ -1,7 +1,11 @@
 """
 Utility functions for date and time operations.
+
+An activity's day is its UTC calendar date everywhere in the app (streaks,
+leaderboards, statistics, aggregations and rollups), so the same activity
+lands on the same day whatever offset it was logged with.
 """
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
 from typing import List
 
 
@@ -16,8 +20,33 @@ def parse_iso_datetime(iso_string: str) -> datetime:
     return datetime.fromisoformat(normalized)
 
 
+def to_utc(dt: datetime) -> datetime:
+    """
+    Normalize a datetime to timezone-aware UTC.
+    
+    Naive datetimes are assumed to already be in UTC.
+    """
+    if dt.tzinfo is timezone.utc:
+        return dt
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def next_utc_midnight(now: datetime) -> datetime:
+    """Return the first UTC midnight strictly after ``now``."""
+    now = to_utc(now)
+    return datetime(now.year, now.month, now.day, tzinfo=timezone.utc) + timedelta(days=1)
+
+
+def utc_date(dt: datetime) -> date:
+    """Return the UTC calendar date of ``dt`` (naive datetimes are UTC)."""
+    return to_utc(dt).date()
+
+
 def get_date_only(dt: datetime) -> datetime:
-    """Extract date component, setting time to midnight."""
+    """Extract the UTC date component, as a naive midnight datetime."""
+    dt = to_utc(dt)
     return datetime(dt.year, dt.month, dt.day)
 
 
@@ -55,7 +84,8 @@ def calculate_consecutive_days(timestamps: List[datetime]) -> int:
 
 
 def get_week_start(dt: datetime) -> datetime:
-    """Get the start of the week (Monday) for a given datetime."""
+    """Get the start of the UTC week (Monday) for a given datetime."""
+    dt = to_utc(dt)
     days_since_monday = dt.weekday()
     week_start = dt - timedelta(days=days_since_monday)
     return get_date_only(week_start)
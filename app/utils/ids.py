@@ -0,0 +1,54 @@
+"""
+Time-ordered activity ids (UUIDv7, RFC 9562).
+"""
+import os
+import time
+from uuid import UUID
+
+
+_RANDOM_BITS = (1 << 62) - 1
+
+
+class ActivityIdGenerator:
+    """
+    UUIDv7 generator: 48-bit Unix milliseconds, 4-bit version, a 12-bit
+    counter, 2-bit variant and 62 random bits.
+
+    Ids are still canonical UUIDs, so segments store them as their own 16
+    bytes (narrowing each segment's id range), and they sit alongside older
+    random (v4) and name-based (v5) ids. Ids from one generator strictly
+    increase, as integers, bytes and canonical strings
+    alike: within a millisecond the counter (seeded randomly with headroom)
+    is incremented, and on overflow or a clock step backwards the
+    timestamp is carried forward instead of going back.
+    """
+
+    COUNTER_MAX = 0xFFF
+
+    def __init__(self):
+        self._millis = 0
+        self._counter = 0
+
+    def new_id(self) -> str:
+        millis = time.time_ns() // 1_000_000
+        if millis > self._millis:
+            self._millis = millis
+            self._counter = int.from_bytes(os.urandom(2), "big") & 0x7FF
+        elif self._counter < self.COUNTER_MAX:
+            self._counter += 1
+        else:
+            self._millis += 1
+            self._counter = 0
+
+        random_bits = int.from_bytes(os.urandom(8), "big") & _RANDOM_BITS
+        value = self._millis << 80 | 0x7 << 76 | self._counter << 64 | 0b10 << 62 | random_bits
+        return str(UUID(int=value))
+
+
+_generator = ActivityIdGenerator()
+
+
+def new_activity_id() -> str:
+    """Return a new time-ordered activity id."""
+    return _generator.new_id()
+
@@ -0,0 +1,265 @@
+"""
+Mergeable streaming summaries for approximate statistics.
+"""
+import math
+import random
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang & Liberty, 2016).
+
+    Values enter level 0; when a level fills, it is sorted and every other
+    item (random offset) is promoted to the next level with double weight.
+    Level capacities shrink geometrically (factor 2/3) below the top level,
+    so the sketch keeps O(k) items regardless of stream length.
+
+    Error bounds (``k`` = 200, the default):
+        rank error of a single quantile query is within about 1.7% of n
+        with 99% probability (e.g. the reported median lies between the
+        true 48.3rd and 51.7th percentiles). Error scales as ~1/k.
+    Memory: level capacities sum to at most 3 * k, plus MIN_CAPACITY per
+        level once the lowest levels bottom out, so about 600 retained
+        floats at k = 200 for any practical stream length.
+    Merging two sketches yields a sketch with the same guarantees for the
+    combined stream.
+    """
+
+    MIN_CAPACITY = 2
+
+    def __init__(self, k: int = 200):
+        if k < 8:
+            raise ValueError("k must be at least 8")
+        self.k = k
+        self.n = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._levels: List[List[float]] = [[]]
+        self._size = 0
+        self._max_size = self._capacity(0)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self._levels) - level - 1
+        return max(self.MIN_CAPACITY, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _grow(self) -> None:
+        self._levels.append([])
+        self._max_size = sum(self._capacity(level) for level in range(len(self._levels)))
+
+    def update(self, value: float) -> None:
+        """Add one value."""
+        self._levels[0].append(value)
+        self._size += 1
+        self.n += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if self._size >= self._max_size:
+            self._compress()
+
+    def _compress(self) -> None:
+        while self._size >= self._max_size:
+            for level, items in enumerate(self._levels):
+                if len(items) >= self._capacity(level):
+                    if level + 1 == len(self._levels):
+                        self._grow()
+                    items.sort()
+                    # An odd item out stays behind so total weight is preserved
+                    keep = [items.pop()] if len(items) % 2 else []
+                    self._levels[level + 1].extend(items[random.getrandbits(1)::2])
+                    self._levels[level] = keep
+                    self._size = sum(len(items) for items in self._levels)
+                    break
+
+    def merge(self, other: "KLLSketch") -> None:
+        """Fold another sketch into this one."""
+        if other.n == 0:
+            return
+        while len(self._levels) < len(other._levels):
+            self._grow()
+        for level, items in enumerate(other._levels):
+            self._levels[level].extend(items)
+        self._size = sum(len(items) for items in self._levels)
+        self.n += other.n
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+
+    def copy(self) -> "KLLSketch":
+        clone = KLLSketch(self.k)
+        clone.n, clone.min, clone.max = self.n, self.min, self.max
+        clone._levels = [list(items) for items in self._levels]
+        clone._size, clone._max_size = self._size, self._max_size
+        return clone
+
+    def _weighted(self) -> List[Tuple[float, int]]:
+        return sorted(
+            (value, 1 << level)
+            for level, items in enumerate(self._levels)
+            for value in items
+        )
+
+    def quantiles(self, fractions: Iterable[float]) -> List[Optional[float]]:
+        """
+        Estimate several quantiles in one pass over the retained items.
+
+        Args:
+            fractions: Quantile fractions in [0, 1], e.g. (0.5, 0.9)
+
+        Returns:
+            Estimated values in the same order (None for an empty sketch)
+        """
+        fractions = list(fractions)
+        if self.n == 0:
+            return [None] * len(fractions)
+
+        weighted = self._weighted()
+        total = sum(weight for _, weight in weighted)
+        results: List[Optional[float]] = []
+        for fraction in fractions:
+            if fraction <= 0:
+                results.append(self.min)
+                continue
+            if fraction >= 1:
+                results.append(self.max)
+                continue
+            target = fraction * total
+            cumulative = 0
+            for value, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    results.append(value)
+                    break
+        return results
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        return self.quantiles((fraction,))[0]
+
+    def __len__(self) -> int:
+        return self.n
+
+
+class ActiveDaySet:
+    """
+    Exact set of active calendar days.
+
+    While the days span at most MAX_BITMAP_DAYS the set is a bitmap over day
+    ordinals: distinct-day counts over any date range are a mask and a
+    popcount, and two sets merge with a bitwise OR, in at most 512 bytes.
+    A set whose span grows past that (e.g. a stray year-1 or year-9999
+    timestamp) switches for good to a sorted list of ordinals, so memory is
+    bounded by the smaller of the span and the number of active days rather
+    than by the span alone. Either way counts stay exact where a
+    HyperLogLog would only estimate.
+    """
+
+    MAX_BITMAP_DAYS = 4096
+
+    def __init__(self):
+        self._origin: Optional[int] = None
+        self._bits = 0
+        # Sorted ordinals once the span outgrows the bitmap
+        self._ordinals: Optional[List[int]] = None
+
+    def add(self, day: date) -> None:
+        ordinal = day.toordinal()
+        if self._ordinals is not None:
+            position = bisect_left(self._ordinals, ordinal)
+            if position == len(self._ordinals) or self._ordinals[position] != ordinal:
+                self._ordinals.insert(position, ordinal)
+            return
+        if self._origin is None:
+            self._origin = ordinal
+        elif ordinal < self._origin:
+            if self._origin - ordinal + self._bits.bit_length() > self.MAX_BITMAP_DAYS:
+                self._make_sparse()
+                return self.add(day)
+            self._bits <<= self._origin - ordinal
+            self._origin = ordinal
+        elif ordinal - self._origin >= self.MAX_BITMAP_DAYS:
+            self._make_sparse()
+            return self.add(day)
+        self._bits |= 1 << (ordinal - self._origin)
+
+    def discard(self, day: date) -> None:
+        """Mark a day inactive (no-op if it is not in the set)."""
+        if self._ordinals is not None:
+            ordinal = day.toordinal()
+            position = bisect_left(self._ordinals, ordinal)
+            if position < len(self._ordinals) and self._ordinals[position] == ordinal:
+                del self._ordinals[position]
+        elif day in self:
+            self._bits &= ~(1 << (day.toordinal() - self._origin))
+
+    def merge(self, other: "ActiveDaySet") -> None:
+        """Union another set into this one."""
+        if other._origin is None and other._ordinals is None:
+            return
+        if self._origin is None and self._ordinals is None:
+            self._origin, self._bits = other._origin, other._bits
+            self._ordinals = list(other._ordinals) if other._ordinals is not None else None
+            return
+        if self._ordinals is None and other._ordinals is None:
+            origin = min(self._origin, other._origin)
+            top = max(self._origin + self._bits.bit_length(), other._origin + other._bits.bit_length())
+            if top - origin <= self.MAX_BITMAP_DAYS:
+                self._bits = (self._bits << (self._origin - origin)) | (other._bits << (other._origin - origin))
+                self._origin = origin
+                return
+        self._make_sparse()
+        self._ordinals = sorted(set(self._ordinals).union(other._iter_ordinals()))
+
+    def count(self, start: Optional[date] = None, end: Optional[date] = None) -> int:
+        """
+        Count active days in [start, end] (inclusive, either bound optional).
+
+        Time complexity: O(span / word size) as a bitmap, O(log n) as a
+        sorted list
+        """
+        if self._ordinals is not None:
+            low = bisect_left(self._ordinals, start.toordinal()) if start is not None else 0
+            high = bisect_right(self._ordinals, end.toordinal()) if end is not None else len(self._ordinals)
+            return max(high - low, 0)
+        if self._origin is None:
+            return 0
+        bits = self._bits
+        if end is not None:
+            width = end.toordinal() - self._origin + 1
+            if width <= 0:
+                return 0
+            bits &= (1 << width) - 1
+        if start is not None:
+            shift = start.toordinal() - self._origin
+            if shift > 0:
+                bits >>= shift
+        return bits.bit_count()
+
+    @property
+    def is_sparse(self) -> bool:
+        return self._ordinals is not None
+
+    def _iter_ordinals(self) -> Iterable[int]:
+        if self._ordinals is not None:
+            return iter(self._ordinals)
+        if self._origin is None:
+            return iter(())
+        bits, origin = self._bits, self._origin
+        return (origin + offset for offset in range(bits.bit_length()) if bits >> offset & 1)
+
+    def _make_sparse(self) -> None:
+        if self._ordinals is None:
+            self._ordinals = list(self._iter_ordinals())
+            self._origin, self._bits = None, 0
+
+    def __contains__(self, day: date) -> bool:
+        if self._ordinals is not None:
+            ordinal = day.toordinal()
+            position = bisect_left(self._ordinals, ordinal)
+            return position < len(self._ordinals) and self._ordinals[position] == ordinal
+        if self._origin is None or day.toordinal() < self._origin:
+            return False
+        return bool(self._bits >> (day.toordinal() - self._origin) & 1)
@@ -0,0 +1,151 @@
+"""
+Cold-start benchmark: time from process launch to first response and to readiness.
+
+Launches ``uvicorn app.main:app`` in a fresh process (as a scale-to-zero
+host does), polls ``/health`` until it answers and ``/ready`` until it
+returns 200, then stops the server. Each run appends one JSON line to the
+results file so the numbers can be tracked across commits:
+
+    python benchmarks/cold_start.py --runs 5
+    python benchmarks/cold_start.py --history-rows 200000 --fast-boot
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+import httpx
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_RESULTS = os.path.join(ROOT, "benchmarks", "results", "cold_start.jsonl")
+POLL_INTERVAL_SECONDS = 0.005
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def seed_history(directory: str, rows: int, goals: int = 100) -> None:
+    """Write ``rows`` synthetic activities into one sealed segment."""
+    from app.models.activity import Activity
+    from app.repositories.segment_store import SegmentStore
+
+    start = datetime.now(timezone.utc) - timedelta(days=365)
+    types = ("Learning", "Health", "Fitness", "Other")
+    activities = [
+        Activity(
+            goal_id=f"goal-{row % goals}",
+            activity_type=types[row % len(types)],
+            value=float(15 + row % 90),
+            timestamp=start + timedelta(minutes=row * 5 % (360 * 24 * 60)),
+            activity_id=str(uuid4())
+        )
+        for row in range(rows)
+    ]
+    store = SegmentStore(directory)
+    store.seal(activities)
+    store.close()
+
+
+def measure_once(port: int, env: dict, timeout: float) -> dict:
+    """Launch the server once and record first-response and ready latencies."""
+    base_url = f"http://127.0.0.1:{port}"
+    launched = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    first_response_ms = ready_ms = None
+    startup = None
+    try:
+        with httpx.Client(base_url=base_url, timeout=1.0) as client:
+            deadline = launched + timeout
+            while time.perf_counter() < deadline:
+                try:
+                    if first_response_ms is None:
+                        client.get("/health").raise_for_status()
+                        first_response_ms = (time.perf_counter() - launched) * 1000
+                    response = client.get("/ready")
+                    if response.status_code == 200:
+                        ready_ms = (time.perf_counter() - launched) * 1000
+                        startup = response.json()["startup"]
+                        break
+                except httpx.TransportError:
+                    pass
+                time.sleep(POLL_INTERVAL_SECONDS)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    if ready_ms is None:
+        raise RuntimeError(f"server was not ready within {timeout}s")
+    return {
+        "first_response_ms": round(first_response_ms, 1),
+        "ready_ms": round(ready_ms, 1),
+        "startup": startup
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--history-rows", type=int, default=0, help="Seed a segment with this many activities")
+    parser.add_argument("--fast-boot", action="store_true", help="Run with FAST_BOOT=1")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="JSON-lines file to append to ('-' to skip)")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, FAST_BOOT="1" if args.fast_boot else "0")
+    with tempfile.TemporaryDirectory() as segment_dir:
+        if args.history_rows:
+            seed_history(segment_dir, args.history_rows)
+            env["SEGMENT_DIR"] = segment_dir
+        runs = [measure_once(_free_port(), env, args.timeout) for _ in range(args.runs)]
+
+    first = [run["first_response_ms"] for run in runs]
+    ready = [run["ready_ms"] for run in runs]
+    result = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "fast_boot": args.fast_boot,
+        "history_rows": args.history_rows,
+        "runs": args.runs,
+        "first_response_ms_median": round(statistics.median(first), 1),
+        "ready_ms_median": round(statistics.median(ready), 1),
+        "startup_phases_ms": runs[-1]["startup"]["phases_ms"]
+    }
+    print(json.dumps(result, indent=2))
+
+    if args.results != "-":
+        os.makedirs(os.path.dirname(args.results), exist_ok=True)
+        with open(args.results, "a") as handle:
+            handle.write(json.dumps(result) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
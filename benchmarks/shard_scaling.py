@@ -0,0 +1,156 @@
+"""
+Shard scaling benchmark: ingest, global metrics and per-goal reads from 1 to N shards.
+
+Loads the same synthetic activities into an in-process repository (the
+``0`` shards baseline) and into ShardedActivityRepository with each shard
+count, then times batch ingestion, one global-metrics computation
+(MetricsCache over ``find_all`` for the baseline, merged per-shard
+partials otherwise), single-goal reads, single-goal counts (one small
+round trip, the blocking cost a request handler pays per call) and a
+full paged ``iter_activities`` scan. Each run appends one JSON line
+to the results file so the numbers can be tracked across commits and
+machines:
+
+    python benchmarks/shard_scaling.py --rows 400000
+    python benchmarks/shard_scaling.py --shards 1 2 4 8 --repeats 5
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_RESULTS = os.path.join(ROOT, "benchmarks", "results", "shard_scaling.jsonl")
+BATCH_SIZE = 1000
+GOAL_READS = 200
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def synthetic_activities(rows: int, goals: int) -> list:
+    """``rows`` activities spread over ``goals`` goals and the past year."""
+    from app.models.activity import Activity
+
+    start = datetime.now(timezone.utc) - timedelta(days=365)
+    types = ("Learning", "Health", "Fitness", "Other")
+    return [
+        Activity(
+            goal_id=f"goal-{row % goals}",
+            activity_type=types[row % len(types)],
+            value=float(15 + row % 90),
+            timestamp=start + timedelta(minutes=row * 7 % (365 * 24 * 60)),
+            activity_id=str(uuid4())
+        )
+        for row in range(rows)
+    ]
+
+
+def measure(shards: int, activities: list, goals: int, repeats: int) -> dict:
+    """Time one repository configuration (0 shards = in-process baseline)."""
+    import asyncio
+    from app.repositories.in_memory_repository import InMemoryActivityRepository
+    from app.repositories.sharded_repository import ShardedActivityRepository
+    from app.services.analytics_service import AnalyticsService
+    from app.services.metrics_cache import MetricsCache
+    from app.services.offload_service import ShardedGlobalAnalytics
+    from app.services.recommendation_service import RecommendationService
+
+    repository = ShardedActivityRepository(shards) if shards else InMemoryActivityRepository()
+    analytics_service = AnalyticsService()
+    metrics_cache = MetricsCache(repository, analytics_service, RecommendationService(analytics_service))
+    sharded_analytics = ShardedGlobalAnalytics(repository, analytics_service, metrics_cache) if shards else None
+
+    try:
+        started = time.perf_counter()
+        for offset in range(0, len(activities), BATCH_SIZE):
+            repository.save_many(activities[offset:offset + BATCH_SIZE])
+        ingest_seconds = time.perf_counter() - started
+
+        global_ms = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            if sharded_analytics is not None:
+                asyncio.run(sharded_analytics._compute())
+            else:
+                metrics_cache._compute(None, repository.find_all())
+            global_ms.append((time.perf_counter() - started) * 1000)
+
+        rng = random.Random(0)
+        started = time.perf_counter()
+        for _ in range(GOAL_READS):
+            repository.find_by_goal_id(f"goal-{rng.randrange(goals)}")
+        goal_read_ms = (time.perf_counter() - started) * 1000 / GOAL_READS
+
+        started = time.perf_counter()
+        for _ in range(GOAL_READS):
+            repository.count_by_goal_id(f"goal-{rng.randrange(goals)}")
+        goal_count_ms = (time.perf_counter() - started) * 1000 / GOAL_READS
+
+        started = time.perf_counter()
+        scanned = sum(1 for _ in repository.iter_activities())
+        scan_seconds = time.perf_counter() - started
+    finally:
+        if shards:
+            repository.close()
+
+    return {
+        "shards": shards,
+        "ingest_rows_per_second": round(len(activities) / ingest_seconds),
+        "global_metrics_ms_median": round(statistics.median(global_ms), 1),
+        "goal_read_ms_mean": round(goal_read_ms, 3),
+        "goal_count_ms_mean": round(goal_count_ms, 3),
+        "scan_rows_per_second": round(scanned / scan_seconds)
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--goals", type=int, default=1000)
+    parser.add_argument(
+        "--shards", type=int, nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+        help="Shard counts to measure (the in-process baseline is always included)"
+    )
+    parser.add_argument("--repeats", type=int, default=3, help="Global-metrics runs per configuration")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="JSON-lines file to append to ('-' to skip)")
+    args = parser.parse_args(argv)
+
+    activities = synthetic_activities(args.rows, args.goals)
+    runs = [measure(shards, activities, args.goals, args.repeats) for shards in [0, *args.shards]]
+    result = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "rows": args.rows,
+        "goals": args.goals,
+        "runs": runs
+    }
+    print(json.dumps(result, indent=2))
+
+    if args.results != "-":
+        os.makedirs(os.path.dirname(args.results), exist_ok=True)
+        with open(args.results, "a") as handle:
+            handle.write(json.dumps(result) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
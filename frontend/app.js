@@ -6,6 +6,9 @@ const API_BASE_URL = window.location.hostname === 'localhost'
 // ===== STATE MANAGEMENT =====
 let currentView = 'dashboard';
 let currentGoalId = '';
+let currentDashboard = null;
+let dashboardStream = null;
+let insightsStream = null;
 
 // ===== DOM ELEMENTS =====
 const elements = {
@@ -147,12 +150,44 @@ async function loadDashboard() {
     try {
         const data = await apiCall(`/dashboard/${goalId}`);
         displayDashboard(data);
+        subscribeToDashboard(goalId);
     } catch (error) {
         console.error('Failed to load dashboard:', error);
     }
 }
 
-function displayDashboard(data) {
+// Live updates replace polling: the server pushes metrics and new activities
+function subscribeToDashboard(goalId) {
+    if (dashboardStream) {
+        dashboardStream.close();
+    }
+
+    dashboardStream = new EventSource(`${API_BASE_URL}/stream/dashboard/${encodeURIComponent(goalId)}`);
+    dashboardStream.addEventListener('dashboard', (event) => {
+        const update = JSON.parse(event.data);
+        if (!currentDashboard || update.goal_id !== currentGoalId) {
+            return;
+        }
+        if (update.resync) {
+            loadDashboard();
+            return;
+        }
+
+        currentDashboard = {
+            ...currentDashboard,
+            total_activities: update.total_activities,
+            aggregated_values: update.aggregated_values,
+            consistency_score: update.consistency_score,
+            wellness_warning: update.wellness_warning,
+            activity_history: currentDashboard.activity_history.concat(update.new_activities)
+        };
+        displayDashboard(currentDashboard, { notify: false });
+    });
+}
+
+function displayDashboard(data, { notify = true } = {}) {
+    currentDashboard = data;
+
     // Show dashboard content
     elements.dashboardContent.classList.remove('hidden');
     elements.dashboardEmpty.classList.add('hidden');
@@ -169,7 +204,9 @@ function displayDashboard(data) {
     // Display activity history
     displayActivityHistory(data.activity_history);
 
-    showToast('Dashboard loaded successfully', 'success');
+    if (notify) {
+        showToast('Dashboard loaded successfully', 'success');
+    }
 }
 
 function displayActivityBreakdown(aggregatedValues) {
@@ -309,12 +346,24 @@ async function loadInsights() {
     try {
         const data = await apiCall('/insights/optimization');
         displayInsights(data);
+        subscribeToInsights();
     } catch (error) {
         console.error('Failed to load insights:', error);
     }
 }
 
-function displayInsights(data) {
+function subscribeToInsights() {
+    if (insightsStream) {
+        return;
+    }
+
+    insightsStream = new EventSource(`${API_BASE_URL}/stream/insights`);
+    insightsStream.addEventListener('insights', (event) => {
+        displayInsights(JSON.parse(event.data), { notify: false });
+    });
+}
+
+function displayInsights(data, { notify = true } = {}) {
     // Show insights content
     elements.insightsContent.classList.remove('hidden');
 
@@ -365,7 +414,9 @@ function displayInsights(data) {
     // Update recommendation
     elements.recommendationText.textContent = data.recommendation;
 
-    showToast('Insights generated successfully', 'success');
+    if (notify) {
+        showToast('Insights generated successfully', 'success');
+    }
 }
 
 // ===== UI HELPER FUNCTIONS =====
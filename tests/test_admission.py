@@ -0,0 +1,67 @@
+"""
+Tests for token buckets and admission client identification.
+"""
+from app.api.admission import AdmissionMiddleware
+from app.services.admission_service import AdmissionController, CostRule, TokenBucket
+
+RULE = CostRule("test", "GET", "/", 10)
+
+
+def test_token_bucket_spends_and_refills():
+    bucket = TokenBucket(rate=5, capacity=20, now=0.0)
+    assert bucket.try_consume(10, now=0.0) == 0.0
+    assert bucket.try_consume(10, now=0.0) == 0.0
+    assert bucket.try_consume(10, now=0.0) == 2.0
+    assert bucket.try_consume(10, now=1.0) == 1.0
+    assert bucket.try_consume(10, now=2.0) == 0.0
+
+
+def test_token_bucket_never_exceeds_capacity():
+    bucket = TokenBucket(rate=5, capacity=20, now=0.0)
+    assert bucket.try_consume(20, now=100.0) == 0.0
+    assert bucket.try_consume(1, now=100.0) == 0.2
+    # A cost above capacity waits only for a full bucket
+    assert bucket.try_consume(50, now=100.0) == 4.0
+
+
+def test_controller_limits_each_client_separately():
+    controller = AdmissionController(rate_per_second=1, burst=20)
+    assert controller.admit("a", RULE) == 0.0
+    assert controller.admit("a", RULE) == 0.0
+    assert controller.admit("a", RULE) > 0
+    assert controller.admit("b", RULE) == 0.0
+    assert controller.rate_limited_total == 1
+
+
+def test_client_bucket_map_is_bounded():
+    controller = AdmissionController(max_clients=2)
+    for client in ("a", "b", "c"):
+        controller.admit(client, RULE)
+    assert list(controller._buckets) == ["b", "c"]
+
+
+def _scope(*forwarded, peer="10.0.0.9"):
+    return {"headers": [(b"x-forwarded-for", value.encode()) for value in forwarded], "client": (peer, 1234)}
+
+
+def test_client_is_the_hop_appended_by_the_trusted_proxy():
+    middleware = AdmissionMiddleware(None, AdmissionController(), trusted_proxies=1)
+    assert middleware._client(_scope("203.0.113.7")) == "203.0.113.7"
+    # The client prepended spoofed entries; the proxy appended the real address
+    assert middleware._client(_scope("1.2.3.4, 5.6.7.8, 203.0.113.7")) == "203.0.113.7"
+    assert middleware._client(_scope("1.2.3.4", "203.0.113.7")) == "203.0.113.7"
+    assert middleware._client(_scope()) == "10.0.0.9"
+
+
+def test_client_with_several_trusted_proxies_or_none():
+    two_proxies = AdmissionMiddleware(None, AdmissionController(), trusted_proxies=2)
+    assert two_proxies._client(_scope("1.2.3.4, 203.0.113.7, 10.0.0.2")) == "203.0.113.7"
+    assert two_proxies._client(_scope("203.0.113.7")) == "10.0.0.9"
+
+    direct = AdmissionMiddleware(None, AdmissionController(), trusted_proxies=0)
+    assert direct._client(_scope("203.0.113.7")) == "10.0.0.9"
+
+
+def test_forwarded_header_is_ignored_unless_proxies_are_configured():
+    middleware = AdmissionMiddleware(None, AdmissionController())
+    assert middleware._client(_scope("203.0.113.7")) == "10.0.0.9"
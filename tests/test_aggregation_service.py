@@ -0,0 +1,78 @@
+"""
+Tests for ad-hoc aggregation queries and their result cache.
+"""
+from datetime import date, datetime, timedelta, timezone
+from app.models.activity import Activity
+from app.models.rollup import DailyRollup
+from app.repositories.in_memory_repository import InMemoryActivityRepository
+from app.services.admission_service import DEFAULT_COST_RULES
+from app.services.aggregation_service import AggregationQuery, AggregationService
+
+START = datetime(2026, 1, 5, 9, tzinfo=timezone.utc)  # a Monday
+
+
+def _service():
+    repository = InMemoryActivityRepository()
+    return repository, AggregationService(repository)
+
+
+def test_rollup_min_max_come_from_folded_values_or_fall_back_to_the_mean():
+    repository, service = _service()
+    for value in (4, 10, 7):
+        repository.save(Activity("goal", "Health", value, START + timedelta(hours=value)))
+    repository.compact_before(START + timedelta(days=1))
+    # A rollup that does not know its folded extremes
+    repository.save(DailyRollup("other", "Health", date(2026, 1, 5), value=30, count=3))
+    query = AggregationQuery.normalize(group_by=["goal"], metrics=["min", "max", "count", "avg"])
+
+    result, _ = service.query(query)
+
+    assert result.groups == [
+        ({"goal": "goal"}, {"count": 3, "avg": 7.0, "min": 4, "max": 10}),
+        ({"goal": "other"}, {"count": 3, "avg": 10.0, "min": 10.0, "max": 10.0})
+    ]
+
+
+def test_writes_invalidate_only_results_covering_their_goal():
+    repository, service = _service()
+    saved = repository.save(Activity("goal", "Health", 10, START))
+    repository.save(Activity("other", "Health", 10, START))
+    goal_query = AggregationQuery.normalize(goal_ids=["goal"], metrics=["sum"])
+    other_query = AggregationQuery.normalize(goal_ids=["other"], metrics=["sum"])
+    every_goal = AggregationQuery.normalize(metrics=["sum"])
+
+    def cached():
+        return [service.query(query)[1] for query in (goal_query, other_query, every_goal)]
+
+    assert cached() == [False, False, False]
+    assert cached() == [True, True, True]
+
+    repository.save(Activity("goal", "Health", 5, START + timedelta(hours=1)))
+    assert cached() == [False, True, False]
+    repository.delete(saved.activity_id)
+    assert cached() == [False, True, False]
+    repository.compact_before(START + timedelta(days=1))
+    assert cached() == [False, False, False]
+    assert service.query(goal_query)[0].groups == [({}, {"sum": 5})]
+
+
+def test_groups_follow_the_callers_dimension_order_and_sort_by_key():
+    repository, service = _service()
+    for days, activity_type in ((8, "Learning"), (0, "Health"), (1, "Learning"), (7, "Health")):
+        repository.save(Activity("goal", activity_type, 10, START + timedelta(days=days)))
+    query = AggregationQuery.normalize(group_by=["weekday", "type", "weekday"], metrics=["count"])
+
+    result, _ = service.query(query)
+
+    assert query.group_by == ("weekday", "type")
+    # Keys sort by weekday number, not by the rendered name
+    assert [list(key.items()) for key, _ in result.groups] == [
+        [("weekday", "Monday"), ("type", "Health")],
+        [("weekday", "Tuesday"), ("type", "Learning")]
+    ]
+    assert [values["count"] for _, values in result.groups] == [2, 2]
+
+
+def test_aggregation_queries_share_the_expensive_request_cap():
+    rule = next(rule for rule in DEFAULT_COST_RULES if rule.prefix == "/aggregations/query")
+    assert rule.expensive
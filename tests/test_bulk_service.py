@@ -0,0 +1,111 @@
+"""
+Tests for bulk export and import.
+"""
+import json
+from datetime import datetime, timezone
+from uuid import uuid4
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.bulk import create_bulk_router
+from app.models.activity import Activity
+from app.repositories.in_memory_repository import InMemoryActivityRepository
+from app.repositories.segmented_repository import SegmentedActivityRepository
+from app.services.bulk_service import BulkImporter, export_csv, export_ndjson
+
+TIMESTAMP = "2026-01-01T08:00:00+00:00"
+
+
+def _import(lines, format="ndjson", repository=None):
+    repository = repository if repository is not None else InMemoryActivityRepository()
+    importer = BulkImporter(repository, format)
+    importer.feed_lines(lines)
+    importer.finish()
+    return repository, importer
+
+
+def _row(**fields):
+    return json.dumps({"goal_id": "goal", "activity_type": "Health", "value": 10, "timestamp": TIMESTAMP, **fields})
+
+
+def test_activity_ids_must_be_uuids():
+    activity_id = str(uuid4())
+    repository, importer = _import([
+        _row(activity_id=activity_id.upper()),
+        _row(activity_id="not-a-uuid"),
+        _row(activity_id=42),
+        _row()
+    ])
+
+    assert importer.imported == 2
+    assert importer.rejected == 2
+    assert importer.errors == ["line 2: activity_id must be a UUID string", "line 3: activity_id must be a UUID string"]
+    assert repository.find_by_id(activity_id) is not None
+
+
+def test_exported_rollups_carry_their_count_and_are_rejected_on_import():
+    repository = InMemoryActivityRepository()
+    for hour in (1, 2, 3):
+        repository.save(Activity("goal", "Health", 10, datetime(2026, 1, 1, hour, tzinfo=timezone.utc)))
+    repository.save(Activity("goal", "Health", 5, datetime(2026, 2, 1, tzinfo=timezone.utc)))
+    repository.compact_before(datetime(2026, 1, 15, tzinfo=timezone.utc))
+
+    rows = [json.loads(line) for chunk in export_ndjson(repository.iter_activities()) for line in chunk.splitlines()]
+    assert [(row["value"], row["count"]) for row in rows] == [(30, 3), (5, 1)]
+
+    _, importer = _import(json.dumps(row) for row in rows)
+    assert importer.imported == 1
+    assert importer.errors == ["line 1: compacted daily rollups cannot be re-imported"]
+
+
+def test_csv_export_round_trips():
+    repository = InMemoryActivityRepository()
+    repository.save(Activity("goal", "Fitness", 12.5, datetime(2026, 1, 1, tzinfo=timezone.utc)))
+
+    lines = "".join(export_csv(repository.iter_activities())).splitlines()
+    imported, importer = _import(lines, format="csv")
+
+    assert importer.rejected == 0
+    assert [activity.to_dict() for activity in imported.find_all()] == [
+        activity.to_dict() for activity in repository.find_all()
+    ]
+
+
+def test_non_finite_values_are_rejected():
+    _, importer = _import([_row(value="inf"), _row(value="nan"), _row(value="-inf"), _row()])
+    assert importer.imported == 1
+    assert importer.errors == [
+        f"line {line}: value must be a finite number" for line in (1, 2, 3)
+    ]
+
+
+def test_reimporting_an_export_skips_existing_rows_including_sealed_ones(tmp_path):
+    repository = SegmentedActivityRepository(str(tmp_path))
+    for day in (1, 2, 20):
+        repository.save(Activity("goal", "Health", day, datetime(2026, 1, day, tzinfo=timezone.utc)))
+    repository.seal_before(datetime(2026, 1, 10, tzinfo=timezone.utc))
+    lines = [line for chunk in export_ndjson(repository.iter_activities()) for line in chunk.splitlines()]
+
+    _, importer = _import([*lines, _row()], repository=repository)
+
+    assert (importer.imported, importer.duplicates, importer.rejected) == (1, 3, 0)
+    assert len(repository) == 4
+    repository.close()
+
+
+def test_import_endpoint_parses_off_the_loop_and_reports_duplicates():
+    repository = InMemoryActivityRepository()
+    existing = repository.save(Activity("goal", "Health", 10, datetime(2026, 1, 1, tzinfo=timezone.utc)))
+    app = FastAPI()
+    app.include_router(create_bulk_router(repository))
+    body = "\n".join([_row(activity_id=existing.activity_id), _row(value="inf"), _row()])
+
+    response = TestClient(app).post("/activities/import", content=body)
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "imported": 1,
+        "rejected": 1,
+        "duplicates": 1,
+        "errors": ["line 2: value must be a finite number"]
+    }
+    assert len(repository) == 2
@@ -0,0 +1,85 @@
+"""
+Tests for per-goal change logs used by dashboard deltas.
+"""
+from datetime import datetime, timezone
+from app.models.activity import Activity
+from app.repositories.in_memory_repository import InMemoryActivityRepository
+from app.services.change_log import GoalChangeLog
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _log(max_changes_per_goal: int = GoalChangeLog.MAX_CHANGES_PER_GOAL):
+    repository = InMemoryActivityRepository()
+    return repository, GoalChangeLog(repository, max_changes_per_goal)
+
+
+def test_delta_lists_each_changed_activity_once_in_version_order():
+    repository, change_log = _log()
+    first = repository.save(Activity("goal", "Health", 10, NOW))
+    since = change_log.current_version("goal")
+
+    second = repository.save(Activity("goal", "Health", 20, NOW))
+    repository.save(Activity("other", "Health", 5, NOW))
+    repository.update(Activity("goal", "Health", 15, NOW, activity_id=first.activity_id))
+
+    version, changed = change_log.changes_since("goal", since)
+    assert changed == [second.activity_id, first.activity_id]
+    assert version == change_log.current_version("goal")
+    assert change_log.changes_since("goal", version) == (version, [])
+
+
+def test_deletes_are_reported_as_changes():
+    repository, change_log = _log()
+    activity = repository.save(Activity("goal", "Health", 10, NOW))
+    since = change_log.current_version("goal")
+
+    repository.delete(activity.activity_id)
+
+    _, changed = change_log.changes_since("goal", since)
+    assert changed == [activity.activity_id]
+    assert repository.find_by_id(activity.activity_id) is None
+
+
+def test_versions_increase_across_goals():
+    repository, change_log = _log()
+    versions = []
+    for goal_id in ("a", "b", "a", "c"):
+        repository.save(Activity(goal_id, "Health", 10, NOW))
+        versions.append(change_log.current_version(goal_id))
+    assert versions == sorted(set(versions))
+    assert versions[0] > change_log.boot_version
+
+
+def test_clients_behind_the_trimmed_log_must_resync():
+    repository, change_log = _log(max_changes_per_goal=3)
+    since = change_log.current_version("goal")
+    for value in range(1, 8):
+        repository.save(Activity("goal", "Health", value, NOW))
+
+    version, changed = change_log.changes_since("goal", since)
+    assert changed is None
+    recent = version - 2
+    _, changed = change_log.changes_since("goal", recent)
+    assert len(changed) == 2
+
+
+def test_unknown_or_foreign_versions_must_resync():
+    repository, change_log = _log()
+    repository.save(Activity("goal", "Health", 10, NOW))
+    version = change_log.current_version("goal")
+
+    assert change_log.changes_since("goal", change_log.boot_version - 1)[1] is None
+    assert change_log.changes_since("goal", version + 1)[1] is None
+    assert change_log.changes_since("new-goal", change_log.boot_version) == (change_log.boot_version, [])
+
+
+def test_invalidate_forces_a_resync():
+    repository, change_log = _log()
+    repository.save(Activity("goal", "Health", 10, NOW))
+    version = change_log.current_version("goal")
+
+    change_log.invalidate("goal")
+
+    assert change_log.changes_since("goal", version)[1] is None
+    assert change_log.changes_since("goal", change_log.current_version("goal"))[1] == []
@@ -0,0 +1,64 @@
+"""
+Tests for the multi-goal batch dashboard endpoint.
+"""
+from datetime import datetime, timedelta, timezone
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.dashboard import create_dashboard_router
+from app.models.activity import Activity
+from app.repositories.in_memory_repository import InMemoryActivityRepository
+from app.services.analytics_service import AnalyticsService
+from app.services.change_log import GoalChangeLog
+from app.services.metrics_cache import MetricsCache
+from app.services.recommendation_service import RecommendationService
+
+
+def _client():
+    # The dashboard router is module-level, so the module shares one app
+    repository = InMemoryActivityRepository()
+    analytics_service = AnalyticsService()
+    metrics_cache = MetricsCache(repository, analytics_service, RecommendationService(analytics_service))
+    change_log = GoalChangeLog(repository)
+    app = FastAPI()
+    app.include_router(create_dashboard_router(repository, analytics_service, metrics_cache, change_log))
+    return repository, change_log, TestClient(app)
+
+
+REPOSITORY, CHANGE_LOG, CLIENT = _client()
+
+
+def test_batch_dedupes_goal_ids_and_returns_empty_dashboards_for_unknown_goals():
+    now = datetime.now(timezone.utc)
+    for hours, activity_type in ((1, "Health"), (2, "Learning")):
+        REPOSITORY.save(Activity("known", activity_type, 200, now - timedelta(hours=hours)))
+
+    response = CLIENT.post("/dashboard/batch", json={"goal_ids": ["known", "unknown", "known", "unknown"]})
+
+    assert response.status_code == 200
+    dashboards = response.json()["dashboards"]
+    assert [dashboard["goal_id"] for dashboard in dashboards] == ["known", "unknown"]
+    known, unknown = dashboards
+    assert known["total_activities"] == 2
+    assert known["aggregated_values"] == {"Health": 200, "Learning": 200}
+    assert known["activity_history"] == []
+    assert not known["wellness_warning"]
+    assert unknown == {
+        "goal_id": "unknown",
+        "total_activities": 0,
+        "aggregated_values": {},
+        "activity_history": [],
+        "consistency_score": 0.0,
+        "wellness_warning": True,
+        "version": CHANGE_LOG.current_version("unknown")
+    }
+
+
+def test_batch_history_is_opt_in_and_matches_the_single_goal_dashboard():
+    REPOSITORY.save(Activity("history", "Fitness", 30, datetime.now(timezone.utc)))
+
+    batch = CLIENT.post("/dashboard/batch", json={"goal_ids": ["history"], "include_history": True}).json()
+    single = CLIENT.get("/dashboard/history").json()
+
+    dashboard, = batch["dashboards"]
+    assert dashboard["activity_history"] == single["activity_history"]
+    assert len(dashboard["activity_history"]) == 1
@@ -0,0 +1,149 @@
+"""
+Tests for the live-update broker and the SSE stream generator.
+"""
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from app.api.stream import _event_stream
+from app.models.activity import Activity
+from app.repositories.in_memory_repository import InMemoryActivityRepository
+from app.services.analytics_service import AnalyticsService
+from app.services.event_broker import INSIGHTS_TOPIC, DashboardEventBroker, dashboard_topic
+from app.services.metrics_cache import MetricsCache
+from app.services.recommendation_service import RecommendationService
+
+WINDOW = 0.01
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _broker(global_analytics=None):
+    repository = InMemoryActivityRepository()
+    analytics_service = AnalyticsService()
+    broker = DashboardEventBroker(
+        repository, analytics_service, RecommendationService(analytics_service),
+        coalesce_window=WINDOW, global_analytics=global_analytics
+    )
+    return repository, broker
+
+
+def _drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+class _Disconnected:
+    async def is_disconnected(self) -> bool:
+        return True
+
+
+def test_burst_of_saves_is_flushed_as_one_event():
+    async def scenario():
+        repository, broker = _broker()
+        subscription = broker.subscribe(dashboard_topic("goal"))
+        for value in (10, 20, 30):
+            repository.save(Activity("goal", "Health", value, NOW))
+        repository.save(Activity("other", "Health", 5, NOW))
+        await asyncio.sleep(WINDOW * 5)
+        return _drain(subscription)
+
+    events = asyncio.run(scenario())
+    assert len(events) == 1
+    event, payload = events[0]
+    assert event == "dashboard"
+    assert [activity.value for activity in payload.new_activities] == [10, 20, 30]
+    assert payload.total_activities == 3
+
+
+def test_deletes_cancel_pending_appends_and_are_reported():
+    async def scenario():
+        repository, broker = _broker()
+        subscription = broker.subscribe(dashboard_topic("goal"))
+        kept = repository.save(Activity("goal", "Health", 10, NOW))
+        await asyncio.sleep(WINDOW * 5)
+        _drain(subscription)
+
+        transient = repository.save(Activity("goal", "Health", 20, NOW))
+        repository.delete(transient.activity_id)
+        repository.delete(kept.activity_id)
+        await asyncio.sleep(WINDOW * 5)
+        return kept, transient, _drain(subscription)
+
+    kept, transient, events = asyncio.run(scenario())
+    assert len(events) == 1
+    payload = events[0][1]
+    assert payload.new_activities == []
+    assert payload.removed_activity_ids == [transient.activity_id, kept.activity_id]
+    assert payload.total_activities == 0
+
+
+def test_unsubscribed_topics_are_ignored():
+    async def scenario():
+        repository, broker = _broker()
+        subscription = broker.subscribe(dashboard_topic("goal"))
+        broker.unsubscribe(subscription)
+        broker.unsubscribe(subscription)
+        repository.save(Activity("goal", "Health", 10, NOW))
+        return broker
+
+    broker = asyncio.run(scenario())
+    assert broker.subscriber_count() == 0
+    assert broker._pending == {}
+
+
+def test_stream_releases_its_subscription_when_the_snapshot_fails():
+    async def failing_snapshot():
+        raise RuntimeError("snapshot failed")
+
+    async def scenario():
+        _, broker = _broker()
+        stream = _event_stream(_Disconnected(), broker, INSIGHTS_TOPIC, "insights", failing_snapshot)
+        with pytest.raises(RuntimeError):
+            await stream.__anext__()
+        # A client gone before the body starts never subscribes
+        unstarted = _event_stream(_Disconnected(), broker, INSIGHTS_TOPIC, "insights", broker.insights_snapshot)
+        await unstarted.aclose()
+        return broker
+
+    assert asyncio.run(scenario()).subscriber_count() == 0
+
+
+def test_stream_sends_the_snapshot_then_unsubscribes_on_disconnect():
+    async def scenario():
+        repository, broker = _broker()
+        repository.save(Activity("goal", "Health", 10, NOW))
+        frames = [
+            frame async for frame in _event_stream(
+                _Disconnected(), broker, INSIGHTS_TOPIC, "insights", broker.insights_snapshot
+            )
+        ]
+        return broker, frames
+
+    broker, frames = asyncio.run(scenario())
+    assert len(frames) == 1 and frames[0].startswith("event: insights\n")
+    assert broker.subscriber_count() == 0
+
+
+def test_insights_snapshot_uses_global_analytics_instead_of_scanning():
+    class _GlobalAnalytics:
+        def __init__(self, metrics_cache):
+            self.metrics_cache = metrics_cache
+
+        async def get_global_metrics(self):
+            return self.metrics_cache._compute(None, [Activity("goal", "Health", 10, NOW)])
+
+    repository = InMemoryActivityRepository()
+    analytics_service = AnalyticsService()
+    recommendation_service = RecommendationService(analytics_service)
+    metrics_cache = MetricsCache(repository, analytics_service, recommendation_service)
+    broker = DashboardEventBroker(
+        repository, analytics_service, recommendation_service, global_analytics=_GlobalAnalytics(metrics_cache)
+    )
+
+    def _no_scan():
+        raise AssertionError("find_all must not run on the loop")
+
+    repository.find_all = _no_scan
+    snapshot = asyncio.run(broker.insights_snapshot())
+    assert snapshot.wellness_warning
@@ -0,0 +1,117 @@
+"""
+Tests for goal-scoped idempotency keys.
+"""
+from datetime import datetime, timezone
+from app.models.activity import Activity
+from app.repositories.in_memory_repository import InMemoryActivityRepository
+from app.repositories.segmented_repository import SegmentedActivityRepository
+from app.services.idempotency_service import IdempotencyIndex
+
+
+def _activity(index: IdempotencyIndex, goal_id: str, key: str) -> Activity:
+    return Activity(
+        goal_id, "Learning", 30, datetime(2026, 1, 5, 9, tzinfo=timezone.utc),
+        activity_id=index.activity_id_for(goal_id, key)
+    )
+
+
+def test_replay_returns_the_original_activity():
+    repository = InMemoryActivityRepository()
+    index = IdempotencyIndex(repository)
+    original = repository.save(_activity(index, "goal-1", "key-1"))
+    index.remember(original)
+
+    assert index.lookup("goal-1", "key-1") is original
+    assert index.metrics()["repository_hits"] == 1
+
+
+def test_keys_are_scoped_to_their_goal():
+    repository = InMemoryActivityRepository()
+    index = IdempotencyIndex(repository)
+    index.remember(repository.save(_activity(index, "goal-1", "shared")))
+
+    assert index.activity_id_for("goal-1", "shared") != index.activity_id_for("goal-2", "shared")
+    assert index.activity_id_for("ab", "c") != index.activity_id_for("a", "bc")
+    assert index.lookup("goal-2", "shared") is None
+
+
+def test_unknown_key_is_rejected_by_the_bloom_filter():
+    index = IdempotencyIndex(InMemoryActivityRepository())
+    index.mark_warmed()
+    assert index.lookup("goal-1", "never-sent") is None
+    assert index.metrics()["bloom_negatives"] == 1
+
+
+def test_sealed_history_is_found_after_a_restart(tmp_path):
+    repository = SegmentedActivityRepository(str(tmp_path))
+    index = IdempotencyIndex(repository)
+    original = repository.save(_activity(index, "goal-1", "key-1"))
+    repository.save(Activity("goal-1", "Learning", 10, datetime(2026, 1, 5, tzinfo=timezone.utc)))
+    repository.seal_before(datetime(2026, 2, 1, tzinfo=timezone.utc))
+    repository.close()
+
+    repository = SegmentedActivityRepository(str(tmp_path))
+    index = IdempotencyIndex(repository)
+    # Before history is loaded, a filter miss still asks the repository
+    assert index.lookup("goal-1", "key-1").activity_id == original.activity_id
+
+    index.load(repository.iter_persisted_activities())
+    index.mark_warmed()
+    assert index.lookup("goal-1", "key-1").activity_id == original.activity_id
+    assert index.lookup("goal-1", "key-2") is None
+    assert index.metrics()["bloom_negatives"] == 1
+    repository.close()
+
+
+def test_queued_activity_is_held_until_committed():
+    repository = InMemoryActivityRepository()
+    index = IdempotencyIndex(repository)
+    queued = _activity(index, "goal-1", "key-1")
+    index.remember(queued, pending=True)
+
+    assert index.lookup("goal-1", "key-1") is queued
+    assert index.metrics()["pending_keys"] == 1
+
+    repository.save(queued)
+    assert index.metrics()["pending_keys"] == 0
+    assert index.lookup("goal-1", "key-1") is queued
+
+
+def test_pending_activities_are_bounded():
+    index = IdempotencyIndex(InMemoryActivityRepository(), pending_capacity=2)
+    for key in ("a", "b", "c"):
+        index.remember(_activity(index, "goal-1", key), pending=True)
+    assert index.metrics()["pending_keys"] == 2
+    assert index.lookup("goal-1", "a") is None
+
+
+def test_deleted_activity_is_no_longer_a_duplicate():
+    repository = InMemoryActivityRepository()
+    index = IdempotencyIndex(repository)
+    original = repository.save(_activity(index, "goal-1", "key-1"))
+    index.remember(original)
+
+    repository.delete(original.activity_id)
+    assert index.lookup("goal-1", "key-1") is None
+
+
+def test_filter_rotation_keeps_the_previous_generation():
+    repository = InMemoryActivityRepository()
+    index = IdempotencyIndex(repository, bloom_capacity=2)
+    for key in ("a", "b", "c"):
+        index.remember(repository.save(_activity(index, "goal-1", key)))
+
+    assert index.lookup("goal-1", "a") is not None
+    assert index.lookup("goal-1", "c") is not None
+
+
+def test_failed_ingestion_releases_the_pending_key():
+    repository = InMemoryActivityRepository()
+    index = IdempotencyIndex(repository)
+    index.mark_warmed()
+    queued = _activity(index, "goal-1", "key-1")
+    index.remember(queued, pending=True)
+
+    index.on_ingestion_failed([queued])
+    assert index.lookup("goal-1", "key-1") is None
+    assert index.metrics()["pending_keys"] == 0
@@ -0,0 +1,74 @@
+"""
+Tests for time-ordered (UUIDv7) activity ids.
+"""
+from uuid import UUID
+from app.repositories.segment_store import decode_activity_id, encode_activity_id, is_uuid_id
+from app.utils import ids
+from app.utils.ids import ActivityIdGenerator, new_activity_id
+
+
+def _assert_strictly_increasing(activity_ids):
+    uuids = [UUID(activity_id) for activity_id in activity_ids]
+    assert all(a.int < b.int for a, b in zip(uuids, uuids[1:]))
+    assert all(a.bytes < b.bytes for a, b in zip(uuids, uuids[1:]))
+    assert all(a < b for a, b in zip(activity_ids, activity_ids[1:]))
+
+
+def _millis(activity_id: str) -> int:
+    return UUID(activity_id).int >> 80
+
+
+def _frozen_clock(monkeypatch, millis):
+    """Make the generator's clock read ``millis[0]`` (mutable, in ms)."""
+    monkeypatch.setattr(ids.time, "time_ns", lambda: millis[0] * 1_000_000)
+
+
+def test_ids_are_canonical_v7_uuids():
+    activity_id = new_activity_id()
+    parsed = UUID(activity_id)
+    assert parsed.version == 7
+    assert parsed.variant == "specified in RFC 4122"
+    assert str(parsed) == activity_id
+    assert is_uuid_id(activity_id)
+    assert decode_activity_id(encode_activity_id(activity_id)) == activity_id
+
+
+def test_ids_increase_as_integers_bytes_and_strings():
+    generator = ActivityIdGenerator()
+    _assert_strictly_increasing([generator.new_id() for _ in range(20_000)])
+
+
+def test_timestamp_bits_hold_the_clock(monkeypatch):
+    clock = [1_760_000_000_000]
+    _frozen_clock(monkeypatch, clock)
+    generator = ActivityIdGenerator()
+    assert _millis(generator.new_id()) == clock[0]
+    clock[0] += 5
+    assert _millis(generator.new_id()) == clock[0]
+
+
+def test_counter_overflow_carries_into_the_timestamp(monkeypatch):
+    clock = [1_760_000_000_000]
+    _frozen_clock(monkeypatch, clock)
+    generator = ActivityIdGenerator()
+    # The seeded counter leaves at least 2048 values before overflowing
+    activity_ids = [generator.new_id() for _ in range(3 * (ActivityIdGenerator.COUNTER_MAX + 1))]
+
+    _assert_strictly_increasing(activity_ids)
+    assert _millis(activity_ids[0]) == clock[0]
+    assert _millis(activity_ids[-1]) > clock[0]
+    assert all(UUID(activity_id).version == 7 for activity_id in activity_ids)
+
+
+def test_clock_stepping_back_never_reorders(monkeypatch):
+    clock = [1_760_000_000_000]
+    _frozen_clock(monkeypatch, clock)
+    generator = ActivityIdGenerator()
+    before = generator.new_id()
+    clock[0] -= 60_000
+    after = [generator.new_id() for _ in range(10)]
+
+    _assert_strictly_increasing([before, *after])
+    assert all(_millis(activity_id) == _millis(before) for activity_id in after)
+    clock[0] += 120_000
+    assert _millis(generator.new_id()) == clock[0]
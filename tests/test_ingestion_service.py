@@ -0,0 +1,118 @@
+"""
+Tests for the asynchronous ingestion queue and its API mapping.
+"""
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.activities import create_activities_router
+from app.models.activity import Activity
+from app.repositories.in_memory_repository import InMemoryActivityRepository
+from app.services.ingestion_service import IngestionQueue, IngestionQueueFull
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class _RejectingRepository(InMemoryActivityRepository):
+    """Fails any write that includes the "broken" goal, before storing anything."""
+
+    def save_many(self, activities):
+        if any(activity.goal_id == "broken" for activity in activities):
+            raise RuntimeError("storage rejected the batch")
+        return super().save_many(activities)
+
+    def save(self, activity):
+        return self.save_many([activity])[0]
+
+
+async def _drained(queue: IngestionQueue) -> None:
+    while queue.depth():
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+
+def test_writer_commits_in_batches():
+    async def scenario():
+        repository = InMemoryActivityRepository()
+        queue = IngestionQueue(repository, batch_size=3)
+        queue.start()
+        for value in range(7):
+            queue.submit(Activity("goal", "Health", value + 1, NOW))
+        await _drained(queue)
+        await queue.stop()
+        return repository, queue
+
+    repository, queue = asyncio.run(scenario())
+    assert len(repository) == 7
+    assert (queue.committed_total, queue.batches_total, queue.failed_total) == (7, 3, 0)
+
+
+def test_full_queue_rejects_with_a_retry_delay():
+    async def scenario():
+        queue = IngestionQueue(InMemoryActivityRepository(), max_size=2)
+        queue.start()
+        queue.submit(Activity("goal", "Health", 1, NOW))
+        queue.submit(Activity("goal", "Health", 2, NOW))
+        with pytest.raises(IngestionQueueFull) as rejected:
+            queue.submit(Activity("goal", "Health", 3, NOW))
+        await queue.stop()
+        return queue, rejected.value
+
+    queue, error = asyncio.run(scenario())
+    assert error.retry_after_seconds >= 1
+    assert (queue.rejected_total, queue.committed_total) == (1, 2)
+
+
+def test_failed_batch_is_retried_row_by_row():
+    failures = []
+
+    async def scenario():
+        repository = _RejectingRepository()
+        queue = IngestionQueue(repository)
+        queue.add_failure_listener(failures.extend)
+        queue.start()
+        for goal_id in ("goal", "broken", "goal"):
+            queue.submit(Activity(goal_id, "Health", 10, NOW))
+        await _drained(queue)
+        await queue.stop()
+        return repository, queue
+
+    repository, queue = asyncio.run(scenario())
+    assert len(repository) == 2
+    assert [activity.goal_id for activity in failures] == ["broken"]
+    assert (queue.committed_total, queue.failed_total) == (2, 1)
+
+
+def test_submit_requires_a_running_writer():
+    queue = IngestionQueue(InMemoryActivityRepository())
+    with pytest.raises(RuntimeError):
+        queue.submit(Activity("goal", "Health", 1, NOW))
+
+
+class _StalledQueue(IngestionQueue):
+    """A queue whose writer state is set by the test and which is always full once running."""
+
+    running = False
+
+    def submit(self, activity):
+        raise IngestionQueueFull(3)
+
+
+def test_api_falls_back_to_inline_saves_and_sheds_load_when_full():
+    # The activities router is module-level, so one app serves both checks
+    queue = _StalledQueue(InMemoryActivityRepository())
+    app = FastAPI()
+    app.include_router(create_activities_router(queue.repository, queue))
+    client = TestClient(app)
+    payload = {"goal_id": "goal", "activity_type": "Health", "value": 10, "timestamp": "2026-01-01T09:00:00Z"}
+
+    response = client.post("/activities", json=payload)
+    assert response.status_code == 201
+    assert queue.repository.find_by_id(response.json()["activity_id"]) is not None
+
+    queue.running = True
+    response = client.post("/activities", json=payload)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
+    assert len(queue.repository) == 1
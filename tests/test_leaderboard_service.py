@@ -0,0 +1,132 @@
+"""
+Tests for incrementally maintained leaderboards.
+"""
+import random
+from datetime import date, datetime, timedelta, timezone
+from app.models.activity import Activity
+from app.repositories.in_memory_repository import InMemoryActivityRepository
+from app.services.analytics_service import AnalyticsService
+from app.services.leaderboard_service import (
+    STREAKS_BOARD, WELLNESS_RISK_BOARD, DayRuns, LeaderboardService
+)
+from app.services.statistics_service import StatisticsService
+
+
+def _service():
+    repository = InMemoryActivityRepository()
+    return repository, LeaderboardService(repository, AnalyticsService())
+
+
+def _scores(service, board):
+    _, entries = service.top(board, limit=1000)
+    return {goal_id: score for _, goal_id, score in entries}
+
+
+def test_day_runs_match_the_active_set():
+    rng = random.Random(7)
+    runs = DayRuns()
+    active = set()
+    origin = date(2026, 1, 1)
+    for _ in range(2000):
+        day = origin + timedelta(days=rng.randrange(60))
+        if day in active:
+            active.remove(day)
+            runs.discard(day)
+        else:
+            active.add(day)
+            runs.add(day)
+
+        probe = origin + timedelta(days=rng.randrange(60))
+        expected = None
+        if probe in active:
+            start, end = probe, probe
+            while start - timedelta(days=1) in active:
+                start -= timedelta(days=1)
+            while end + timedelta(days=1) in active:
+                end += timedelta(days=1)
+            expected = (start, end)
+        assert runs.run_containing(probe) == expected
+    assert sum((runs.ends[start] - start).days + 1 for start in runs.starts) == len(active)
+
+
+def test_streak_uses_utc_days():
+    repository, service = _service()
+    today = service._today
+    # 23:30 yesterday at UTC-2 is 01:30 today in UTC
+    minus_two = timezone(timedelta(hours=-2))
+    yesterday = datetime.combine(today - timedelta(days=1), datetime.min.time())
+    repository.save(Activity("goal", "Other", 5, yesterday.replace(tzinfo=minus_two) + timedelta(hours=23, minutes=30)))
+    repository.save(Activity("goal", "Other", 5, yesterday.replace(tzinfo=timezone.utc)))
+
+    assert _scores(service, STREAKS_BOARD) == {"goal": 2}
+
+
+def test_streak_agrees_with_consistency_and_statistics_across_offsets():
+    repository, service = _service()
+    statistics = StatisticsService(repository)
+    midnight = datetime.combine(service._today, datetime.min.time(), tzinfo=timezone.utc)
+
+    def at(days_ago, hour, zone):
+        timestamp = midnight - timedelta(days=days_ago) + timedelta(hours=hour)
+        return timestamp.astimezone(zone) if zone else timestamp.replace(tzinfo=None)
+
+    # One activity per UTC day for five days; by local date, the +05:00 and
+    # -05:00 rows move onto their neighbours' days and leave gaps
+    activities = [
+        Activity("goal", "Other", 5, at(0, 1, timezone.utc)),
+        Activity("goal", "Other", 5, at(1, 21, timezone(timedelta(hours=5)))),
+        Activity("goal", "Other", 5, at(2, 12, None)),
+        Activity("goal", "Other", 5, at(3, 2, timezone(timedelta(hours=-5)))),
+        Activity("goal", "Other", 5, at(4, 23, timezone(timedelta(hours=9))))
+    ]
+    assert len({activity.timestamp.date() for activity in activities}) < 5
+    repository.save_many(activities)
+
+    analytics = AnalyticsService()
+    streak = _scores(service, STREAKS_BOARD)["goal"]
+    assert streak == 5
+    assert analytics.score_consecutive_days(streak) == analytics.calculate_consistency_score(activities)
+    assert statistics.distinct_active_days("goal") == 5
+
+
+def test_rollover_adds_goals_whose_days_come_into_range():
+    repository, service = _service()
+    tomorrow = datetime.combine(service._today + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+    repository.save(Activity("ahead", "Other", 5, tomorrow + timedelta(hours=3)))
+    assert _scores(service, STREAKS_BOARD) == {}
+
+    service.rollover(tomorrow + timedelta(hours=1))
+    assert _scores(service, STREAKS_BOARD) == {"ahead": 1}
+
+
+def test_streak_breaks_when_a_middle_day_is_deleted():
+    repository, service = _service()
+    now = datetime.now(timezone.utc)
+    activities = [Activity("goal", "Other", 5, now - timedelta(days=days)) for days in range(5)]
+    repository.save_many(activities)
+    assert _scores(service, STREAKS_BOARD) == {"goal": 5}
+
+    repository.delete(activities[2].activity_id)
+    assert _scores(service, STREAKS_BOARD) == {"goal": 2}
+
+
+def test_goal_without_activities_leaves_the_wellness_board():
+    repository, service = _service()
+    activity = repository.save(Activity("goal", "Health", 10, datetime.now(timezone.utc)))
+    assert _scores(service, WELLNESS_RISK_BOARD) == {"goal": 10}
+
+    repository.delete(activity.activity_id)
+    assert _scores(service, WELLNESS_RISK_BOARD) == {}
+    assert _scores(service, STREAKS_BOARD) == {}
+    service.expire_wellness_windows(datetime.now(timezone.utc) + timedelta(days=30))
+
+
+def test_wellness_window_expires_out_of_order_saves():
+    repository, service = _service()
+    now = datetime.now(timezone.utc)
+    for hours in (10, 30, 20, 1):
+        repository.save(Activity("goal", "Health", hours, now - timedelta(hours=hours)))
+    assert [value for _, value in service._states["goal"].health_window] == [30, 20, 10, 1]
+
+    service.expire_wellness_windows(now + service.window - timedelta(hours=15))
+    assert _scores(service, WELLNESS_RISK_BOARD) == {"goal": 11}
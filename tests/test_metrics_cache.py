@@ -0,0 +1,61 @@
+"""
+Tests for the bounded, lazily refreshed MetricsCache.
+"""
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from app.models.activity import Activity
+from app.repositories.in_memory_repository import InMemoryActivityRepository
+from app.services.analytics_service import AnalyticsService
+from app.services.metrics_cache import GLOBAL_SCOPE, MetricsCache
+from app.services.recommendation_service import RecommendationService
+
+
+def _cache(max_entries: int = MetricsCache.MAX_ENTRIES):
+    repository = InMemoryActivityRepository()
+    analytics_service = AnalyticsService()
+    cache = MetricsCache(repository, analytics_service, RecommendationService(analytics_service), max_entries)
+    return repository, cache
+
+
+def test_least_recently_read_goal_is_evicted():
+    repository, cache = _cache(max_entries=2)
+    now = datetime.now(timezone.utc)
+    for goal_id in ("a", "b"):
+        repository.save(Activity(goal_id, "Health", 10, now))
+        cache.get_goal_metrics(goal_id)
+
+    cache.get_goal_metrics("a")
+    repository.save(Activity("c", "Health", 10, now))
+    cache.get_goal_metrics("c")
+
+    assert list(cache._entries) == ["a", "c"]
+
+
+def test_write_invalidates_goal_and_global_entries():
+    repository, cache = _cache()
+    now = datetime.now(timezone.utc)
+    repository.save(Activity("a", "Learning", 30, now))
+    cache.get_goal_metrics("a")
+    cache.get_global_metrics()
+
+    repository.save(Activity("a", "Learning", 15, now))
+
+    assert "a" not in cache._entries and GLOBAL_SCOPE not in cache._entries
+    assert cache.get_goal_metrics("a").aggregated_values == {"Learning": 45}
+
+
+def test_expired_entries_are_evicted_and_recomputed_on_read():
+    repository, cache = _cache()
+    now = datetime.now(timezone.utc)
+    repository.save(Activity("a", "Health", 200, now - timedelta(days=6, hours=23)))
+    entry = cache.get_goal_metrics("a", now=now)
+    assert entry.wellness_warning is False
+    assert entry.expires_at <= now + timedelta(hours=1)
+
+    later = entry.expires_at + timedelta(seconds=1)
+    refreshed = cache.get_goal_metrics("a", now=later)
+    assert refreshed is not entry and refreshed.wellness_warning is True
+
+    cache._entries["a"] = replace(entry, expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+    assert cache.evict_expired() == 1
+    assert len(cache) == 0
@@ -0,0 +1,206 @@
+"""
+Randomized update/delete sequences checked against from-scratch recomputes.
+
+Every save-listener maintained structure (streak and leaderboard state,
+statistics sketches, metrics cache, aggregation cache, change log and the
+columnar analytics log) is driven through random saves, batch overwrites,
+updates, deletes, compaction and, for the tiered repository, sealing and
+segment compaction. The test keeps its own model of the live raw
+activities and compares each structure with one rebuilt from that model.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.models.activity import Activity
+from app.models.rollup import DailyRollup
+from app.repositories.in_memory_repository import InMemoryActivityRepository, _timestamp_key
+from app.repositories.segment_store import SegmentStore
+from app.repositories.segmented_repository import SegmentedActivityRepository
+from app.services.aggregation_service import AggregationQuery, AggregationService
+from app.services.analytics_service import AnalyticsService
+from app.services.change_log import GoalChangeLog
+from app.services.leaderboard_service import LeaderboardService
+from app.services.metrics_cache import MetricsCache
+from app.services.offload_service import GlobalAnalyticsOffloader, _to_epoch_micros, compute_global_metrics
+from app.services.recommendation_service import RecommendationService
+from app.services.statistics_service import StatisticsService
+
+TYPES = ("Learning", "Health", "Fitness", "Other")
+GOALS = tuple(f"goal-{index}" for index in range(6))
+ZONES = (timezone.utc, timezone(timedelta(hours=-7)), timezone(timedelta(hours=5, minutes=30)), None)
+STEPS = 400
+
+
+def _random_activity(rng: random.Random, now: datetime, activity_id=None) -> Activity:
+    timestamp = now - timedelta(seconds=rng.randint(0, 40 * 86_400))
+    zone = rng.choice(ZONES)
+    timestamp = timestamp.astimezone(zone) if zone is not None else timestamp.replace(tzinfo=None)
+    return Activity(rng.choice(GOALS), rng.choice(TYPES), rng.randint(1, 100), timestamp, activity_id=activity_id)
+
+
+class _System:
+    """A repository with every derived structure attached, as in app.main."""
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.analytics_service = AnalyticsService()
+        self.recommendation_service = RecommendationService(self.analytics_service)
+        self.metrics_cache = MetricsCache(repository, self.analytics_service, self.recommendation_service)
+        self.leaderboard_service = LeaderboardService(repository, self.analytics_service)
+        self.statistics_service = StatisticsService(repository)
+        self.aggregation_service = AggregationService(repository)
+        self.change_log = GoalChangeLog(repository)
+        self.offloader = GlobalAnalyticsOffloader(
+            repository, self.analytics_service, MetricsCache(repository, self.analytics_service, self.recommendation_service)
+        )
+
+
+def _mutate(rng: random.Random, repository, model: dict, now: datetime, segmented: bool) -> None:
+    """Apply one random write, mirroring its logical effect on ``model`` (id -> raw activity)."""
+    ids = list(model)
+    operation = rng.random()
+    if operation < 0.4 or not ids:
+        activity = repository.save(_random_activity(rng, now))
+        model[activity.activity_id] = activity
+    elif operation < 0.5:
+        batch = [_random_activity(rng, now) for _ in range(rng.randint(1, 5))]
+        in_memory = list(repository._storage)
+        if in_memory and rng.random() < 0.5:
+            batch.append(_random_activity(rng, now, activity_id=rng.choice(in_memory)))
+        repository.save_many(batch)
+        model.update((activity.activity_id, activity) for activity in batch)
+    elif operation < 0.7:
+        # Compacted ids cannot be updated; the repository returns None for them
+        activity = repository.update(_random_activity(rng, now, activity_id=rng.choice(ids)))
+        if activity is not None:
+            model[activity.activity_id] = activity
+    elif operation < 0.88:
+        deleted = repository.delete(rng.choice(ids))
+        if deleted is not None:
+            del model[deleted.activity_id]
+    elif operation < 0.93:
+        repository.compact_before(now - timedelta(days=rng.randint(20, 35)))
+    elif segmented and operation < 0.97:
+        repository.seal_before(now - timedelta(days=rng.randint(5, 30)))
+    elif segmented:
+        repository.compact_segments(0.1)
+
+
+def _goal_row_ids(repository, goal_id: str) -> set:
+    return {activity.activity_id for activity in repository.find_by_goal_id(goal_id) if not isinstance(activity, DailyRollup)}
+
+
+def _poll(repository, change_log: GoalChangeLog, clients: dict) -> None:
+    """Bring each client's (version, row ids) up to date from deltas, resyncing when told to."""
+    for goal_id, (since, row_ids) in clients.items():
+        version, changed = change_log.changes_since(goal_id, since)
+        if changed is None:
+            clients[goal_id] = (version, _goal_row_ids(repository, goal_id))
+            continue
+        for activity_id in changed:
+            activity = repository.find_by_id(activity_id)
+            if activity is not None and activity.goal_id == goal_id:
+                row_ids.add(activity_id)
+            else:
+                row_ids.discard(activity_id)
+        clients[goal_id] = (version, row_ids)
+
+
+def _rebuilt(activities) -> _System:
+    """Derived structures built from scratch over the model's live activities."""
+    system = _System(InMemoryActivityRepository())
+    system.repository.save_many(activities)
+    return system
+
+
+@pytest.mark.parametrize("segmented", [False, True], ids=["in-memory", "segmented"])
+@pytest.mark.parametrize("seed", range(4))
+def test_random_mutations_match_recompute(tmp_path, seed, segmented):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    repository = SegmentedActivityRepository(str(tmp_path)) if segmented else InMemoryActivityRepository()
+    system = _System(repository)
+    model: dict = {}
+    query = AggregationQuery.normalize(group_by=("goal", "type", "week"), metrics=("sum", "count"))
+    clients = {goal_id: (system.change_log.current_version(goal_id), set()) for goal_id in GOALS}
+
+    for step in range(STEPS):
+        _mutate(rng, repository, model, now, segmented)
+        if step % 25 == 0:
+            # Populate the caches so later writes must invalidate them
+            system.metrics_cache.get_global_metrics()
+            for goal_id in GOALS:
+                system.metrics_cache.get_goal_metrics(goal_id)
+            system.aggregation_service.query(query)
+            system.statistics_service.value_quantiles()
+            _poll(repository, system.change_log, clients)
+
+    live = list(model.values())
+    fresh = _rebuilt(live)
+
+    # Repository: rows folded into rollups are counted through them
+    assert len(repository) == len(live)
+    assert sum(getattr(activity, "count", 1) for activity in repository.find_all()) == len(live)
+    for goal_id in GOALS:
+        rows = repository.find_by_goal_id(goal_id)
+        assert [_timestamp_key(activity) for activity in rows] == sorted(map(_timestamp_key, rows))
+        assert repository.count_by_goal_id(goal_id) == sum(activity.goal_id == goal_id for activity in live)
+
+    # Metrics cache
+    for goal_id in [None, *GOALS]:
+        if goal_id is None:
+            got = system.metrics_cache.get_global_metrics()
+        else:
+            got = system.metrics_cache.get_goal_metrics(goal_id)
+        expected = fresh.metrics_cache._compute(goal_id, [a for a in live if goal_id in (None, a.goal_id)])
+        assert got.total_activities == expected.total_activities
+        assert got.consistency_score == expected.consistency_score
+        assert got.wellness_warning == expected.wellness_warning
+        assert got.aggregated_values == pytest.approx(expected.aggregated_values)
+
+    # Streak and leaderboards
+    system.leaderboard_service.expire_wellness_windows()
+    for board in system.leaderboard_service.boards:
+        got = system.leaderboard_service.top(board, 0, 100)[1]
+        expected = fresh.leaderboard_service.top(board, 0, 100)[1]
+        assert [(goal_id, pytest.approx(score)) for _, goal_id, score in got] == [
+            (goal_id, score) for _, goal_id, score in expected
+        ]
+
+    # Statistics sketches (compacted values are kept in their own sketches)
+    for goal_id in [None, *GOALS]:
+        assert system.statistics_service.distinct_active_days(goal_id) == fresh.statistics_service.distinct_active_days(goal_id)
+        got = system.statistics_service.value_quantiles(goal_id, (0.0, 1.0))
+        expected = fresh.statistics_service.value_quantiles(goal_id, (0.0, 1.0))
+        assert got == expected
+
+    # Aggregation cache: day-or-coarser groupings are exact over rollups
+    assert system.aggregation_service.query(query)[0].groups == fresh.aggregation_service.query(query)[0].groups
+
+    # Change log: every client's delta-maintained view matches the goal's rows
+    _poll(repository, system.change_log, clients)
+    for goal_id, (_, row_ids) in clients.items():
+        assert row_ids == _goal_row_ids(repository, goal_id)
+
+    # Columnar analytics log
+    segments = system.offloader.segment_store.segments if segmented else ()
+    block, rows = system.offloader.log.publish(segments)
+    try:
+        snapshot = compute_global_metrics(block.name, rows, _to_epoch_micros(now), 7, 150)
+    finally:
+        block.close()
+        block.unlink()
+    expected = fresh.metrics_cache._compute(None, live, now)
+    assert snapshot["total_activities"] == expected.total_activities
+    assert snapshot["consistency_score"] == expected.consistency_score
+    assert snapshot["aggregated_values"] == pytest.approx(expected.aggregated_values)
+
+    # Segment tombstones persist: a reopened store sees the same live rows
+    if segmented:
+        sealed = sorted(activity.activity_id for activity in repository.segment_store.iter_activities())
+        assert set(sealed) <= set(model)
+        repository.close()
+        reopened = SegmentStore(str(tmp_path))
+        assert sorted(activity.activity_id for activity in reopened.iter_activities()) == sealed
+        assert len(reopened) == len(sealed)
+        reopened.close()
@@ -0,0 +1,62 @@
+"""
+Tests for the columnar activity log behind offloaded global analytics.
+"""
+from datetime import datetime, timedelta, timezone
+from app.models.activity import Activity
+from app.repositories.segmented_repository import SegmentedActivityRepository
+from app.services.analytics_service import AnalyticsService
+from app.services.metrics_cache import MetricsCache
+from app.services.offload_service import GlobalAnalyticsOffloader, _to_epoch_micros, compute_global_metrics
+from app.services.recommendation_service import RecommendationService
+
+PLUS_TWO = timezone(timedelta(hours=2))
+
+
+def _snapshot_metrics(offloader, now):
+    segments = offloader.segment_store.segments if offloader.segment_store is not None else ()
+    block, rows = offloader.log.publish(segments)
+    try:
+        return compute_global_metrics(
+            block.name,
+            rows,
+            _to_epoch_micros(now),
+            offloader.analytics_service.WELLNESS_WINDOW_DAYS,
+            offloader.analytics_service.WELLNESS_THRESHOLD_MINUTES
+        )
+    finally:
+        block.close()
+        block.unlink()
+
+
+def test_log_shrinks_with_compaction_and_sealing_and_snapshots_stay_exact(tmp_path):
+    repository = SegmentedActivityRepository(str(tmp_path))
+    analytics_service = AnalyticsService()
+    metrics_cache = MetricsCache(repository, analytics_service, RecommendationService(analytics_service))
+    offloader = GlobalAnalyticsOffloader(repository, analytics_service, metrics_cache)
+
+    now = datetime.now(timezone.utc)
+    activities = [
+        Activity(f"goal-{row % 5}", ("Health", "Learning", "Fitness")[row % 3], 5 + row % 40,
+                 (now - timedelta(hours=row * 5)).astimezone(PLUS_TWO))
+        for row in range(3000)
+    ]
+    repository.save_many(activities)
+    for activity in activities[::7]:
+        repository.delete(activity.activity_id)
+
+    repository.compact_before(now - timedelta(days=300))
+    repository.seal_before(now - timedelta(days=30))
+    for activity in activities[3:500:11]:
+        repository.delete(activity.activity_id)
+
+    live_rows = len(offloader.log._row_by_id)
+    assert live_rows == len(repository._storage) + sum(len(rollups) for rollups in repository._rollups.values())
+    assert len(offloader.log) < 2 * live_rows + offloader.log.MIN_REWRITE_ROWS
+
+    expected = metrics_cache._compute(None, repository.find_all(), now)
+    result = _snapshot_metrics(offloader, now)
+    assert result["total_activities"] == expected.total_activities
+    assert result["aggregated_values"] == expected.aggregated_values
+    assert result["consistency_score"] == expected.consistency_score
+    assert result["wellness_warning"] == expected.wellness_warning
+    repository.close()
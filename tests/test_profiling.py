@@ -0,0 +1,40 @@
+"""
+Tests for the request profiling middleware.
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.profiling import ProfilingMiddleware
+from app.services.profiling_service import RequestProfiler
+
+
+def _client(**settings):
+    profiler = RequestProfiler(token="secret", **settings)
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return TestClient(app), profiler
+
+
+def test_profiling_token_is_accepted_as_a_header():
+    client, profiler = _client()
+    response = client.get("/ping", headers={"X-Profile-Token": "secret"})
+    assert response.headers["x-profile-id"] in profiler.profiles
+
+
+def test_profiling_token_in_the_query_string_is_ignored():
+    client, profiler = _client()
+    response = client.get("/ping", params={"profile_token": "secret", "profile_mode": "sampling"})
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+    assert not profiler.profiles
+
+
+def test_default_sample_rate_traces_one_request_in_a_hundred():
+    client, profiler = _client(slow_threshold_ms=0)
+    for _ in range(300):
+        client.get("/ping")
+    assert len(profiler._slowest) == 3
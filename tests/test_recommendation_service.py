@@ -0,0 +1,83 @@
+"""
+Equivalence of the two-stage recommendation engine with the one-pass rules
+it replaced.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from app.models.activity import Activity
+from app.services.analytics_service import AnalyticsService
+from app.services.recommendation_service import RecommendationService
+
+TYPES = ("Learning", "Health", "Fitness", "Other")
+ZONES = (timezone.utc, timezone(timedelta(hours=-8)), timezone(timedelta(hours=9)))
+
+
+def _legacy_outcome(analytics_service: AnalyticsService, activities) -> str:
+    """The rules as evaluated before feature extraction; returns each message's opening."""
+    if not activities:
+        return "Start your growth journey"
+    aggregated = analytics_service.aggregate_by_type(activities)
+    consistency_score = analytics_service.calculate_consistency_score(activities)
+    wellness_warning = analytics_service.check_wellness_warning(activities)
+    learning_total = aggregated.get("Learning", 0.0)
+    physical_wellness = aggregated.get("Health", 0.0) + aggregated.get("Fitness", 0.0)
+    if learning_total > 0 and physical_wellness > 0 and learning_total / physical_wellness > 3.0:
+        return "You are investing heavily in learning"
+    if consistency_score < 0.3:
+        return "Your consistency score is low"
+    if wellness_warning:
+        return "⚠️ Wellness Alert"
+    if learning_total > 300 and physical_wellness == 0:
+        return "You're making great progress in learning"
+    if consistency_score >= 0.7 and not wellness_warning:
+        return "Excellent work!"
+    return "You're making progress!"
+
+
+def _legacy_gaps(analytics_service: AnalyticsService, activities) -> dict:
+    aggregated = analytics_service.aggregate_by_type(activities)
+    return {activity_type: aggregated.get(activity_type, 0.0) < 60.0 for activity_type in TYPES}
+
+
+def _random_goal(rng: random.Random, goal_id: str, now: datetime) -> list:
+    # Streak length and type mix vary so every rule fires somewhere
+    days = rng.choice((1, 3, 10, 30))
+    weights = [rng.choice((0, 1, 5)) for _ in TYPES]
+    if not any(weights):
+        return []
+    activities = []
+    for day in range(days):
+        for _ in range(rng.randint(1, 3)):
+            timestamp = now - timedelta(days=day, hours=rng.uniform(0, 12))
+            activities.append(Activity(
+                goal_id,
+                rng.choices(TYPES, weights)[0],
+                rng.choice((5, 30, 90, 200)),
+                timestamp.astimezone(rng.choice(ZONES))
+            ))
+    rng.shuffle(activities)
+    return activities
+
+
+def test_two_stage_engine_matches_the_original_rules():
+    rng = random.Random(11)
+    analytics_service = AnalyticsService()
+    service = RecommendationService(analytics_service)
+    now = datetime.now(timezone.utc)
+    goals = {f"goal-{index}": _random_goal(rng, f"goal-{index}", now) for index in range(300)}
+    scan = [activity for activities in goals.values() for activity in activities]
+    rng.shuffle(scan)
+
+    by_goal = service.extract_features_by_goal(scan, goal_ids=list(goals))
+    outcomes = set()
+    for goal_id, activities in goals.items():
+        expected = _legacy_outcome(analytics_service, activities)
+        outcomes.add(expected)
+        assert service.generate_recommendation(activities).startswith(expected)
+        assert service.evaluate(by_goal[goal_id]).startswith(expected)
+        assert service.detect_activity_gaps(activities) == _legacy_gaps(analytics_service, activities)
+        assert service.evaluate_gaps(by_goal[goal_id]) == _legacy_gaps(analytics_service, activities)
+
+    # Every message except rule 4's: with no physical activity at all the
+    # wellness warning (rule 3) always fires first
+    assert len(outcomes) == 6
@@ -0,0 +1,112 @@
+"""
+Tests for compacting raw activities into daily rollups.
+"""
+from datetime import datetime, timedelta, timezone
+from app.models.activity import Activity
+from app.models.rollup import DailyRollup
+from app.repositories.in_memory_repository import InMemoryActivityRepository
+from app.services.aggregation_service import AggregationQuery, AggregationService
+from app.services.change_log import GoalChangeLog
+
+PLUS_TWO = timezone(timedelta(hours=2))
+
+
+def _repository(days: int = 10):
+    repository = InMemoryActivityRepository()
+    start = datetime(2026, 1, 1, 8, tzinfo=PLUS_TWO)
+    for day in range(days):
+        for hour in (0, 12):
+            repository.save(Activity("goal", "Health", 10 + day, start + timedelta(days=day, hours=hour)))
+    return repository
+
+
+def test_compaction_preserves_totals_and_order():
+    repository = _repository()
+    total = sum(activity.value for activity in repository.find_by_goal_id("goal"))
+
+    folded = repository.compact_before(datetime(2026, 1, 6, tzinfo=timezone.utc))
+
+    activities = repository.find_by_goal_id("goal")
+    rollups = [activity for activity in activities if isinstance(activity, DailyRollup)]
+    assert folded == 10
+    assert len(rollups) == 5
+    assert sum(activity.value for activity in activities) == total
+    assert len(repository) == 20
+    timestamps = [activity.timestamp for activity in activities]
+    assert timestamps == sorted(timestamps)
+
+
+def test_rollup_is_stamped_at_the_start_of_its_utc_day():
+    repository = InMemoryActivityRepository()
+    # 00:30 on Jan 2 at UTC+2 is still Jan 1 in UTC
+    repository.save(Activity("goal", "Health", 5, datetime(2026, 1, 2, 0, 30, tzinfo=PLUS_TWO)))
+    repository.compact_before(datetime(2026, 1, 10, tzinfo=timezone.utc))
+
+    rollup, = repository.find_by_goal_id("goal")
+    assert rollup.day.isoformat() == "2026-01-01"
+    assert rollup.timestamp == datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def test_rollups_sort_before_rows_of_their_day_at_any_offset():
+    repository = InMemoryActivityRepository()
+    # All on Jan 3 in UTC; the local dates range from Jan 2 to Jan 4
+    logged = [
+        datetime(2026, 1, 4, 9, tzinfo=timezone(timedelta(hours=11))),
+        datetime(2026, 1, 2, 20, tzinfo=timezone(timedelta(hours=-10))),
+        datetime(2026, 1, 3, 0, 30),
+        datetime(2026, 1, 4, 0, 30, tzinfo=PLUS_TWO)
+    ]
+    for timestamp in logged:
+        repository.save(Activity("goal", "Health", 5, timestamp))
+    repository.save(Activity("goal", "Health", 7, datetime(2026, 1, 3, 23, tzinfo=timezone.utc)))
+
+    # Folds the first four rows, leaving the 23:00 UTC row raw
+    repository.compact_before(datetime(2026, 1, 3, 23, tzinfo=timezone.utc))
+
+    rollup, raw = repository.find_by_goal_id("goal")
+    assert isinstance(rollup, DailyRollup) and rollup.count == 4
+    assert rollup.timestamp == datetime(2026, 1, 3, tzinfo=timezone.utc)
+    day_start, day_end = datetime(2026, 1, 3, tzinfo=timezone.utc), datetime(2026, 1, 4, tzinfo=timezone.utc)
+    in_range = list(repository.iter_activities("goal", day_start, day_end))
+    assert [activity.activity_id for activity in in_range] == [rollup.activity_id, raw.activity_id]
+    assert list(repository.iter_activities("goal", end=day_start)) == []
+
+
+def test_repeated_compaction_merges_into_existing_rollups():
+    repository = _repository()
+    repository.compact_before(datetime(2026, 1, 4, tzinfo=timezone.utc))
+    repository.compact_before(datetime(2026, 1, 8, tzinfo=timezone.utc))
+
+    activities = repository.find_by_goal_id("goal")
+    rollups = [activity for activity in activities if isinstance(activity, DailyRollup)]
+    assert [rollup.day.day for rollup in rollups] == list(range(1, 8))
+    assert all(rollup.count == 2 for rollup in rollups)
+    timestamps = [activity.timestamp for activity in activities]
+    assert timestamps == sorted(timestamps)
+
+
+def test_compaction_notifies_listeners_per_goal():
+    repository = _repository()
+    repository.save(Activity("other", "Health", 1, datetime(2026, 1, 1, tzinfo=timezone.utc)))
+    notifications = []
+    repository.add_compact_listener(lambda goal_id, folded, rollups: notifications.append((goal_id, len(folded), len(rollups))))
+
+    repository.compact_before(datetime(2026, 1, 3, tzinfo=timezone.utc))
+
+    assert sorted(notifications) == [("goal", 4, 2), ("other", 1, 1)]
+
+
+def test_compaction_invalidates_dependent_caches():
+    repository = _repository()
+    aggregation_service = AggregationService(repository)
+    change_log = GoalChangeLog(repository)
+    query = AggregationQuery.normalize(goal_ids=["goal"], group_by=["day"], metrics=["count"])
+    aggregation_service.query(query)
+    version = change_log.current_version("goal")
+
+    repository.compact_before(datetime(2026, 1, 6, tzinfo=timezone.utc))
+
+    _, cached = aggregation_service.query(query)
+    assert not cached
+    _, changed = change_log.changes_since("goal", version)
+    assert changed is None
@@ -0,0 +1,75 @@
+"""
+Tests for sealed segments and the tiered repository's seal path.
+"""
+import struct
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+import pytest
+from app.models.activity import Activity
+from app.repositories.segment_store import Segment, SegmentStore, write_segment
+from app.repositories.segmented_repository import SegmentedActivityRepository
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _activity(activity_id: str, goal_id: str = "goal", hours: int = 0) -> Activity:
+    return Activity(goal_id, "Health", 10 + hours, START + timedelta(hours=hours), activity_id=activity_id)
+
+
+def test_ids_of_any_form_round_trip(tmp_path):
+    ids = [str(uuid4()), "client-42", "ümlaut/✓", str(uuid4()).upper(), "{%s}" % uuid4()]
+    store = SegmentStore(str(tmp_path))
+    store.seal([_activity(activity_id, hours=hours) for hours, activity_id in enumerate(ids)])
+
+    assert sorted(activity.activity_id for activity in store.iter_activities()) == sorted(ids)
+    for activity_id in ids:
+        assert store.find_by_id(activity_id).activity_id == activity_id
+    assert store.find_by_id("client-43") is None
+
+    assert store.delete("client-42").activity_id == "client-42"
+    store.close()
+    reopened = SegmentStore(str(tmp_path))
+    assert reopened.find_by_id("client-42") is None
+    assert len(reopened) == len(ids) - 1
+    reopened.close()
+
+
+def test_version_2_segments_stay_readable(tmp_path):
+    path = str(tmp_path / "0000000000.seg")
+    activity_id = str(uuid4())
+    write_segment(path, [_activity(activity_id)])
+    with open(path, "r+b") as handle:
+        handle.seek(8)
+        handle.write(struct.pack("<I", 2))
+
+    segment = Segment(path)
+    assert segment.find_by_id(activity_id).value == 10
+    segment.close()
+
+
+def test_failed_seal_keeps_rows_in_memory(tmp_path, monkeypatch):
+    repository = SegmentedActivityRepository(str(tmp_path))
+    repository.save_many([_activity(str(uuid4()), hours=hours) for hours in range(4)])
+
+    def fail(activities):
+        raise OSError("disk full")
+    monkeypatch.setattr(repository.segment_store, "seal", fail)
+
+    with pytest.raises(OSError):
+        repository.seal_before(START + timedelta(hours=2))
+    assert len(repository.find_by_goal_id("goal")) == 4
+    assert repository.count_by_goal_id("goal") == 4
+    repository.close()
+
+
+def test_seal_moves_rows_to_a_segment(tmp_path):
+    repository = SegmentedActivityRepository(str(tmp_path))
+    repository.save_many([_activity(f"row-{hours}", hours=hours) for hours in range(4)])
+
+    assert repository.seal_before(START + timedelta(hours=2)) == 2
+    assert [activity.activity_id for activity in repository.find_by_goal_id("goal")] == [
+        "row-0", "row-1", "row-2", "row-3"
+    ]
+    assert repository.count_by_goal_id("goal") == 4
+    assert repository.find_by_id("row-1").value == 11
+    repository.close()
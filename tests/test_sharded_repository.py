@@ -0,0 +1,146 @@
+"""
+Tests for the hash-sharded repository's id routing, scans and scatter.
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.models.activity import Activity
+from app.repositories.in_memory_repository import InMemoryActivityRepository
+from app.repositories.sharded_repository import ShardedActivityRepository
+from app.services.analytics_service import AnalyticsService
+from app.services.event_broker import DashboardEventBroker
+from app.services.metrics_cache import MetricsCache
+from app.services.offload_service import ShardedGlobalAnalytics
+from app.services.recommendation_service import RecommendationService
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _slow_count(shard_view, seconds):
+    # Scatter functions run in the shard process, so this must be module-level
+    time.sleep(seconds)
+    return sum(1 for _ in shard_view.iter_activities())
+
+
+def _record_requests(repository):
+    """Wrap ``_request`` to record which shards each call reaches."""
+    reached = []
+    request = repository._request
+
+    def recording(connections, calls):
+        reached.append(sorted(calls))
+        return request(connections, calls)
+    repository._request = recording
+    return reached
+
+
+@pytest.fixture
+def repository():
+    repository = ShardedActivityRepository(3)
+    yield repository
+    repository.close()
+
+
+def test_ids_resolve_through_the_router_map(repository):
+    deleted = []
+    repository.add_delete_listener(deleted.append)
+    activities = [Activity(f"goal-{index % 7}", "Health", index, START + timedelta(hours=index)) for index in range(50)]
+    repository.save_many(activities)
+
+    moved = Activity("goal-other", "Health", 99, START, activity_id=activities[0].activity_id)
+    repository.save(moved)
+    assert repository.find_by_id(moved.activity_id).goal_id == "goal-other"
+    assert [activity.activity_id for activity in deleted] == [moved.activity_id]
+    assert moved.activity_id not in {activity.activity_id for activity in repository.find_by_goal_id("goal-0")}
+    assert len(repository) == 50
+
+    assert repository.delete(activities[1].activity_id).activity_id == activities[1].activity_id
+    assert repository.delete(activities[1].activity_id) is None
+    assert repository.find_by_id(activities[1].activity_id) is None
+    assert len(repository) == 49
+
+    repository.compact_before(START + timedelta(hours=10))
+    assert len(repository) == 49
+    folded = activities[5]
+    assert repository.find_by_id(folded.activity_id) is None
+    assert folded.activity_id not in repository._shard_by_id
+
+
+def test_id_calls_reach_only_the_owning_shard(repository):
+    goals = ["goal-a", "goal-b", "goal-c", "goal-d", "goal-e", "goal-f"]
+    first, second = sorted(goals, key=repository.shard_for)[0], sorted(goals, key=repository.shard_for)[-1]
+    assert repository.shard_for(first) != repository.shard_for(second)
+    activity = repository.save(Activity(first, "Health", 10, START))
+    reached = _record_requests(repository)
+
+    repository.save(Activity(first, "Health", 20, START, activity_id=activity.activity_id))
+    repository.find_by_id(activity.activity_id)
+    # Moving to another goal's shard also deletes on the old one
+    repository.save(Activity(second, "Health", 30, START, activity_id=activity.activity_id))
+    assert repository.find_by_id(activity.activity_id).value == 30
+    assert repository.delete(activity.activity_id).value == 30
+    assert repository.delete(activity.activity_id) is None
+
+    old, new = repository.shard_for(first), repository.shard_for(second)
+    assert reached == [[old], [old], sorted([old, new]), [new], [new]]
+    assert repository.find_by_goal_id(first) == [] and len(repository) == 0
+
+
+def test_iter_activities_pages_through_equal_timestamps(repository):
+    repository.ITER_PAGE_ROWS = 3
+    activities = [
+        Activity(f"goal-{index % 5}", "Learning", index, START + timedelta(days=index // 10))
+        for index in range(60)
+    ]
+    repository.save_many(activities)
+
+    streamed = list(repository.iter_activities())
+    assert sorted(activity.activity_id for activity in streamed) == sorted(a.activity_id for a in activities)
+
+    window = list(repository.iter_activities("goal-2", START + timedelta(days=1), START + timedelta(days=4)))
+    expected = [a for a in activities if a.goal_id == "goal-2" and 1 <= (a.timestamp - START).days < 4]
+    assert sorted(a.activity_id for a in window) == sorted(a.activity_id for a in expected)
+    assert [a.timestamp for a in window] == sorted(a.timestamp for a in window)
+
+
+def test_routed_calls_do_not_wait_for_a_scatter_scan(repository):
+    repository.save_many([Activity(f"goal-{index}", "Health", index, START) for index in range(9)])
+    results = []
+    scan = threading.Thread(target=lambda: results.append(repository.scatter(_slow_count, 1.0)))
+    scan.start()
+    time.sleep(0.2)
+
+    started = time.perf_counter()
+    repository.save(Activity("goal-1", "Health", 1, START))
+    assert len(repository.find_by_goal_id("goal-1")) == 2
+    elapsed = time.perf_counter() - started
+    scan.join()
+
+    assert elapsed < 0.5
+    assert sum(results[0]) in (9, 10)
+
+
+def test_insights_snapshot_scatters_instead_of_shipping_every_row(repository):
+    now = datetime.now(timezone.utc)
+    activities = [
+        Activity(f"goal-{index}", activity_type, 30, now - timedelta(days=day, hours=index))
+        for index in range(4) for day in range(3) for activity_type in ("Health", "Learning")
+    ]
+    repository.save_many(activities)
+    analytics_service = AnalyticsService()
+    recommendation_service = RecommendationService(analytics_service)
+    metrics_cache = MetricsCache(repository, analytics_service, recommendation_service)
+    broker = DashboardEventBroker(
+        repository, analytics_service, recommendation_service,
+        global_analytics=ShardedGlobalAnalytics(repository, analytics_service, metrics_cache)
+    )
+    in_process = DashboardEventBroker(InMemoryActivityRepository(), analytics_service, recommendation_service)
+    in_process.repository.save_many(activities)
+
+    def find_all():
+        raise AssertionError("find_all ships every row to the router")
+    repository.find_all = find_all
+
+    assert asyncio.run(broker.insights_snapshot()) == in_process.build_insights_event()
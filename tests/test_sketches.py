@@ -0,0 +1,146 @@
+"""
+Tests for the KLL quantile sketch, the active-day bitmap and the sketches
+maintained by StatisticsService.
+"""
+import random
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta, timezone
+import pytest
+from app.models.activity import Activity
+from app.repositories.in_memory_repository import InMemoryActivityRepository
+from app.services.statistics_service import StatisticsService
+from app.utils.sketches import ActiveDaySet, KLLSketch
+
+FRACTIONS = [fraction / 100 for fraction in range(1, 100)]
+# Documented bound at k = 200 (99% confidence per query)
+MAX_RANK_ERROR = 0.017
+
+
+def _rank_error(exact, estimate, fraction):
+    """Distance from ``fraction`` to the nearest rank ``estimate`` holds in ``exact``."""
+    low = bisect_left(exact, estimate) / len(exact)
+    high = bisect_right(exact, estimate) / len(exact)
+    return 0.0 if low <= fraction <= high else min(abs(fraction - low), abs(fraction - high))
+
+
+def test_kll_rank_error_within_bound():
+    random.seed(1)
+    rng = random.Random(2)
+    values = [rng.lognormvariate(3, 1) for _ in range(100_000)]
+    sketch = KLLSketch(200)
+    for value in values:
+        sketch.update(value)
+
+    exact = sorted(values)
+    estimates = sketch.quantiles(FRACTIONS)
+    errors = [_rank_error(exact, estimate, fraction) for fraction, estimate in zip(FRACTIONS, estimates)]
+    assert max(errors) < MAX_RANK_ERROR
+    assert sketch.n == len(values)
+    assert (sketch.min, sketch.max) == (exact[0], exact[-1])
+    assert sum(len(items) for items in sketch._levels) <= 3 * sketch.k + 2 * len(sketch._levels)
+
+
+def test_merged_kll_matches_combined_stream():
+    random.seed(3)
+    rng = random.Random(4)
+    parts = [[rng.uniform(0, 100) for _ in range(20_000)] for _ in range(4)]
+    merged = KLLSketch(200)
+    for part in parts:
+        sketch = KLLSketch(200)
+        for value in part:
+            sketch.update(value)
+        merged.merge(sketch)
+
+    exact = sorted(value for part in parts for value in part)
+    estimates = merged.quantiles(FRACTIONS)
+    errors = [_rank_error(exact, estimate, fraction) for fraction, estimate in zip(FRACTIONS, estimates)]
+    assert max(errors) < MAX_RANK_ERROR
+    assert merged.n == len(exact)
+
+
+@pytest.mark.parametrize("max_bitmap_days", [ActiveDaySet.MAX_BITMAP_DAYS, 100])
+def test_active_day_set_counts_ranges_exactly(monkeypatch, max_bitmap_days):
+    monkeypatch.setattr(ActiveDaySet, "MAX_BITMAP_DAYS", max_bitmap_days)
+    rng = random.Random(5)
+    origin = date(2025, 1, 1)
+    days = {origin + timedelta(days=rng.randrange(400)) for _ in range(150)}
+    active = ActiveDaySet()
+    for day in sorted(days, reverse=True):
+        active.add(day)
+    removed = set(rng.sample(sorted(days), 20))
+    for day in removed:
+        active.discard(day)
+    days -= removed
+
+    for _ in range(100):
+        start = origin + timedelta(days=rng.randrange(-10, 410))
+        end = start + timedelta(days=rng.randrange(0, 100))
+        assert active.count(start, end) == sum(start <= day <= end for day in days)
+    assert active.count() == len(days)
+    assert all(day in active for day in days)
+    assert not any(day in active for day in removed)
+
+
+def test_active_day_sets_merge_as_union():
+    first, second = ActiveDaySet(), ActiveDaySet()
+    for offset in (0, 3, 10):
+        first.add(date(2026, 1, 1) + timedelta(days=offset))
+    for offset in (-5, 3, 20):
+        second.add(date(2026, 1, 1) + timedelta(days=offset))
+
+    first.merge(second)
+    assert first.count() == 5
+    assert first.count(date(2026, 1, 1), date(2026, 1, 11)) == 3
+
+
+def test_active_day_set_falls_back_to_a_sorted_list_past_the_bitmap_span():
+    extremes = [date(1, 1, 1), date(2026, 3, 1), date(2026, 3, 2), date(9999, 12, 31)]
+    active = ActiveDaySet()
+    for day in extremes[1:3]:
+        active.add(day)
+    assert not active.is_sparse
+    for day in (extremes[0], extremes[3], extremes[1]):
+        active.add(day)
+    assert active.is_sparse
+    assert len(active._ordinals) == 4
+    assert active.count() == 4
+    assert active.count(date(2026, 1, 1), date(2026, 12, 31)) == 2
+    active.discard(date(9999, 12, 31))
+    assert date(9999, 12, 31) not in active and date(1, 1, 1) in active
+
+    bitmap = ActiveDaySet()
+    bitmap.add(date(2026, 3, 5))
+    bitmap.merge(active)
+    assert bitmap.is_sparse and bitmap.count() == 4
+
+
+def test_global_active_days_are_maintained_without_merging_goals():
+    repository = InMemoryActivityRepository()
+    statistics = StatisticsService(repository)
+    day = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+    first = repository.save(Activity("first", "Health", 1, day))
+    repository.save(Activity("second", "Health", 1, day))
+    repository.save(Activity("second", "Health", 1, day + timedelta(days=1)))
+    assert statistics.distinct_active_days() == 2
+
+    repository.delete(first.activity_id)
+    assert statistics.distinct_active_days() == 2
+    assert statistics.distinct_active_days("first") == 0
+    statistics.on_activity_saved(Activity("far", "Health", 1, datetime(9999, 1, 1, tzinfo=timezone.utc)))
+    assert statistics.distinct_active_days() == 3
+    assert statistics.distinct_active_days(end=date(2026, 1, 1)) == 1
+
+
+def test_stale_sketch_rebuild_keeps_compacted_values():
+    repository = InMemoryActivityRepository()
+    statistics = StatisticsService(repository)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    activities = [Activity("goal", "Health", value, start + timedelta(days=value)) for value in range(1, 21)]
+    repository.save_many(activities)
+    repository.compact_before(start + timedelta(days=11))
+
+    repository.delete(activities[-1].activity_id)
+    summary = statistics.value_quantiles("goal", (0.0, 0.5, 1.0))["Health"]
+
+    assert summary["count"] == 19
+    assert summary["quantiles"] == {0.0: 1, 0.5: 10, 1.0: 19}
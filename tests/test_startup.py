@@ -0,0 +1,100 @@
+"""
+Tests for background history loading, fast boot and the readiness endpoint.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import textwrap
+import time
+from datetime import datetime, timedelta, timezone
+from app.models.activity import Activity
+from app.repositories.segmented_repository import SegmentedActivityRepository
+from app.services.startup import HistoryLoader, StartupProfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_history_loader_replays_in_chunks_that_yield_to_the_loop():
+    events = []
+
+    async def scenario():
+        loader = HistoryLoader(StartupProfile(time.perf_counter()))
+        loader.CHUNK_ROWS = 4
+        loader.add_consumer(lambda chunk: events.append(("chunk", len(chunk))))
+        loader.add_warmup(lambda: events.append("sync warm-up"))
+
+        async def async_warmup():
+            events.append("async warm-up")
+        loader.add_warmup(async_warmup)
+
+        async def other_request():
+            while not loader.ready:
+                events.append("request")
+                await asyncio.sleep(0)
+
+        activities = [Activity("goal", "Health", value, datetime(2026, 1, 1, tzinfo=timezone.utc)) for value in range(1, 11)]
+        await asyncio.gather(loader.run(activities), other_request())
+        return loader
+
+    loader = asyncio.run(scenario())
+    assert loader.ready and loader.loaded_activities == 10
+    assert [event for event in events if event != "request"] == [
+        ("chunk", 4), ("chunk", 4), ("chunk", 2), "sync warm-up", "async warm-up"
+    ]
+    # The concurrent request ran between chunks, not only after the load
+    assert events.index("request") < events.index(("chunk", 2))
+    assert set(loader.profile.phases) == {"history-load", "warm-up"}
+    assert loader.profile.to_dict()["ready_after_ms"] is not None
+
+
+FAST_BOOT_SCRIPT = textwrap.dedent("""
+    import asyncio, threading, time
+    from fastapi.testclient import TestClient
+    import app.main as main
+
+    release = threading.Event()
+
+    async def gate():
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+
+    main.history_loader.add_warmup(gate)
+    with TestClient(main.app) as client:
+        loading = client.get("/ready")
+        assert loading.status_code == 503, loading.status_code
+        assert loading.json()["status"] == "loading"
+        assert client.get("/health").json()["ready"] is False
+        release.set()
+        for _ in range(500):
+            ready = client.get("/ready")
+            if ready.status_code == 200:
+                break
+            time.sleep(0.01)
+        body = ready.json()
+        assert ready.status_code == 200 and body["status"] == "ready", body
+        assert body["loaded_activities"] == 3, body
+        assert {"imports", "repository", "services", "routers", "history-load", "warm-up"} <= set(body["startup"]["phases_ms"])
+        assert body["startup"]["ready_after_ms"] > 0
+        assert main.statistics_service.distinct_active_days("goal") == 3
+        assert main.idempotency_index.warmed
+    print("ok")
+""")
+
+
+def test_fast_boot_serves_requests_while_history_loads(tmp_path):
+    # app.main wires module-level routers, so it runs in its own interpreter
+    repository = SegmentedActivityRepository(str(tmp_path))
+    start = datetime.now(timezone.utc) - timedelta(days=20)
+    for day in range(3):
+        repository.save(Activity("goal", "Health", 10, start + timedelta(days=day)))
+    assert repository.seal_before(start + timedelta(days=5)) == 3
+    repository.close()
+
+    environment = {**os.environ, "FAST_BOOT": "1", "SEGMENT_DIR": str(tmp_path), "PYTHONPATH": ROOT}
+    result = subprocess.run(
+        [sys.executable, "-c", FAST_BOOT_SCRIPT], cwd=ROOT, env=environment,
+        capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith("ok")